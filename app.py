@@ -1,97 +1,253 @@
 import os
+import atexit
+import hashlib
 import logging
 import html
-import re
-from datetime import datetime, timedelta
-from collections import defaultdict
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
-from flask_wtf import FlaskForm, CSRFProtect
-from flask_wtf.csrf import validate_csrf
-from wtforms import StringField, HiddenField
-from wtforms.validators import DataRequired, Length
-from werkzeug.middleware.proxy_fix import ProxyFix
+import time
+from flask import Flask, Response, current_app, make_response, render_template, request, redirect, url_for, flash, jsonify, session
+from markupsafe import Markup
 from security import SecurityHeaders, RateLimiter
+from rate_limit_backends import create_backend
 from validators import TaskValidator
-import requests
+from pagination import encode_cursor, page_args, DEFAULT_PAGE_SIZE
+from export import iter_export, EXPORT_FORMATS
+from change_feed import EventStream, StreamLimit, event_id, feed_position
+from fragment_cache import FragmentCache
+from metrics import Metrics
+from static_assets import AssetPipeline
+from models import TaskStorage
+from persistence import TaskJournal
+from heartbeat import HeartbeatDispatcher
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Shared services, built from the environment by the first create_app() call
+# (see _init_services) so that importing this module only defines the views.
+# Forms and the heartbeat's HTTP client import their libraries on first use.
+rate_limiter = None
+task_store = None
+task_journal = None
+task_fragments = None
+sse_streams = None
+heartbeat = None
+metrics = None
 
-# Create Flask app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+# Server-Sent Events: keep-alive comment interval and how long one stream lasts before the client reconnects
+SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_STREAM_SECONDS = float(os.environ.get("SSE_STREAM_SECONDS", "300"))
 
-# Initialize CSRF protection
-csrf = CSRFProtect(app)
+def _init_services():
+    """Build the shared services once per process"""
+    global rate_limiter, task_store, task_journal, task_fragments, sse_streams, heartbeat, metrics
+    if task_store is not None:
+        return
 
-# Initialize security components
-security_headers = SecurityHeaders()
-rate_limiter = RateLimiter()
+    # RATE_LIMIT_BACKEND=sqlite:///path or redis://host:port/db shares limits across workers
+    rate_limiter = RateLimiter(backend=create_backend(os.environ.get("RATE_LIMIT_BACKEND")))
 
-# In-memory storage for tasks (with validation)
-tasks_storage = []
-task_id_counter = 1
+    # Task storage: a SQL database when DATABASE_URL is set, otherwise in memory
+    if os.environ.get("DATABASE_URL"):
+        from sql_storage import SQLTaskStorage
+        task_store = SQLTaskStorage(
+            os.environ["DATABASE_URL"],
+            pool_size=int(os.environ.get("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+        )
+    else:
+        task_store = TaskStorage()
 
-class TaskForm(FlaskForm):
-    """Form for creating and editing tasks with CSRF protection"""
-    description = StringField('Description', validators=[
-        DataRequired(message="Task description is required"),
-        Length(min=1, max=500, message="Task description must be between 1 and 500 characters")
-    ])
-    task_id = HiddenField()
+    # TASKS_DATA_DIR makes the in-memory store durable: writes are logged there and replayed on startup.
+    # One process at a time: another waits TASKS_LOCK_TIMEOUT seconds for it, then fails. The default
+    # covers a reloading server (gunicorn --reload, HUP) starting the new worker before the old one exits
+    if os.environ.get("TASKS_DATA_DIR") and isinstance(task_store, TaskStorage):
+        task_journal = TaskJournal(os.environ["TASKS_DATA_DIR"],
+                                   lock_timeout=float(os.environ.get("TASKS_LOCK_TIMEOUT", "30")))
+        task_journal.load(task_store)
+        atexit.register(task_journal.close)
+
+    # Rendered task-list fragments, keyed by store version (FRAGMENT_CACHE_BYTES=0 disables)
+    task_fragments = FragmentCache(int(os.environ.get("FRAGMENT_CACHE_BYTES", str(8 * 1024 * 1024))))
+
+    # Under WSGI each open event stream holds a server thread; keep this below the threads per process
+    sse_streams = StreamLimit(int(os.environ.get("SSE_MAX_STREAMS", "2")))
+
+    # Better Uptime heartbeat, sent from a background thread
+    heartbeat = HeartbeatDispatcher(
+        os.environ.get("HEARTBEAT_URL", "https://uptime.betterstack.com/api/v1/heartbeat/LqbGnaKAvYvmVwGLWz8KiC2D"),
+        min_interval=float(os.environ.get("HEARTBEAT_INTERVAL", "30")),
+    )
+    atexit.register(heartbeat.shutdown)
+
+    # Request metrics, scraped from /metrics; METRICS_DIR (shared by the worker
+    # processes) makes every scrape report all workers rather than just its own
+    metrics = Metrics(directory=os.environ.get("METRICS_DIR"))
+    metrics.register_collector(_app_samples)
+
+def _app_samples():
+    """Store size, heartbeat outcomes, open event streams, rate limit backend errors and fragment cache stats for /metrics"""
+    counts = task_store.get_task_count()
+    for status in ('active', 'completed'):
+        yield 'tasks', 'gauge', 'Tasks in the store', {'status': status}, counts[status]
+    for outcome, count in heartbeat.stats().items():
+        yield 'heartbeats_total', 'counter', 'Uptime heartbeats by outcome', {'outcome': outcome}, count
+    yield 'event_streams', 'gauge', 'Event streams holding a server thread', {}, sse_streams.open
+    yield ('rate_limit_backend_errors_total', 'counter', 'Requests allowed because the rate limit backend failed',
+           {}, rate_limiter.backend_errors)
+    cache = task_fragments.stats()
+    for event in ('hits', 'misses', 'evictions'):
+        yield 'fragment_cache_total', 'counter', 'Task list fragment cache lookups', {'event': event}, cache[event]
+    yield 'fragment_cache_bytes', 'gauge', 'Size of the cached task list fragments', {}, cache['bytes']
+
+_task_form_class = None
+
+def task_form():
+    """Form for creating and editing tasks with CSRF protection
+
+    The form class is defined on first use, so importing this module
+    does not load wtforms.
+    """
+    global _task_form_class
+    if _task_form_class is None:
+        from flask_wtf import FlaskForm
+        from wtforms import StringField, HiddenField
+        from wtforms.validators import DataRequired, Length
+
+        class TaskForm(FlaskForm):
+            description = StringField('Description', validators=[
+                DataRequired(message="Task description is required"),
+                Length(min=1, max=500, message="Task description must be between 1 and 500 characters")
+            ])
+            task_id = HiddenField()
+
+        _task_form_class = TaskForm
+    return _task_form_class()
+
+# Views, registered on each app by create_app()
+_routes = []
+
+def route(rule, **options):
+    """Like ``app.route``, for the app create_app() builds"""
+    def decorator(view):
+        _routes.append((rule, view, options))
+        return view
+    return decorator
 
-@app.before_request
 def before_request():
     """Apply security measures before each request"""
+    # Warm-up requests (see serve.py) are neither rate limited nor counted
+    if request.environ.get('todo.warmup'):
+        return None
+    request.environ['todo.start_time'] = time.perf_counter()
+    
+    # Scrapes are not rate limited
+    if request.endpoint == 'metrics_endpoint':
+        return None
+    
     # Apply rate limiting
     client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
     if not rate_limiter.is_allowed(client_ip):
+        metrics.inc('rate_limited_requests')
         return jsonify({'error': 'Rate limit exceeded. Please try again later.'}), 429
 
-@app.after_request
 def after_request(response):
-    """Apply security headers after each request"""
-    return security_headers.apply_headers(response)
+    """Record the request's metrics (security headers are added by middleware)"""
+    start = request.environ.get('todo.start_time')
+    if start is not None:
+        metrics.observe_request(request.endpoint or 'unmatched', request.method,
+                                response.status_code, time.perf_counter() - start)
+    return response
+
+def _tasks_etag(version, *parts):
+    """Strong ETag for a view of the store as of ``version``"""
+    return '.'.join(str(part) for part in (task_store.epoch, version) + parts)
+
+def _index_etag(version, filter_type, after_id, limit):
+    """ETag for the rendered index page, or None if it cannot be reused
+
+    Besides the tasks, the page carries a CSRF token signed with a
+    timestamp. The tag includes a digest of the session's CSRF secret, and
+    a time bucket of half the token lifetime so that a revalidated copy is
+    re-rendered before its token expires.
+    """
+    raw_token = session.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'))
+    if raw_token is None:
+        return None
+    token_digest = hashlib.sha256(raw_token.encode()).hexdigest()[:12]
+    time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    bucket = int(time.time() // max(1, time_limit // 2)) if time_limit else 0
+    return _tasks_etag(version, filter_type, after_id, limit, token_digest, bucket)
 
-@app.route('/')
+def _not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+@route('/')
 def index():
-    """Main page displaying all tasks"""
+    """Main page displaying all tasks
+
+    Answers If-None-Match with 304 before touching the tasks when the store
+    has not changed since the client's copy. Pages showing flashed messages
+    are one-offs and carry no ETag.
+    """
     try:
         # Get filter parameter
         filter_type = request.args.get('filter', 'all')
         if filter_type not in ['all', 'active', 'completed']:
             filter_type = 'all'
         
-        # Filter tasks based on type
-        filtered_tasks = []
-        for task in tasks_storage:
-            if (
-                filter_type == 'all'
-                or (filter_type == 'active' and not task['completed'])
-                or (filter_type == 'completed' and task['completed'])
-            ):
-                filtered_tasks.append(task)
+        # Page through the filtered tasks; a bad cursor just shows the first page
+        try:
+            after_id, limit = page_args(request.args)
+        except ValueError:
+            after_id, limit = 0, DEFAULT_PAGE_SIZE
+        
+        # Read the version first: the page rendered below is at least this new
+        version = task_store.version
+        has_flashes = bool(session.get('_flashes'))
+        if not has_flashes:
+            etag = _index_etag(version, filter_type, after_id, limit)
+            if etag is not None and request.if_none_match.contains(etag):
+                return _not_modified(etag)
+        
+        # The task list only depends on the store and the page, so it is
+        # rendered once per version; the form, CSRF token and flashes are not
+        def render_task_list():
+            filtered_tasks, has_more = task_store.get_page(filter_type, after_id, limit)
+            return render_template('_task_list.html',
+                                   tasks=filtered_tasks,
+                                   filter_type=filter_type,
+                                   next_cursor=encode_cursor(filtered_tasks[-1]['id']) if has_more else None,
+                                   paged=after_id > 0)
+        
+        task_list = task_fragments.get_or_render(
+            (task_store.epoch, version, filter_type, after_id, limit), render_task_list)
         
         # Create form for new tasks
-        form = TaskForm()
+        form = task_form()
         
-        return render_template('index.html', 
-                             tasks=filtered_tasks, 
+        response = make_response(render_template('index.html', 
+                             task_list=task_list,
+                             counts=task_store.get_task_count(),
                              filter_type=filter_type,
-                             form=form)
+                             feed_position=event_id(task_store, version) if _streams_served() else None,
+                             form=form))
+        # Rendering may have created the session's CSRF token, so tag afterwards
+        etag = None if has_flashes else _index_etag(version, filter_type, after_id, limit)
+        if etag is not None:
+            response.set_etag(etag)
+        return response
     except Exception as e:
-        app.logger.error(f"Error in index route: {str(e)}")
+        current_app.logger.error("Error in index route: %s", e)
         flash('An error occurred while loading tasks.', 'error')
-        return render_template('index.html', tasks=[], filter_type='all', form=TaskForm())
+        task_list = render_template('_task_list.html', tasks=[], filter_type='all', next_cursor=None, paged=False)
+        return render_template('index.html', task_list=Markup(task_list),
+                               counts={'total': 0, 'active': 0, 'completed': 0},
+                               filter_type='all', form=task_form())
 
-@app.route('/add_task', methods=['POST'])
+@route('/add_task', methods=['POST'])
 def add_task():
     """Add a new task with security validation"""
-    global task_id_counter
-    
     try:
-        form = TaskForm()
+        form = task_form()
         
         if form.validate_on_submit():
             # Get and validate task description
@@ -106,27 +262,13 @@ def add_task():
             safe_description = html.escape(description)
             
             # Create new task
-            new_task = {
-                'id': task_id_counter,
-                'description': safe_description,
-                'completed': False,
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            tasks_storage.append(new_task)
-            task_id_counter += 1
+            task_store.add_task(safe_description)
             
             flash('Task added successfully!', 'success')
-            app.logger.info(f"Task added: {safe_description}")
-
-            # Send heartbeat to Better Uptime
-            try:
-                response = requests.get("https://uptime.betterstack.com/api/v1/heartbeat/LqbGnaKAvYvmVwGLWz8KiC2D", timeout=5)
-                response.raise_for_status() # Raise an exception for HTTP errors (4xx or 5xx)
-                app.logger.info("Heartbeat sent successfully to Better Uptime.")
-            except requests.exceptions.RequestException as e:
-                app.logger.error(f"Failed to send heartbeat to Better Uptime: {e}")
+            current_app.logger.info("Task added: %s", safe_description)
+
+            # Queue a heartbeat to Better Uptime (sent off the request thread)
+            heartbeat.notify()
             
         else:
             # Handle form validation errors
@@ -135,12 +277,12 @@ def add_task():
                     flash(f'Error in {field}: {error}', 'error')
     
     except Exception as e:
-        app.logger.error(f"Error adding task: {str(e)}")
+        current_app.logger.error("Error adding task: %s", e)
         flash('An error occurred while adding the task.', 'error')
     
     return redirect(url_for('index'))
 
-@app.route('/toggle_task/<int:task_id>', methods=['POST'])
+@route('/toggle_task/<int:task_id>', methods=['POST'])
 def toggle_task(task_id):
     """Toggle task completion status with CSRF protection"""
     try:
@@ -159,27 +301,25 @@ def toggle_task(task_id):
             return jsonify({'error': 'Invalid Task ID'}), 400
         
         # Find and toggle task
-        for task in tasks_storage:
-            if task['id'] == task_id:
-                task['completed'] = not task['completed']
-                task['updated_at'] = datetime.now().isoformat()
-                
-                status = 'completed' if task['completed'] else 'active'
-                app.logger.info(f"Task {task_id} marked as {status}")
-                
-                return jsonify({
-                    'success': True, 
-                    'completed': task['completed'],
-                    'message': f'Task marked as {status}'
-                })
-        
-        return jsonify({'error': 'Task not found'}), 404
+        task = task_store.toggle_task(task_id)
+        if task is None:
+            return jsonify({'error': 'Task not found'}), 404
+        
+        status = 'completed' if task['completed'] else 'active'
+        current_app.logger.info("Task %s marked as %s", task_id, status)
+        
+        return jsonify({
+            'success': True, 
+            'completed': task['completed'],
+            'counts': task_store.get_task_count(),
+            'message': f'Task marked as {status}'
+        })
         
     except Exception as e:
-        app.logger.error(f"Error toggling task {task_id}: {str(e)}")
+        current_app.logger.error("Error toggling task %s: %s", task_id, e)
         return jsonify({'error': 'An error occurred while updating the task'}), 500
 
-@app.route('/delete_task/<int:task_id>', methods=['POST'])
+@route('/delete_task/<int:task_id>', methods=['POST'])
 def delete_task(task_id):
     """Delete a task with security validation"""
     try:
@@ -198,58 +338,314 @@ def delete_task(task_id):
             return jsonify({'error': 'Invalid Task ID'}), 400
         
         # Find and delete task
-        for i, task in enumerate(tasks_storage):
-            if task['id'] == task_id:
-                deleted_task = tasks_storage.pop(i)
-                app.logger.info(f"Task deleted: {deleted_task['description']}")
-                return jsonify({
-                    'success': True,
-                    'message': 'Task deleted successfully'
-                })
+        deleted_task = task_store.delete_task(task_id)
+        if deleted_task is None:
+            return jsonify({'error': 'Task not found'}), 404
         
-        return jsonify({'error': 'Task not found'}), 404
+        current_app.logger.info("Task deleted: %s", deleted_task['description'])
+        return jsonify({
+            'success': True,
+            'counts': task_store.get_task_count(),
+            'message': 'Task deleted successfully'
+        })
         
     except Exception as e:
-        app.logger.error(f"Error deleting task {task_id}: {str(e)}")
+        current_app.logger.error("Error deleting task %s: %s", task_id, e)
         return jsonify({'error': 'An error occurred while deleting the task'}), 500
 
-@app.route('/get_tasks')
+# Most items one batch request may carry
+MAX_BATCH_SIZE = 1000
+
+def _batch_items(payload, key):
+    """Get the list under ``key`` of a batch request, or None if unusable"""
+    items = payload.get(key) if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not 1 <= len(items) <= MAX_BATCH_SIZE:
+        return None
+    return items
+
+def _id_results(task_ids, valid, tasks, action):
+    """Per-item results for a batch of task IDs"""
+    tasks = iter(tasks)
+    results = []
+    for task_id, ok in zip(task_ids, valid):
+        task = next(tasks) if ok else None
+        if not ok:
+            results.append({'id': task_id, 'success': False, 'error': 'Invalid Task ID'})
+        elif task is None:
+            results.append({'id': task_id, 'success': False, 'error': 'Task not found'})
+        else:
+            results.append({'id': task_id, 'success': True, 'task': task})
+    if current_app.logger.isEnabledFor(logging.INFO):
+        current_app.logger.info("Batch %s: %d/%d tasks", action, sum(result['success'] for result in results), len(results))
+    return results
+
+@route('/batch/add_tasks', methods=['POST'])
+def batch_add_tasks():
+    """Add a list of tasks in one request: {"descriptions": [...]}"""
+    try:
+        descriptions = _batch_items(request.get_json(silent=True), 'descriptions')
+        if descriptions is None:
+            return jsonify({'error': f'descriptions must be a list of 1 to {MAX_BATCH_SIZE} items'}), 400
+        
+        descriptions = [d.strip() if isinstance(d, str) else d for d in descriptions]
+        valid = TaskValidator.validate_descriptions(descriptions)
+        added = iter(task_store.add_tasks([html.escape(d) for d, ok in zip(descriptions, valid) if ok]))
+        results = [
+            {'success': True, 'task': next(added)} if ok
+            else {'success': False, 'error': 'Invalid task description'}
+            for ok in valid
+        ]
+        if any(valid):
+            heartbeat.notify()
+        current_app.logger.info("Batch add: %d/%d tasks", sum(valid), len(valid))
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'counts': task_store.get_task_count()
+        })
+    
+    except Exception as e:
+        current_app.logger.error("Error adding tasks: %s", e)
+        return jsonify({'error': 'An error occurred while adding the tasks'}), 500
+
+@route('/batch/toggle_tasks', methods=['POST'])
+def batch_toggle_tasks():
+    """Toggle a list of tasks: {"ids": [...]}, or set them with "completed": true/false"""
+    try:
+        payload = request.get_json(silent=True)
+        task_ids = _batch_items(payload, 'ids')
+        if task_ids is None:
+            return jsonify({'error': f'ids must be a list of 1 to {MAX_BATCH_SIZE} items'}), 400
+        completed = payload.get('completed')
+        if completed is not None and not isinstance(completed, bool):
+            return jsonify({'error': 'completed must be true or false'}), 400
+        
+        valid = TaskValidator.validate_task_ids(task_ids)
+        tasks = task_store.toggle_tasks([i for i, ok in zip(task_ids, valid) if ok], completed)
+        
+        return jsonify({
+            'success': True,
+            'results': _id_results(task_ids, valid, tasks, 'toggle'),
+            'counts': task_store.get_task_count()
+        })
+    
+    except Exception as e:
+        current_app.logger.error("Error toggling tasks: %s", e)
+        return jsonify({'error': 'An error occurred while updating the tasks'}), 500
+
+@route('/batch/delete_tasks', methods=['POST'])
+def batch_delete_tasks():
+    """Delete a list of tasks in one request: {"ids": [...]}
+
+    {"filter": "completed"} instead deletes every completed task, however
+    many there are; the response then has the number ``deleted``.
+    """
+    try:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict) and 'filter' in payload:
+            if payload['filter'] != 'completed':
+                return jsonify({'error': 'filter must be "completed"'}), 400
+            deleted = task_store.delete_completed()
+            current_app.logger.info("Deleted %d completed tasks", deleted)
+            return jsonify({
+                'success': True,
+                'deleted': deleted,
+                'counts': task_store.get_task_count()
+            })
+        
+        task_ids = _batch_items(payload, 'ids')
+        if task_ids is None:
+            return jsonify({'error': f'ids must be a list of 1 to {MAX_BATCH_SIZE} items'}), 400
+        
+        valid = TaskValidator.validate_task_ids(task_ids)
+        tasks = task_store.delete_tasks([i for i, ok in zip(task_ids, valid) if ok])
+        
+        return jsonify({
+            'success': True,
+            'results': _id_results(task_ids, valid, tasks, 'delete'),
+            'counts': task_store.get_task_count()
+        })
+    
+    except Exception as e:
+        current_app.logger.error("Error deleting tasks: %s", e)
+        return jsonify({'error': 'An error occurred while deleting the tasks'}), 500
+
+@route('/get_tasks')
 def get_tasks():
-    """API endpoint to get tasks (with rate limiting)"""
+    """API endpoint to get one page of tasks (with rate limiting)
+
+    Pass ``next_cursor`` from a response back as ``?cursor=`` to get the
+    following page; ``after_id`` and ``limit`` can also be given directly.
+    Responses carry an ETag that changes with every write to the store.
+
+    Each response also has the store ``version`` it was read at; passing
+    that back as ``?since=`` returns only the tasks written after it
+    instead (see ``_task_changes``).
+    """
     try:
+        if 'since' in request.args:
+            return _task_changes(request.args['since'])
+        
         filter_type = request.args.get('filter', 'all')
         if filter_type not in ['all', 'active', 'completed']:
             filter_type = 'all'
         
-        filtered_tasks = []
-        for task in tasks_storage:
-            if (
-                filter_type == 'all'
-                or (filter_type == 'active' and not task['completed'])
-                or (filter_type == 'completed' and task['completed'])
-            ):
-                filtered_tasks.append(task)
+        try:
+            after_id, limit = page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
+        # Unchanged since the client's copy: skip the query and serialization
+        version = task_store.version
+        etag = _tasks_etag(version, filter_type, after_id, limit)
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+        
+        filtered_tasks, has_more = task_store.get_page(filter_type, after_id, limit)
+        counts = task_store.get_task_count()
+        
+        response = jsonify({
             'success': True,
             'tasks': filtered_tasks,
-            'total': len(filtered_tasks)
+            'total': counts['total' if filter_type == 'all' else filter_type],
+            'has_more': has_more,
+            'next_cursor': encode_cursor(filtered_tasks[-1]['id']) if has_more else None,
+            'version': event_id(task_store, version)
         })
+        response.set_etag(etag)
+        return response
     
     except Exception as e:
-        app.logger.error(f"Error getting tasks: {str(e)}")
+        current_app.logger.error("Error getting tasks: %s", e)
         return jsonify({'error': 'An error occurred while fetching tasks'}), 500
 
-@app.errorhandler(404)
+def _task_changes(since):
+    """Delta sync: the tasks added, updated and deleted after ``since``
+
+    Deleted tasks come back as IDs in ``deleted``. ``version`` is the value
+    to send as ``since`` next time. When the store can no longer tell what
+    changed (the version is from before a restart, a clear or the oldest
+    remembered delete) the response has ``resync`` set and the client
+    reloads the full list, starting over from that list's ``version``.
+    """
+    version = feed_position(task_store, since)
+    changes_since = getattr(task_store, 'changes_since', None)
+    delta = changes_since(version) if version is not None and changes_since is not None else None
+    if delta is None:
+        return jsonify({'success': True, 'resync': True, 'version': event_id(task_store, task_store.version)})
+    tasks, deleted, version = delta
+    return jsonify({
+        'success': True,
+        'tasks': tasks,
+        'deleted': deleted,
+        'version': event_id(task_store, version)
+    })
+
+@route('/export_tasks')
+def export_tasks():
+    """Stream every task matching ``filter`` as NDJSON (or ``?format=json``)
+
+    The body is generated page by page while it is sent, so memory use
+    does not grow with the number of tasks.
+    """
+    filter_type = request.args.get('filter', 'all')
+    if filter_type not in ['all', 'active', 'completed']:
+        filter_type = 'all'
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported export format'}), 400
+    
+    response = Response(iter_export(task_store, filter_type, fmt), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=tasks.{fmt}'
+    return response
+
+def _streams_served():
+    """Whether this server can serve /events at all
+
+    asgi.py sends streams from its event loop. A WSGI server needs a
+    thread per stream, so a single-threaded one (gunicorn's sync worker,
+    a serverless function) serves none and a threaded one SSE_MAX_STREAMS
+    at a time.
+    """
+    if request.environ.get('todo.asgi'):
+        return True
+    return request.environ.get('wsgi.multithread', False) and sse_streams.limit > 0
+
+@route('/events')
+def task_events():
+    """Stream task changes as Server-Sent Events
+
+    Resumes after the ``Last-Event-ID`` a reconnecting EventSource sends,
+    or else after ``since``, the position the page was rendered at. Once
+    the server has no thread to spare for another stream the answer is
+    503, and the page falls back to reconnecting later.
+    """
+    since = feed_position(task_store, request.headers.get('Last-Event-ID') or request.args.get('since'))
+    stream = EventStream(task_store, since, SSE_HEARTBEAT_SECONDS, SSE_STREAM_SECONDS)
+    asgi = request.environ.get('todo.asgi', False)
+    if not asgi and not (_streams_served() and sse_streams.acquire()):
+        response = jsonify({'error': 'Too many open event streams'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '60'
+        return response
+    response = Response(stream, mimetype='text/event-stream')
+    if asgi:
+        # asgi.py iterates the stream asynchronously instead of by a thread
+        request.environ['todo.event_stream'] = stream
+    else:
+        response.call_on_close(sse_streams.release)
+    # Keep proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint (this process only unless METRICS_DIR is set)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 def not_found_error(error):
     """Handle 404 errors"""
     return render_template('base.html'), 404
 
-@app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors"""
-    app.logger.error(f"Internal server error: {str(error)}")
+    current_app.logger.error("Internal server error: %s", error)
     return render_template('base.html'), 500
 
+def create_app(config=None):
+    """Build the Flask app serving the shared store
+
+    ``config`` is applied over the defaults. The first call also builds
+    the services shared by every app in the process (store, journal,
+    rate limiter, heartbeat, metrics). Logging is left to the entry point
+    (main.py, serve.py, asgi.py; see logging_config).
+    """
+    from flask_wtf.csrf import CSRFProtect
+    from werkzeug.middleware.proxy_fix import ProxyFix
+
+    _init_services()
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
+    app.config.update(config or {})
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    security_headers = SecurityHeaders(static_path=app.static_url_path + '/')
+    app.wsgi_app = security_headers.middleware(app.wsgi_app)
+    # Minified, fingerprinted, precompressed static assets, cached as immutable;
+    # STATIC_BUILD_DIR moves the build out of the static folder
+    AssetPipeline(app.static_folder, os.environ.get("STATIC_BUILD_DIR")).init_app(app)
+
+    CSRFProtect().init_app(app)
+    app.before_request(before_request)
+    app.after_request(after_request)
+    for rule, view, options in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, internal_error)
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    from logging_config import configure_logging
+
+    configure_logging()
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,227 @@
+"""
+ASGI entry point for the ToDo application
+
+Run with any ASGI server, e.g. ``uvicorn asgi:application`` (uvicorn is
+listed in requirements.txt).
+
+The Flask app stays the single implementation of every route, so the
+security headers, rate limiting, CSRF checks and metrics are the same as
+under WSGI. What changes is who waits: the event loop reads request
+bodies and writes responses, so a slow client never holds a thread.
+
+- /get_tasks, the toggle and delete endpoints and /events only touch the
+  in-memory store, and are dispatched on the event loop itself.
+- Event streams are then sent with ``aiter_sse``: an idle subscriber is a
+  suspended coroutine rather than a parked thread.
+- Every other route, and every route when a call could block (a SQL
+  store, a journal waiting for fsync, a shared rate-limit backend), runs
+  in a pool of ``ASGI_THREADS`` threads. Streamed bodies such as exports
+  are pulled from the pool one chunk at a time.
+
+Logging defaults to INFO through the queue handler (logging_config's
+production mode), so request logging does not write to the stream from
+the event loop.
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Collection, Dict, List, Optional
+
+from werkzeug.exceptions import HTTPException
+
+import app as app_module
+from logging_config import configure_logging
+from models import TaskStorage
+from rate_limit_backends import MemoryBackend
+
+# Routes dispatched on the event loop when nothing they call can block
+INLINE_ENDPOINTS = frozenset({'get_tasks', 'toggle_task', 'delete_task', 'task_events'})
+
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", "32"))
+
+
+class ASGIApp:
+    """Serve a WSGI app to an ASGI server
+
+    Requests for ``inline_endpoints`` run on the event loop while
+    ``can_inline()`` holds; all others go to a thread pool. A view that
+    puts an async-iterable body under ``todo.event_stream`` in the environ
+    has that streamed instead of the body it returned; ``todo.asgi`` in
+    the environ tells views they may.
+    """
+
+    def __init__(self, flask_app, inline_endpoints: Collection[str] = (),
+                 can_inline: Callable[[], bool] = lambda: True, threads: int = ASGI_THREADS):
+        self.wsgi_app = flask_app.wsgi_app
+        self.url_map = flask_app.url_map
+        self.inline_endpoints = frozenset(inline_endpoints)
+        self.can_inline = can_inline
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        environ = wsgi_environ(scope, bytes(body))
+        inline = self._endpoint(environ) in self.inline_endpoints and self.can_inline()
+
+        started: Dict = {}
+        chunks: List[bytes] = []
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                  for name, value in headers]
+            return chunks.append
+
+        loop = asyncio.get_running_loop()
+        if inline:
+            result = self.wsgi_app(environ, start_response)
+        else:
+            result = await loop.run_in_executor(self.executor, self.wsgi_app, environ, start_response)
+
+        stream = environ.get('todo.event_stream')
+        if stream is not None and started['status'] == 200:
+            # The view's own (blocking) iterator is never started
+            await self._finish(loop, result, inline)
+            await send({'type': 'http.response.start', 'status': 200, 'headers': started['headers']})
+            await self._send_stream(stream, receive, send)
+            return
+
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        if isinstance(result, (list, tuple)):
+            chunks.extend(result)
+            await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+            await self._finish(loop, result, inline)
+            return
+        iterator = iter(result)
+        try:
+            while True:
+                chunk = next(iterator, None) if inline else await loop.run_in_executor(
+                    self.executor, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunks:
+                    chunk = b''.join(chunks) + chunk
+                    chunks.clear()
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+        finally:
+            await self._finish(loop, result, inline)
+
+    async def _send_stream(self, stream, receive, send):
+        """Send an async-iterable body until it ends or the client goes"""
+        chunks = stream.__aiter__()
+        disconnected = asyncio.ensure_future(_disconnect(receive))
+        try:
+            while True:
+                next_chunk = asyncio.ensure_future(chunks.__anext__())
+                await asyncio.wait((next_chunk, disconnected), return_when=asyncio.FIRST_COMPLETED)
+                if not next_chunk.done():
+                    next_chunk.cancel()
+                    await asyncio.wait((next_chunk,))
+                    return
+                try:
+                    chunk = next_chunk.result()
+                except StopAsyncIteration:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            await chunks.aclose()
+
+    async def _finish(self, loop, result, inline):
+        close = getattr(result, 'close', None)
+        if close is None:
+            return
+        if inline:
+            close()
+        else:
+            await loop.run_in_executor(self.executor, close)
+
+    def _endpoint(self, environ) -> Optional[str]:
+        try:
+            endpoint, _ = self.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        return endpoint
+
+
+def wsgi_environ(scope, body: bytes) -> Dict:
+    """The WSGI environ for an ASGI HTTP request with its whole body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0] if client else '',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        # Views may hand back streams for the event loop to send (todo.event_stream)
+        'todo.asgi': True,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else 'HTTP_' + name
+        value = value.decode('latin-1')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+async def _disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _never_blocks() -> bool:
+    """Whether the inline endpoints only touch process memory"""
+    store = app_module.task_store
+    return (isinstance(store, TaskStorage) and store.journal is None
+            and isinstance(app_module.rate_limiter.backend, MemoryBackend))
+
+
+# As the entry point, set up logging (importing app leaves it alone)
+configure_logging(production=True)
+app = app_module.create_app()
+application = ASGIApp(app, INLINE_ENDPOINTS, can_inline=_never_blocks)
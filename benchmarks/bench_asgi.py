@@ -0,0 +1,161 @@
+"""
+Benchmark the ASGI entry point against the threaded WSGI server
+
+Serves the app from a child process with werkzeug's threaded server
+(--server wsgi) and with uvicorn and asgi.application (--server asgi),
+and drives each with --connections concurrent keep-alive connections
+from an asyncio client:
+
+- api: every connection sends its share of --requests, alternating
+  GET /get_tasks?limit=50 and POST /toggle_task/<id>.
+- streams: --connections SSE subscribers stay connected to /events while
+  8 other connections send --requests GET /get_tasks?limit=50.
+
+Prints requests per second, p50/p99 latency, failed requests, and the
+server's thread count and peak RSS. The rate limit and CSRF checks are lifted. Needs
+uvicorn (in requirements.txt); Linux only (threads are read from /proc).
+
+Usage: python benchmarks/bench_asgi.py [--connections 1000] [--requests 20000]
+           [--tasks 10000] [--server both]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HEARTBEAT_URL', '')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import app as app_module  # noqa: E402
+from benchmarks import harness  # noqa: E402
+from change_feed import StreamLimit  # noqa: E402
+
+FORM = 'Content-Type: application/x-www-form-urlencoded\r\n'
+
+
+def server_threads(pid):
+    with open(f'/proc/{pid}/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('Threads:'))
+
+
+async def connect(port, count):
+    """Open ``count`` connections, each a [reader, writer, port] list"""
+    connections = []
+    for _ in range(count):
+        connections.append([*await asyncio.open_connection('127.0.0.1', port, limit=1 << 20), port])
+    return connections
+
+
+async def send_request(connection, method, path, body=None):
+    """Send a request and read its response, reconnecting if the server
+    closed the connection after the previous one (werkzeug always does)"""
+    reader, writer, port = connection
+    head = f'{method} {path} HTTP/1.1\r\nHost: bench\r\n'
+    if body is not None:
+        head += f'{FORM}Content-Length: {len(body)}\r\n'
+    writer.write((head + '\r\n' + (body or '')).encode())
+    response = await reader.readuntil(b'\r\n\r\n')
+    status = int(response.split(b' ', 2)[1])
+    headers = response.lower().split(b'\r\n')
+    for line in headers:
+        if line.startswith(b'content-length:'):
+            await reader.readexactly(int(line.split(b':')[1]))
+    if b'connection: close' in headers:
+        writer.close()
+        connection[:2] = await asyncio.open_connection('127.0.0.1', port, limit=1 << 20)
+    if status >= 400:
+        raise RuntimeError(f"{method} {path} returned {status}")
+
+
+async def drive(connections, plan):
+    """Send ``plan`` spread over ``connections``; return harness stats
+
+    A request whose connection is refused or reset counts as an error and
+    the connection is reopened.
+    """
+    latencies = []
+    errors = 0
+
+    async def worker(connection, share):
+        nonlocal errors
+        for method, path, body in share:
+            start = time.perf_counter()
+            try:
+                await send_request(connection, method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors += 1
+                connection[1].close()
+                connection[:2] = await asyncio.open_connection('127.0.0.1', connection[2], limit=1 << 20)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(connection, plan[i::len(connections)])
+                           for i, connection in enumerate(connections)))
+    return dict(errors=errors, **harness.summarize(latencies, time.perf_counter() - started))
+
+
+async def subscribe(port, count):
+    connections = await connect(port, count)
+    for _, writer, _ in connections:
+        writer.write(b'GET /events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n')
+    for reader, _, _ in connections:
+        await reader.readuntil(b'\r\n\r\n')
+    return connections
+
+
+async def scenario(name, server, args):
+    page = ('GET', '/get_tasks?limit=50', None)
+    if name == 'api':
+        connections = await connect(server.port, args.connections)
+        plan = [page if i % 2 else ('POST', f'/toggle_task/{server.ids[i % len(server.ids)]}', 'csrf_token=bench')
+                for i in range(args.requests)]
+        threads = server_threads(server.pid)
+        stats = await drive(connections, plan)
+    else:
+        streams = await subscribe(server.port, args.connections)
+        connections = await connect(server.port, 8)
+        threads = server_threads(server.pid)
+        stats = await drive(connections, [page] * args.requests)
+        connections += streams
+    for _, writer, _ in connections:
+        writer.close()
+    return dict(threads=threads, **stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--server', choices=('wsgi', 'asgi', 'both'), default='both')
+    args = parser.parse_args()
+
+    # Two sockets per connection, plus a thread each under WSGI
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, 4 * args.connections + 256)), hard))
+    # Streams outlast the run without heartbeats
+    app_module.SSE_HEARTBEAT_SECONDS = app_module.SSE_STREAM_SECONDS = 3600
+    harness.prepare_app(app_module)
+    # werkzeug's threaded server starts a thread per stream rather than running out
+    app_module.sse_streams = StreamLimit(args.connections)
+
+    print(f"{'server':>6} {'scenario':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'threads':>8} "
+          f"{'RSS MB':>8}")
+    for kind in (('wsgi', 'asgi') if args.server == 'both' else (args.server,)):
+        for name in ('api', 'streams'):
+            server = harness.ServerProcess(app_module, seed=lambda module: harness.seed_store(module.task_store,
+                                                                                               args.tasks),
+                                           asgi=kind == 'asgi')
+            stats = asyncio.run(scenario(name, server, args))
+            rss = server.stop()
+            print(f"{kind:>6} {name:>8} {stats['rps']:>8.0f} {stats['p50_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+                  f"{stats['errors']:>7} {stats['threads']:>8} {rss:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark task updates per second for single vs batch requests
+
+Runs through the Flask test client, so every request pays the same
+per-request work a real one does: rate limiting, security headers,
+routing and JSON encoding. Compares /toggle_task/<id> once per task with
+/batch/toggle_tasks carrying 1 or --batch IDs. The rate limit is lifted
+for the run.
+
+Usage: python benchmarks/bench_batch.py [--tasks 10000] [--batch 1000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HEARTBEAT_URL', '')
+
+import app as app_module  # noqa: E402
+from security import RateLimiter  # noqa: E402
+
+
+def per_task(client, ids):
+    for task_id in ids:
+        client.post(f'/toggle_task/{task_id}', data={'csrf_token': 'bench'})
+
+
+def batched(client, ids, size):
+    for start in range(0, len(ids), size):
+        client.post('/batch/toggle_tasks', json={'ids': ids[start:start + size]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=10_000)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = app_module.create_app({'WTF_CSRF_ENABLED': False})
+    app_module.rate_limiter = RateLimiter(max_requests=10 ** 9)
+    app.logger.disabled = True
+    store = app_module.task_store
+    store.clear()
+    store.add_tasks([f'Task {i}' for i in range(args.tasks)])
+    ids = list(range(1, args.tasks + 1))
+    client = app.test_client()
+
+    cases = [
+        ('/toggle_task x1', lambda: per_task(client, ids)),
+        ('batch of 1', lambda: batched(client, ids, 1)),
+        (f'batch of {args.batch}', lambda: batched(client, ids, args.batch)),
+    ]
+    print(f"{'requests':>18} {'tasks/s':>12}")
+    for name, run in cases:
+        start = time.perf_counter()
+        run()
+        print(f'{name:>18} {args.tasks / (time.perf_counter() - start):>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
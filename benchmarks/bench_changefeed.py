@@ -0,0 +1,198 @@
+"""
+Benchmark idle clients: SSE subscribers against pollers
+
+Starts the app behind a threaded server in a child process and keeps
+--clients connections open to it for --seconds: either subscribed to
+/events (each waiting on the change feed, with a keepalive comment every
+--heartbeat seconds) or polling /get_tasks every --poll-interval seconds
+with If-None-Match, as the page did before it subscribed. With
+--writes-per-minute a writer adds tasks meanwhile, so every subscriber
+receives each change and every poller gets a fresh page after it.
+Prints the server's CPU time and the bytes moved per minute. Linux only
+(server CPU is read from /proc).
+
+Usage: python benchmarks/bench_changefeed.py [--clients 1000] [--seconds 30]
+           [--poll-interval 5] [--heartbeat 15] [--writes-per-minute 0]
+"""
+
+import argparse
+import http.client
+import os
+import re
+import resource
+import selectors
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HEARTBEAT_URL', '')
+
+
+def server_cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def connect(port, count):
+    sockets = []
+    for _ in range(count):
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.setblocking(False)
+        sockets.append(sock)
+    return sockets
+
+
+def subscribe(port, clients, seconds, mark):
+    """Bytes sent and received by ``clients`` subscribers over ``seconds``
+
+    Counting starts, with a call to ``mark``, once every stream is open.
+    """
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', '/')
+    url = re.search(r'id="taskFeed"[^>]*data-url="([^"]+)"', conn.getresponse().read().decode()).group(1)
+    conn.close()
+    request = f'GET {url.replace("&amp;", "&")} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n'.encode()
+    selector = selectors.DefaultSelector()
+    for sock in connect(port, clients):
+        sock.sendall(request)
+        selector.register(sock, selectors.EVENT_READ)
+    opened = set()
+    while len(opened) < clients:
+        for key, _ in selector.select():
+            key.fileobj.recv(65536)
+            opened.add(key.fileobj)
+    received = 0
+    mark()
+    deadline = time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        for key, _ in selector.select(remaining):
+            received += len(key.fileobj.recv(65536))
+    for key in list(selector.get_map().values()):
+        key.fileobj.close()
+    return 0, received
+
+
+def poll(port, clients, seconds, interval, mark):
+    """Bytes sent and received by ``clients`` pollers over ``seconds``
+
+    Counting starts, with a call to ``mark``, after the first round of
+    polls, once every poller holds an ETag.
+    """
+    selector = selectors.DefaultSelector()
+    state = {}
+    now = time.monotonic()
+    for i, sock in enumerate(connect(port, clients)):
+        # Staggered, as independent pages would be
+        state[sock] = {'etag': None, 'buffer': b'', 'next': now + interval * i / clients, 'busy': False}
+        selector.register(sock, selectors.EVENT_READ)
+    sent = received = 0
+    counting = False
+    deadline = now + interval + seconds
+    while (now := time.monotonic()) < deadline:
+        if not counting and now >= deadline - seconds:
+            mark()
+            counting = True
+            sent = received = 0
+        for sock, client in state.items():
+            if not client['busy'] and client['next'] <= now:
+                request = 'GET /get_tasks HTTP/1.1\r\nHost: bench\r\n'
+                if client['etag']:
+                    request += f"If-None-Match: {client['etag']}\r\n"
+                request = (request + '\r\n').encode()
+                sock.sendall(request)
+                sent += len(request)
+                client['busy'] = True
+                client['next'] = now + interval
+        for key, _ in selector.select(0.01):
+            client = state[key.fileobj]
+            data = key.fileobj.recv(65536)
+            received += len(data)
+            client['buffer'] += data
+            head, found, body = client['buffer'].partition(b'\r\n\r\n')
+            if not found:
+                continue
+            length = re.search(rb'(?i)\r\ncontent-length: *(\d+)', head)
+            if len(body) < (int(length.group(1)) if length else 0):
+                continue
+            etag = re.search(rb'(?i)\r\netag: *([^\r]+)', head)
+            if etag:
+                client['etag'] = etag.group(1).decode()
+            client['buffer'] = b''
+            client['busy'] = False
+    for sock in state:
+        sock.close()
+    return sent, received
+
+
+def write_tasks(port, per_minute, started, stop):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    started.wait()
+    i = 0
+    while not stop.wait(60 / per_minute):
+        conn.request('POST', '/add_task', body=f'description=Change+{i}',
+                     headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        conn.getresponse().read()
+        i += 1
+    conn.close()
+
+
+def run(mode, args):
+    import app as app_module
+    from benchmarks import harness
+
+    harness.prepare_app(app_module)
+    server = harness.ServerProcess(app_module, seed=lambda module: harness.seed_store(module.task_store, args.tasks))
+    started, stop = threading.Event(), threading.Event()
+    writer = None
+    if args.writes_per_minute:
+        writer = threading.Thread(target=write_tasks, args=(server.port, args.writes_per_minute, started, stop))
+        writer.start()
+    cpu_before = []
+
+    def mark():
+        cpu_before.append(server_cpu_seconds(server.pid))
+        started.set()
+
+    if mode == 'sse':
+        sent, received = subscribe(server.port, args.clients, args.seconds, mark)
+    else:
+        sent, received = poll(server.port, args.clients, args.seconds, args.poll_interval, mark)
+    cpu = server_cpu_seconds(server.pid) - cpu_before[0]
+    stop.set()
+    if writer is not None:
+        writer.join()
+    rss = server.stop()
+    per_minute = 60 / args.seconds
+    print(f"{mode:>5} {args.clients:>8} {cpu * per_minute:>12.2f} {(sent + received) * per_minute / 1e6:>10.2f} "
+          f"{rss:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--poll-interval', type=float, default=5)
+    parser.add_argument('--heartbeat', type=float, default=15)
+    parser.add_argument('--writes-per-minute', type=float, default=0)
+    parser.add_argument('--tasks', type=int, default=1000)
+    args = parser.parse_args()
+
+    # Two sockets per client between this process and the server
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, 4 * args.clients + 256)), hard))
+    # Read by the app at import; the server child inherits them
+    os.environ['SSE_HEARTBEAT_SECONDS'] = str(args.heartbeat)
+    os.environ['SSE_STREAM_SECONDS'] = str(args.seconds + 60)
+    # werkzeug's threaded server starts a thread per stream rather than running out
+    os.environ['SSE_MAX_STREAMS'] = str(args.clients)
+
+    print(f"{'mode':>5} {'clients':>8} {'CPU s/min':>12} {'MB/min':>10} {'RSS MB':>8}")
+    for mode in ('sse', 'poll'):
+        run(mode, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark TaskStorage throughput with many concurrent clients
+
+Each client thread runs a mix of reads (lookups, filtered lists, counts)
+and writes (add, toggle, delete) against one shared store. Readers work
+from published views without locking; writers serialize on the store's
+write lock. The run fails loudly if any invariant breaks.
+
+Usage: python benchmarks/bench_concurrency.py [--clients 1 8 32] [--ops 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import TaskStorage  # noqa: E402
+
+
+def client(store, seed, ops, write_ratio, barrier):
+    rng = random.Random(seed)
+    barrier.wait()
+    for _ in range(ops):
+        if rng.random() < write_ratio:
+            action = rng.randrange(3)
+            if action == 0:
+                store.add_task('Concurrent task')
+            elif action == 1:
+                store.toggle_task(rng.randrange(1, store.next_id))
+            else:
+                store.delete_task(rng.randrange(1, store.next_id))
+        else:
+            action = rng.randrange(3)
+            if action == 0:
+                store.get_task(rng.randrange(1, store.next_id))
+            elif action == 1:
+                store.get_task_count()
+            else:
+                store.get_filtered_tasks(rng.choice(('active', 'completed')))
+
+
+def check(store):
+    ids = [task['id'] for task in store.get_all_tasks()]
+    assert ids == sorted(set(ids)), 'duplicate or unordered ids'
+    counts = store.get_task_count()
+    assert counts['total'] == len(ids)
+    assert counts['active'] == len(store.get_filtered_tasks('active'))
+    assert counts['completed'] == len(store.get_filtered_tasks('completed'))
+
+
+def run(clients, ops, tasks, write_ratio):
+    store = TaskStorage()
+    for i in range(tasks):
+        store.add_task(f'Seed task {i % 500}')
+    barrier = threading.Barrier(clients + 1)
+    threads = [threading.Thread(target=client, args=(store, n, ops, write_ratio, barrier))
+               for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    check(store)
+    return clients * ops / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--ops', type=int, default=2_000, help='operations per client')
+    parser.add_argument('--tasks', type=int, default=1_000, help='tasks seeded before the run')
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'ops/s':>10}")
+    for clients in args.clients:
+        rate = run(clients, args.ops, args.tasks, args.write_ratio)
+        print(f'{clients:>8} {rate:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
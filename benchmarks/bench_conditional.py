@@ -0,0 +1,56 @@
+"""
+Benchmark unchanged polls with and without If-None-Match
+
+Polls /get_tasks and / through the Flask test client while the store does
+not change. A full poll queries, serializes (or renders) and sends the
+page; a revalidating poll presents the previous ETag and gets a 304. The
+rate limit is lifted for the run.
+
+Usage: python benchmarks/bench_conditional.py [--tasks 100000] [--polls 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HEARTBEAT_URL', '')
+
+import app as app_module  # noqa: E402
+from security import RateLimiter  # noqa: E402
+
+
+def polls_per_second(client, url, polls, conditional):
+    etag = client.get(url).headers['ETag']
+    headers = {'If-None-Match': etag} if conditional else {}
+    start = time.perf_counter()
+    for _ in range(polls):
+        response = client.get(url, headers=headers)
+        assert response.status_code == (304 if conditional else 200)
+    return polls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=100_000)
+    parser.add_argument('--polls', type=int, default=2_000)
+    args = parser.parse_args()
+
+    app = app_module.create_app()
+    app_module.rate_limiter = RateLimiter(max_requests=10 ** 9)
+    app.logger.disabled = True
+    store = app_module.task_store
+    store.clear()
+    store.add_tasks([f'Task {i}' for i in range(args.tasks)])
+    client = app.test_client()
+
+    print(f"{'url':>36} {'full req/s':>11} {'304 req/s':>10} {'speedup':>8}")
+    for url in ('/get_tasks', '/get_tasks?limit=200&filter=active', '/'):
+        full = polls_per_second(client, url, args.polls, conditional=False)
+        revalidated = polls_per_second(client, url, args.polls, conditional=True)
+        print(f'{url:>36} {full:>11.0f} {revalidated:>10.0f} {revalidated / full:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
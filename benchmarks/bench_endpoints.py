@@ -0,0 +1,79 @@
+"""
+Load-test the main endpoints at several store sizes
+
+For each store size, seeds the store and drives /, /get_tasks, /add_task,
+/toggle_task/<id> and /delete_task/<id> in turn, in-process through the
+WSGI test client (--mode wsgi), over sockets against a threaded server in
+a child process with --workers concurrent connections (--mode http), or
+both. Prints p50/p95/p99 latency, requests per second and peak RSS, and
+with --output saves them as JSON; --compare prints the change from an
+earlier saved run. The rate limit and CSRF checks are lifted for the run.
+
+Usage: python benchmarks/bench_endpoints.py [--sizes 1000,100000,1000000]
+           [--mode both] [--requests 2000] [--workers 8]
+           [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HEARTBEAT_URL', '')
+
+import app as app_module  # noqa: E402
+from benchmarks import harness  # noqa: E402
+
+
+def run_size(app, size, modes, requests, workers):
+    results = []
+    if 'wsgi' in modes:
+        ids = harness.seed_store(app_module.task_store, size)
+        for endpoint in harness.ENDPOINTS:
+            stats = harness.run_wsgi(app, harness.request_plan(endpoint, ids, requests))
+            results.append(dict(mode='wsgi', size=size, endpoint=endpoint, workers=1,
+                                peak_rss_mb=harness.peak_rss_mb(), **stats))
+        app_module.task_store.clear()
+    if 'http' in modes:
+        server = harness.ServerProcess(app_module, seed=lambda module: harness.seed_store(module.task_store, size))
+        scenarios = [(endpoint, harness.run_http(server.port, harness.request_plan(endpoint, server.ids, requests),
+                                                 workers))
+                     for endpoint in harness.ENDPOINTS]
+        rss = server.stop()
+        results.extend(dict(mode='http', size=size, endpoint=endpoint, workers=workers, peak_rss_mb=rss, **stats)
+                       for endpoint, stats in scenarios)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000')
+    parser.add_argument('--mode', choices=('wsgi', 'http', 'both'), default='both')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--output', help='save results as JSON')
+    parser.add_argument('--compare', help='JSON results of an earlier run')
+    args = parser.parse_args()
+
+    app = harness.prepare_app(app_module)
+    modes = ('wsgi', 'http') if args.mode == 'both' else (args.mode,)
+    print(f"{'mode':>5} {'size':>8} {'endpoint':>12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'RSS MB':>8}")
+    results = []
+    for size in (int(size) for size in args.sizes.split(',')):
+        for result in run_size(app, size, modes, args.requests, args.workers):
+            results.append(result)
+            print(f"{result['mode']:>5} {size:>8} {result['endpoint']:>12} {result['rps']:>8.0f} "
+                  f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                  f"{result['peak_rss_mb']:>8.0f}")
+
+    if args.output:
+        harness.save_results(args.output, results)
+    if args.compare:
+        print(f'\nchange from {args.compare}:')
+        for line in harness.compare(harness.load_results(args.compare), results):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
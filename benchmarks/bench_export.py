@@ -0,0 +1,83 @@
+"""
+Benchmark the streaming export against building one JSON payload
+
+The baseline is what a full dump through get_tasks used to cost: every
+task as a dict, then the whole ``jsonify`` body. The export is read from
+/export_tasks chunk by chunk. Peak memory is measured with tracemalloc,
+which slows both sides down equally; times are taken in a separate run
+without it.
+
+Usage: python benchmarks/bench_export.py [--tasks 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HEARTBEAT_URL', '')
+
+from flask import jsonify  # noqa: E402
+
+import app as app_module  # noqa: E402
+
+app = app_module.create_app()
+task_store = app_module.task_store
+
+
+def full_payload():
+    """Yield the one-shot body, timing it like a single-chunk stream"""
+    with app.test_request_context('/get_tasks'):
+        tasks = task_store.get_filtered_tasks('all')
+        yield jsonify({'success': True, 'tasks': tasks, 'total': len(tasks)}).get_data()
+
+
+def streamed():
+    client = app.test_client()
+    response = client.get('/export_tasks', buffered=False)
+    try:
+        yield from response.response
+    finally:
+        response.close()
+
+
+def measure(body):
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in body():
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    return first_byte, time.perf_counter() - start, size
+
+
+def peak_memory(body):
+    tracemalloc.start()
+    for _ in body():
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    task_store.clear()
+    for i in range(args.tasks):
+        task_store.add_task(f'Task description number {i % 5000}')
+
+    print(f"{'endpoint':>16} {'TTFB ms':>10} {'total s':>9} {'MiB out':>9} {'peak MiB':>9}")
+    for name, body in (('jsonify all', full_payload), ('export ndjson', streamed)):
+        first_byte, total, size = measure(body)
+        peak = peak_memory(body)
+        print(f'{name:>16} {first_byte * 1e3:>10.1f} {total:>9.2f} {size / 2**20:>9.1f} {peak / 2**20:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
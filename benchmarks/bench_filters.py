@@ -0,0 +1,93 @@
+"""
+Benchmark filtered reads and counts against the per-request loops
+
+Filtered reads are timed through ``json.dumps`` on both sides, since that
+is what get_tasks pays: the old loops handed back ready-made dicts while
+the store builds them for the selected rows only. The ``json`` rows time
+``get_filtered_json``, which writes the same text without the dicts.
+
+Usage: python benchmarks/bench_filters.py [--sizes 1000 100000 ...]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import TaskStorage  # noqa: E402
+
+
+def loop_filter(tasks, filter_type):
+    """The filter loop index() and get_tasks() ran on every request"""
+    filtered_tasks = []
+    for task in tasks:
+        if (
+            filter_type == 'all'
+            or (filter_type == 'active' and not task['completed'])
+            or (filter_type == 'completed' and task['completed'])
+        ):
+            filtered_tasks.append(task)
+    return filtered_tasks
+
+
+def loop_count(tasks):
+    """The old TaskStorage.get_task_count scan"""
+    total = len(tasks)
+    completed = sum(1 for task in tasks if task['completed'])
+    return {'total': total, 'active': total - completed, 'completed': completed}
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--completed-ratio', type=float, default=0.05,
+                        help='share of tasks marked completed')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>10} {'query':>15} {'loop us':>12} {'store us':>12} {'speedup':>8}")
+    for size in args.sizes:
+        store = TaskStorage()
+        for i in range(size):
+            store.add_task(f'Task {i}')
+        step = max(1, round(1 / args.completed_ratio)) if args.completed_ratio else 0
+        if step:
+            for task_id in range(1, size + 1, step):
+                store.toggle_task(task_id)
+        tasks = store.get_all_tasks()
+
+        cases = [
+            ('active',
+             lambda: json.dumps(loop_filter(tasks, 'active')),
+             lambda: json.dumps(store.get_filtered_tasks('active'))),
+            ('completed',
+             lambda: json.dumps(loop_filter(tasks, 'completed')),
+             lambda: json.dumps(store.get_filtered_tasks('completed'))),
+            ('active json',
+             lambda: json.dumps(loop_filter(tasks, 'active')),
+             lambda: store.get_filtered_json('active')),
+            ('completed json',
+             lambda: json.dumps(loop_filter(tasks, 'completed')),
+             lambda: store.get_filtered_json('completed')),
+            ('counts', lambda: loop_count(tasks), store.get_task_count),
+        ]
+        for name, loop, indexed in cases:
+            loop_us = best_of(loop, args.repeat)
+            store_us = best_of(indexed, args.repeat)
+            print(f'{size:>10} {name:>15} {loop_us:>12.1f} {store_us:>12.1f} {loop_us / store_us:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark index render throughput with and without the fragment cache
+
+Requests / through the Flask test client with a store of --tasks tasks,
+once with the task-list cache disabled (budget 0) and once with it warm.
+Each request sends no If-None-Match, so the page itself is always
+rendered; only the task list can come from the cache. The rate limit is
+lifted for the run.
+
+Usage: python benchmarks/bench_fragment_cache.py [--tasks 10000] [--limit 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HEARTBEAT_URL', '')
+
+import app as app_module  # noqa: E402
+from fragment_cache import FragmentCache  # noqa: E402
+from security import RateLimiter  # noqa: E402
+
+
+def renders_per_second(client, url, requests):
+    client.get(url)  # warm up (and fill the cache when enabled)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(url)
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=10_000)
+    parser.add_argument('--limit', type=int, default=200, help='tasks per page')
+    parser.add_argument('--requests', type=int, default=1_000)
+    args = parser.parse_args()
+
+    app = app_module.create_app()
+    app_module.rate_limiter = RateLimiter(max_requests=10 ** 9)
+    app.logger.disabled = True
+    store = app_module.task_store
+    store.clear()
+    store.add_tasks([f'Task {i}' for i in range(args.tasks)])
+    client = app.test_client()
+    url = f'/?limit={args.limit}'
+
+    app_module.task_fragments = FragmentCache(max_bytes=0)
+    uncached = renders_per_second(client, url, args.requests)
+    app_module.task_fragments = FragmentCache()
+    cached = renders_per_second(client, url, args.requests)
+
+    print(f"{'tasks':>8} {'page':>6} {'uncached req/s':>15} {'cached req/s':>13} {'speedup':>8}")
+    print(f'{args.tasks:>8} {args.limit:>6} {uncached:>15.0f} {cached:>13.0f} {cached / uncached:>7.1f}x')
+    print('cache stats:', app_module.task_fragments.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark add/toggle throughput under each logging configuration
+
+Drives /add_task and /toggle_task/<id> through the Flask test client with
+logging written to a temporary file: DEBUG on the request thread (the
+development default) against INFO handed to a listener thread, in text
+and JSON. CSRF checks and the rate limit are lifted for the run.
+
+Usage: python benchmarks/bench_logging.py [--requests 5000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HEARTBEAT_URL', '')
+
+import app as app_module  # noqa: E402
+from logging_config import configure_logging, shutdown_logging  # noqa: E402
+from security import RateLimiter  # noqa: E402
+
+CONFIGS = [
+    ('DEBUG text sync', dict(level='DEBUG', fmt='text', queued=False)),
+    ('INFO text queued', dict(level='INFO', fmt='text', queued=True)),
+    ('INFO json queued', dict(level='INFO', fmt='json', queued=True)),
+]
+
+
+def run(client, store, requests):
+    store.clear()
+    start = time.perf_counter()
+    for i in range(requests):
+        client.post('/add_task', data={'description': f'Task {i}'})
+    added = time.perf_counter() - start
+    ids = [task['id'] for task in store.get_all_tasks()]
+    start = time.perf_counter()
+    for task_id in ids:
+        client.post(f'/toggle_task/{task_id}', data={'csrf_token': 'bench'})
+    toggled = time.perf_counter() - start
+    return requests / added, len(ids) / toggled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = app_module.create_app({'WTF_CSRF_ENABLED': False})
+    app_module.rate_limiter = RateLimiter(max_requests=10 ** 9)
+    # No cookie jar: unfollowed redirects would pile their flash messages into the session
+    client = app.test_client(use_cookies=False)
+
+    print(f"{'logging':>18} {'add/s':>10} {'toggle/s':>10}")
+    for name, config in CONFIGS:
+        with tempfile.TemporaryFile('w') as stream:
+            configure_logging(stream=stream, **config)
+            add_rate, toggle_rate = run(client, app_module.task_store, args.requests)
+            shutdown_logging()
+        print(f'{name:>18} {add_rate:>10.0f} {toggle_rate:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Measure per-task memory of TaskStorage against the old list of dicts
+
+Both sides are built under tracemalloc with the same descriptions, which
+are drawn from a pool of ``--distinct`` phrases (real task lists repeat
+themselves: "Buy milk", "Standup notes", ...).
+
+Usage: python benchmarks/bench_memory.py [--tasks 1000000] [--distinct 5000]
+"""
+
+import argparse
+import gc
+import html
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import TaskStorage  # noqa: E402
+
+
+def descriptions(count, distinct):
+    """Fresh string objects per task, as request parsing would produce"""
+    for i in range(count):
+        yield html.escape(f'Task description number {i % distinct}')
+
+
+def build_dicts(count, distinct):
+    """What app.py kept before TaskStorage: one 5-key dict per task"""
+    tasks = []
+    for task_id, description in enumerate(descriptions(count, distinct), 1):
+        tasks.append({
+            'id': task_id,
+            'description': description,
+            'completed': False,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        })
+    return tasks
+
+
+def build_store(count, distinct):
+    store = TaskStorage()
+    for description in descriptions(count, distinct):
+        store.add_task(description)
+    return store
+
+
+def traced_size(builder, count, distinct):
+    gc.collect()
+    tracemalloc.start()
+    result = builder(count, distinct)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=1_000_000)
+    parser.add_argument('--distinct', type=int, default=5_000,
+                        help='number of distinct descriptions')
+    args = parser.parse_args()
+
+    dict_bytes, _ = traced_size(build_dicts, args.tasks, args.distinct)
+    store_bytes, store_peak = traced_size(build_store, args.tasks, args.distinct)
+
+    print(f'tasks:            {args.tasks}')
+    print(f'list of dicts:    {dict_bytes / 2**20:8.1f} MiB  ({dict_bytes / args.tasks:6.1f} B/task)')
+    print(f'TaskStorage:      {store_bytes / 2**20:8.1f} MiB  ({store_bytes / args.tasks:6.1f} B/task, '
+          f'peak {store_peak / 2**20:.1f} MiB)')
+    print(f'reduction:        {dict_bytes / store_bytes:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark deep-page latency of keyset pages against offset slicing
+
+Offset paging has to produce every task before the page and slice them
+off, so page k costs k times the page size. ``get_page`` bisects the ID
+column to the cursor and only builds the page itself. Both sides are
+timed through ``json.dumps``, as get_tasks serves them.
+
+Usage: python benchmarks/bench_pagination.py [--tasks 1000000] [--limit 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import TaskStorage  # noqa: E402
+
+
+def offset_page(store, filter_type, page, limit):
+    """Paging without a cursor: filter everything, then slice"""
+    start = page * limit
+    return store.get_filtered_tasks(filter_type)[start:start + limit]
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=1_000_000)
+    parser.add_argument('--limit', type=int, default=50, help='page size')
+    parser.add_argument('--completed-ratio', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    store = TaskStorage()
+    for i in range(args.tasks):
+        store.add_task(f'Task {i}')
+    step = max(1, round(1 / args.completed_ratio)) if args.completed_ratio else 0
+    if step:
+        for task_id in range(1, args.tasks + 1, step):
+            store.toggle_task(task_id)
+
+    print(f"{'filter':>10} {'page':>8} {'offset us':>12} {'cursor us':>12} {'speedup':>8}")
+    for filter_type in ('all', 'active', 'completed'):
+        matching = store.get_task_count()['total' if filter_type == 'all' else filter_type]
+        last_page = max(0, (matching - 1) // args.limit)
+        for page in sorted({0, last_page // 100, last_page // 2, last_page}):
+            # The cursor for page k is the last ID on page k - 1
+            previous = offset_page(store, filter_type, page - 1, args.limit) if page else []
+            after_id = previous[-1]['id'] if previous else 0
+            offset_us = best_of(lambda: json.dumps(offset_page(store, filter_type, page, args.limit)), args.repeat)
+            cursor_us = best_of(lambda: json.dumps(store.get_page(filter_type, after_id, args.limit)[0]), args.repeat)
+            print(f'{filter_type:>10} {page:>8} {offset_us:>12.0f} {cursor_us:>12.1f} {offset_us / cursor_us:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
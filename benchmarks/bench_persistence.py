@@ -0,0 +1,120 @@
+"""
+Benchmark journaled write throughput and cold start time
+
+Write throughput runs concurrent writer threads through TaskJournal's
+group commit and through a naive write+fsync per record for comparison.
+Cold start loads a snapshot of ``--tasks`` tasks plus a log tail.
+
+Usage: python benchmarks/bench_persistence.py [--tasks 1000000] [--threads 1 8 32]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import TaskStorage  # noqa: E402
+from persistence import TaskJournal, encode_record  # noqa: E402
+
+
+class FsyncPerRecordJournal:
+    """Baseline: every write pays its own write and fsync"""
+
+    def __init__(self, path):
+        self._file = open(path, 'ab', buffering=0)
+        self._lock = threading.Lock()
+
+    def write(self, store, record):
+        with self._lock:
+            row = store.apply_record(record)
+            self._file.write(encode_record(record))
+            os.fsync(self._file.fileno())
+        return row, None
+
+    def close(self):
+        self._file.close()
+
+
+def run_writers(store, threads, ops_per_thread):
+    # Each thread toggles its own tasks, so no two threads touch one row
+    def writer(first):
+        for task_id in range(first, first + ops_per_thread):
+            store.toggle_task(task_id)
+
+    workers = [threading.Thread(target=writer, args=(1 + i * ops_per_thread,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * ops_per_thread / (time.perf_counter() - start)
+
+
+def bench_writes(thread_counts, ops):
+    print(f"{'threads':>8} {'group commit ops/s':>19} {'fsync/record ops/s':>19}")
+    for threads in thread_counts:
+        per_thread = max(1, ops // threads)
+        rates = []
+        for mode in ('group', 'naive'):
+            with tempfile.TemporaryDirectory() as tmp:
+                store = TaskStorage()
+                if mode == 'group':
+                    journal = TaskJournal(tmp, snapshot_every=10 ** 9)
+                    journal.load(store)
+                else:
+                    journal = FsyncPerRecordJournal(os.path.join(tmp, 'ops.log'))
+                # Seed without logging; only the timed toggles go through the journal
+                now = time.time()
+                for i in range(threads * per_thread):
+                    store.apply_record((store.ADD, i + 1, f'Task {i}', now))
+                store.journal = journal
+                rates.append(run_writers(store, threads, per_thread))
+                journal.close()
+        print(f'{threads:>8} {rates[0]:>19.0f} {rates[1]:>19.0f}')
+
+
+def bench_cold_start(tasks, tail):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TaskStorage()
+        journal = TaskJournal(tmp, snapshot_every=10 ** 9, wait_durable=False)
+        journal.load(store)
+        now = time.time()
+        for i in range(tasks):
+            store.apply_record((store.ADD, i + 1, f'Task description number {i % 5000}', now))
+        start = time.perf_counter()
+        journal.checkpoint(store)
+        snapshot_time = time.perf_counter() - start
+        for task_id in range(1, tail + 1):
+            store.toggle_task(task_id)
+        journal.close()
+
+        start = time.perf_counter()
+        restored = TaskStorage()
+        journal = TaskJournal(tmp)
+        journal.load(restored)
+        load_time = time.perf_counter() - start
+        journal.close()
+        size = os.path.getsize(os.path.join(tmp, 'snapshot'))
+        print(f'snapshot of {tasks} tasks: {size / 2**20:.1f} MiB written in {snapshot_time:.2f}s')
+        print(f'cold start (snapshot + {tail} record tail): {load_time:.2f}s, {len(restored)} tasks')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=1_000_000)
+    parser.add_argument('--tail', type=int, default=100_000, help='log records after the snapshot')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--ops', type=int, default=4_000, help='writes per thread count')
+    args = parser.parse_args()
+
+    bench_writes(args.threads, args.ops)
+    print()
+    bench_cold_start(args.tasks, args.tail)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark RateLimiter CPU and memory with many distinct client IPs
+
+Usage: python benchmarks/bench_rate_limiter.py [--clients 100000] [--requests 50]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security import RateLimiter  # noqa: E402
+
+
+class TimestampLogRateLimiter:
+    """The previous limiter: one timestamp per request per IP, never evicted"""
+
+    def __init__(self, max_requests=100, time_window=3600):
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.requests = defaultdict(list)
+
+    def is_allowed(self, client_ip):
+        now = time.time()
+        client_requests = self.requests[client_ip]
+        client_requests[:] = [req_time for req_time in client_requests if now - req_time < self.time_window]
+        if len(client_requests) >= self.max_requests:
+            return False
+        client_requests.append(now)
+        return True
+
+
+def run(limiter, ips, rounds):
+    is_allowed = limiter.is_allowed
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for ip in ips:
+            is_allowed(ip)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / (rounds * len(ips)) * 1e9, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=100_000)
+    parser.add_argument('--requests', type=int, default=50, help='requests per client')
+    args = parser.parse_args()
+
+    ips = [f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}' for i in range(args.clients)]
+    print(f'{args.clients} clients x {args.requests} requests')
+    print(f"{'limiter':>24} {'ns/request':>11} {'MiB':>8} {'B/client':>9}")
+    limiters = [
+        ('timestamp log (old)', TimestampLogRateLimiter()),
+        ('sliding window counter', RateLimiter(max_clients=args.clients)),
+    ]
+    for name, limiter in limiters:
+        ns, size = run(limiter, ips, args.requests)
+        print(f'{name:>24} {ns:>11.0f} {size / 2**20:>8.1f} {size / args.clients:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark rate limit enforcement across worker processes
+
+Each worker process builds its own RateLimiter on the given backend and
+hammers the same client IPs, as gunicorn workers would. The allowed counts
+are summed per IP afterwards: a shared backend must admit exactly
+``--limit`` requests per IP, while the per-process memory backend admits
+up to workers x limit.
+
+Usage: python benchmarks/bench_rate_limiter_mp.py [--workers 8] [--redis-url redis://...]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit_backends import create_backend  # noqa: E402
+from security import RateLimiter  # noqa: E402
+
+
+def worker(backend_url, limit, ips, rounds, start_event, results):
+    limiter = RateLimiter(max_requests=limit, backend=create_backend(backend_url))
+    allowed = Counter()
+    start_event.wait()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for ip in ips:
+            if limiter.is_allowed(ip):
+                allowed[ip] += 1
+    results.put((dict(allowed), time.perf_counter() - start))
+
+
+def run(backend_url, workers, limit, ips, rounds):
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(backend_url, limit, ips, rounds, start_event, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    wall_start = time.perf_counter()
+    start_event.set()
+    allowed = Counter()
+    for _ in processes:
+        counts, _ = results.get()
+        allowed.update(counts)
+    wall = time.perf_counter() - wall_start
+    for process in processes:
+        process.join()
+    requests = workers * rounds * len(ips)
+    return requests / wall, min(allowed.values()), max(allowed.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=50, help='requests per client per worker')
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--redis-url', help='also run against this Redis server')
+    args = parser.parse_args()
+
+    ips = [f'10.0.{i // 256}.{i % 256}' for i in range(args.clients)]
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [('memory', 'memory'), ('sqlite', f'sqlite:///{tmp}/limits.db')]
+        if args.redis_url:
+            backends.append(('redis', args.redis_url))
+
+        print(f'{args.workers} workers, {args.clients} clients, '
+              f'{args.workers * args.rounds} attempts per client, limit {args.limit}')
+        print(f"{'backend':>8} {'req/s':>10} {'allowed/client':>16} {'enforced':>9}")
+        for name, url in backends:
+            rate, low, high = run(url, args.workers, args.limit, ips, args.rounds)
+            enforced = 'yes' if low == high == args.limit else 'no'
+            allowed = str(low) if low == high else f'{low}-{high}'
+            print(f'{name:>8} {rate:>10.0f} {allowed:>16} {enforced:>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark startup and throughput of serve.py at several worker counts
+
+For each worker count, starts serve.py against a seeded SQLite store
+(DATABASE_URL, so that workers share the tasks) and records the time
+until the first response and until every worker has finished its
+warm-up, then drives /get_tasks and /toggle_task/<id> over
+--concurrency connections with the endpoint harness. Prints those times,
+requests per second and p99 latency, and the summed proportional set
+size (PSS) of the master and its workers, which counts the pages they
+share copy-on-write once. The rate limit and CSRF checks are lifted.
+Linux only (PSS is read from /proc).
+
+Usage: python benchmarks/bench_serve.py [--workers 1,4,8] [--threads 4]
+           [--tasks 10000] [--requests 4000] [--concurrency 16]
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import harness  # noqa: E402
+
+# Runs in the server process: serve.py preloads the app prepared here
+BOOT = """
+import app as app_module
+from benchmarks import harness
+harness.prepare_app(app_module)
+import serve
+serve.main()
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def pss_mb(pid):
+    """PSS of a process and its children"""
+    total = 0
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        children = [int(child) for child in f.read().split()]
+    for process in [pid] + children:
+        with open(f'/proc/{process}/smaps_rollup') as f:
+            total += next(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+    return total / 1024
+
+
+def start_server(workers, threads, port, env):
+    """Start serve.py; return the process and its (first response, all warm) times"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', BOOT, '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+                                '--threads', str(threads)], cwd=ROOT, env=env, stderr=subprocess.PIPE, text=True)
+    warm = threading.Event()
+    warmed = []
+
+    def read_log():
+        for line in process.stderr:
+            if 'warmed up' in line:
+                warmed.append(line)
+                if len(warmed) == workers:
+                    warm.set()
+
+    threading.Thread(target=read_log, daemon=True).start()
+    first_response = None
+    while first_response is None:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/get_tasks', timeout=5).read()
+            first_response = time.perf_counter() - started
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("serve.py exited during startup")
+            time.sleep(0.01)
+    if not warm.wait(120):
+        raise RuntimeError("workers did not finish warming up")
+    return process, first_response, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='1,4,8')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    from sql_storage import SQLTaskStorage
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{tmp}/tasks.db'
+        store = SQLTaskStorage(url)
+        ids = harness.seed_store(store, args.tasks)
+        store.close()
+        env = dict(os.environ, DATABASE_URL=url, LOG_LEVEL='INFO', HEARTBEAT_URL='')
+
+        print(f"{'workers':>7} {'first s':>8} {'warm s':>7} {'endpoint':>12} {'req/s':>8} {'p99 ms':>8} "
+              f"{'PSS MB':>8}")
+        for workers in (int(workers) for workers in args.workers.split(',')):
+            port = free_port()
+            process, first_response, all_warm = start_server(workers, args.threads, port, env)
+            try:
+                for endpoint in ('get_tasks', 'toggle_task'):
+                    plan = harness.request_plan(endpoint, ids, args.requests)
+                    stats = harness.run_http(port, plan, args.concurrency)
+                    print(f"{workers:>7} {first_response:>8.2f} {all_warm:>7.2f} {endpoint:>12} {stats['rps']:>8.0f} "
+                          f"{stats['p99_ms']:>8.2f} {pss_mb(process.pid):>8.0f}")
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.wait(60)
+
+
+if __name__ == '__main__':
+    main()
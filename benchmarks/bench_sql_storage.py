@@ -0,0 +1,88 @@
+"""
+Compare in-memory and database-backed task storage under concurrent clients
+
+Each client thread runs a mix of lookups, toggles and filtered reads
+against a store seeded with ``--tasks`` tasks, and per-operation latency
+is collected across all clients.
+
+Usage: python benchmarks/bench_sql_storage.py [--tasks 10000] [--clients 1 8 32]
+                                              [--database-url mysql+pymysql://...]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import TaskStorage  # noqa: E402
+from sql_storage import SQLTaskStorage  # noqa: E402
+
+
+def client(store, tasks, ops, seed, latencies):
+    rng = random.Random(seed)
+    local = []
+    for i in range(ops):
+        task_id = rng.randint(1, tasks)
+        start = time.perf_counter()
+        if i % 10 == 0:
+            store.get_filtered_tasks('completed')
+        elif i % 2:
+            store.toggle_task(task_id)
+        else:
+            store.get_task(task_id)
+        local.append(time.perf_counter() - start)
+    latencies.extend(local)
+
+
+def run(store, tasks, clients, ops):
+    latencies = []
+    threads = [threading.Thread(target=client, args=(store, tasks, ops, i, latencies)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100)
+    return len(latencies) / elapsed, quantiles[49] * 1e3, quantiles[98] * 1e3
+
+
+def seed(store, tasks):
+    for i in range(tasks):
+        store.add_task(f'Task {i}')
+    for task_id in range(1, tasks + 1, 20):
+        store.toggle_task(task_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=10_000)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--ops', type=int, default=500, help='operations per client')
+    parser.add_argument('--database-url', help='database to test instead of a temporary SQLite file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = [('memory', TaskStorage())]
+        url = args.database_url or f'sqlite:///{tmp}/tasks.db'
+        sql_store = SQLTaskStorage(url, pool_size=max(args.clients), max_overflow=0)
+        sql_store.clear()
+        stores.append((url.split(':', 1)[0], sql_store))
+
+        print(f"{'store':>10} {'clients':>8} {'ops/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, store in stores:
+            seed(store, args.tasks)
+            for clients in args.clients:
+                rate, p50, p99 = run(store, args.tasks, clients, args.ops)
+                print(f'{name:>10} {clients:>8} {rate:>10.0f} {p50:>8.3f} {p99:>8.3f}')
+        sql_store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark task lookups in TaskStorage against the old linear scan
+
+Usage: python benchmarks/bench_store.py [--sizes 1000 10000 ...]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import TaskStorage  # noqa: E402
+
+
+def linear_find(tasks, task_id):
+    """The lookup app.py used before TaskStorage: walk the list"""
+    for task in tasks:
+        if task['id'] == task_id:
+            return task
+    return None
+
+
+def time_per_op(func, ids):
+    start = time.perf_counter()
+    for task_id in ids:
+        func(task_id)
+    return (time.perf_counter() - start) / len(ids) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--lookups', type=int, default=100_000)
+    parser.add_argument('--scan-limit', type=int, default=100_000,
+                        help='skip the linear scan above this size')
+    args = parser.parse_args()
+
+    print(f"{'tasks':>10} {'get ns/op':>10} {'toggle ns/op':>13} {'delete ns/op':>13} {'scan ns/op':>12}")
+    for size in args.sizes:
+        store = TaskStorage()
+        for i in range(size):
+            store.add_task(f'Task {i}')
+        rng = random.Random(size)
+        ids = [rng.randint(1, size) for _ in range(args.lookups)]
+
+        get_ns = time_per_op(store.get_task, ids)
+        toggle_ns = time_per_op(store.toggle_task, ids)
+        delete_ids = rng.sample(range(1, size + 1), min(size // 2, args.lookups))
+        delete_ns = time_per_op(store.delete_task, delete_ids)
+
+        scan = '-'
+        if size <= args.scan_limit:
+            tasks = [{'id': i + 1} for i in range(size)]
+            scan_ids = ids[:max(1, args.lookups * 1000 // size)]
+            scan = f'{time_per_op(lambda task_id: linear_find(tasks, task_id), scan_ids):.0f}'
+        print(f'{size:>10} {get_ns:>10.0f} {toggle_ns:>13.0f} {delete_ns:>13.0f} {scan:>12}')
+
+
+if __name__ == '__main__':
+    main()
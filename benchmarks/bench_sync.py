@@ -0,0 +1,63 @@
+"""
+Benchmark delta syncs against store size and delta size
+
+For each store size, takes a version, makes ``delta`` writes spread over
+the store (two thirds toggles, one third deletes) and times
+``changes_since`` from that version through ``json.dumps``, as
+/get_tasks?since= serves it. A full reload (every task, serialized) is
+timed alongside for comparison. The delta cost should track the number
+of writes, not the number of tasks. Deltas longer than the store's change
+feed are answered with a resync, shown as such.
+
+Usage: python benchmarks/bench_sync.py [--sizes 10000,100000,1000000]
+           [--deltas 10,100,1000,10000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import TaskStorage  # noqa: E402
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--deltas', default='10,100,1000,10000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8} {'delta':>6} {'since us':>10} {'us/write':>9} {'full us':>12}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        for delta in (int(delta) for delta in args.deltas.split(',')):
+            if delta > size:
+                continue
+            store = TaskStorage()
+            ids = [task['id'] for task in store.add_tasks([f'Task {i}' for i in range(size)])]
+            version = store.version
+            touched = ids[::size // delta][:delta]
+            store.toggle_tasks(touched[:delta * 2 // 3])
+            store.delete_tasks(touched[delta * 2 // 3:])
+            full_us = best_of(lambda: json.dumps(store.get_all_tasks()), 1)
+            if store.changes_since(version) is None:
+                print(f'{size:>8} {delta:>6} {"resync":>10} {"":>9} {full_us:>12.0f}')
+                continue
+            since_us = best_of(lambda: json.dumps(store.changes_since(version)), args.repeat)
+            print(f'{size:>8} {delta:>6} {since_us:>10.0f} {since_us / delta:>9.2f} {full_us:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark description validation against the per-pattern loop
+
+Times TaskValidator.validate_description and the loop it replaced (a
+``re.search`` per uncompiled pattern string) over benign descriptions,
+attacks the rules reject, and inputs built to make the old patterns
+backtrack. Backtracking inputs are also run at --long characters through
+the rule engine directly, past the 500 character limit that would
+otherwise reject them before any pattern runs.
+
+Usage: python benchmarks/bench_validators.py [--repeat 2000]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validators import CONTROL_CHARS_PATTERN, DANGEROUS_PATTERNS, DESCRIPTION_RULES, TaskValidator  # noqa: E402
+
+
+def pattern_loop(description):
+    """validate_description before the rule engine"""
+    if not isinstance(description, str):
+        return False
+    if len(description.strip()) < 1 or len(description) > 500:
+        return False
+    if re.search(CONTROL_CHARS_PATTERN, description):
+        return False
+    description_lower = description.lower()
+    for pattern in DANGEROUS_PATTERNS:
+        if re.search(pattern, description_lower):
+            return False
+    return True
+
+
+def loop_rules(text):
+    """The same pattern loop without the length check, for long inputs"""
+    return not any(re.search(pattern, text) for pattern in DANGEROUS_PATTERNS)
+
+
+CASES = {
+    'benign short': 'Buy milk',
+    'benign sentence': 'Call the plumber about the kitchen sink, then pick up the kids at 5pm',
+    'benign 480 chars': ('Review the quarterly report, reply to the team, update the roadmap. ' * 8)[:480],
+    'benign with colon': 'Note: renew passport before the trip to Osaka next month',
+    'script tag': 'hello <script>alert(document.cookie)</script>',
+    'event handler': '<img src=x onerror=alert(1)>',
+    'javascript url': 'click javascript:alert(1)',
+}
+
+BACKTRACKING = {
+    'on-words, no "="': lambda n: 'on' * (n // 2),
+    'on-words then "!="': lambda n: 'on' * (n // 2 - 1) + '!=',
+    'unclosed <script>': lambda n: '<script>' * (n // 8),
+    'open tag, no ">"': lambda n: '<script ' + 'a' * (n - 8),
+}
+
+
+def time_us(func, value, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(value)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2_000)
+    parser.add_argument('--long', type=int, default=20_000, help='length of the long backtracking inputs')
+    args = parser.parse_args()
+
+    print(f"{'input':>24} {'loop us':>10} {'engine us':>10} {'speedup':>8}")
+    inputs = dict(CASES)
+    inputs.update({f'{name} (500)': build(500) for name, build in BACKTRACKING.items()})
+    for name, value in inputs.items():
+        assert pattern_loop(value) == TaskValidator.validate_description(value), name
+        loop = time_us(pattern_loop, value, args.repeat)
+        engine = time_us(TaskValidator.validate_description, value, args.repeat)
+        print(f'{name:>24} {loop:>10.2f} {engine:>10.2f} {loop / engine:>7.1f}x')
+
+    print(f'\nrules only, {args.long} character inputs')
+    for name, build in BACKTRACKING.items():
+        value = build(args.long)
+        assert loop_rules(value) == (DESCRIPTION_RULES.first_match(value) is None), name
+        loop = time_us(loop_rules, value, 3)
+        engine = time_us(DESCRIPTION_RULES.first_match, value, 3)
+        print(f'{name:>24} {loop:>10.0f} {engine:>10.0f} {loop / engine:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Endpoint load-testing harness
+
+Shared by benchmarks/bench_endpoints.py and the budget tests. Each
+scenario is one endpoint driven ``requests`` times against a store seeded
+with ``size`` tasks, either in-process through the WSGI test client or
+over real sockets against a threaded server in a child process, with
+``workers`` concurrent keep-alive connections. A run reports p50/p95/p99
+latency, requests per second and peak RSS.
+
+Nothing here imports the app: callers pass it in, after pointing it at
+whatever store they want measured.
+"""
+
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+ENDPOINTS = ('index', 'get_tasks', 'add_task', 'toggle_task', 'delete_task')
+
+
+def prepare_app(app_module):
+    """Build the app with the rate limit and CSRF checks lifted and the request log silenced
+
+    Later ``create_app()`` calls (asgi.py, serve.py) get the same app.
+    """
+    from security import RateLimiter
+
+    app = app_module.create_app({'WTF_CSRF_ENABLED': False})
+    app_module.rate_limiter = RateLimiter(max_requests=10 ** 9)
+    app.logger.disabled = True
+    app_module.create_app = lambda config=None: app
+    return app
+
+
+def seed_store(store, size: int, batch: int = 10000) -> List[int]:
+    """Empty ``store`` and add ``size`` tasks, a third of them completed"""
+    store.clear()
+    ids = []
+    for start in range(0, size, batch):
+        count = min(batch, size - start)
+        ids.extend(task['id'] for task in store.add_tasks([f'Task {start + i}' for i in range(count)]))
+    store.toggle_tasks(ids[::3], completed=True)
+    return ids
+
+
+def request_plan(endpoint: str, ids: List[int], requests: int):
+    """(method, path, form body) for each request of a scenario
+
+    Toggles cycle through the seeded IDs; deletes remove distinct ones,
+    so at most ``len(ids)`` of them are planned. With CSRF checks off the
+    AJAX routes still want a token field present.
+    """
+    if endpoint == 'index':
+        return [('GET', '/', None)] * requests
+    if endpoint == 'get_tasks':
+        return [('GET', '/get_tasks', None)] * requests
+    if endpoint == 'add_task':
+        return [('POST', '/add_task', f'description=Load+test+{i}') for i in range(requests)]
+    if endpoint == 'toggle_task':
+        return [('POST', f'/toggle_task/{ids[i % len(ids)]}', 'csrf_token=bench') for i in range(requests)]
+    if endpoint == 'delete_task':
+        step = max(1, len(ids) // requests)
+        return [('POST', f'/delete_task/{task_id}', 'csrf_token=bench') for task_id in ids[::step][:requests]]
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict:
+    """Latency percentiles (nearest rank, in ms) and throughput"""
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] * 1000
+
+    return {
+        'requests': len(ordered),
+        'rps': len(ordered) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+    }
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    """Peak resident set size so far; ru_maxrss is KiB on Linux, bytes on macOS"""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_wsgi(app, plan) -> Dict:
+    """Send ``plan`` through the test client, one request at a time"""
+    # No cookie jar: unfollowed redirects would pile their flash messages into the session
+    client = app.test_client(use_cookies=False)
+    form = {'content_type': 'application/x-www-form-urlencoded'}
+    latencies = []
+    started = time.perf_counter()
+    for method, path, body in plan:
+        start = time.perf_counter()
+        if method == 'GET':
+            response = client.get(path)
+        else:
+            response = client.post(path, data=body, **form)
+        latencies.append(time.perf_counter() - start)
+        _check(response.status_code, method, path)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def run_http(port: int, plan, workers: int) -> Dict:
+    """Send ``plan`` over ``workers`` concurrent keep-alive connections"""
+    latencies: List[float] = []
+    errors: List[BaseException] = []
+    lock = threading.Lock()
+
+    def worker(share):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        mine = []
+        try:
+            for method, path, body in share:
+                start = time.perf_counter()
+                conn.request(method, path, body=body, headers=headers if body is not None else {})
+                response = conn.getresponse()
+                response.read()
+                mine.append(time.perf_counter() - start)
+                _check(response.status, method, path)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            conn.close()
+            with lock:
+                latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker, args=(plan[i::workers],)) for i in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return summarize(latencies, elapsed)
+
+
+class ServerProcess:
+    """The app behind a threaded HTTP/1.1 server in a forked child
+
+    ``seed`` runs in the child before it starts listening, so the seeded
+    store lives (and is measured) there. With ``asgi`` the child serves
+    asgi.application with uvicorn (requirements.txt) instead. ``stop`` returns the child's
+    peak RSS in MB; ``pid`` is there for sampling it while it runs.
+    """
+
+    def __init__(self, app_module, seed=None, asgi=False):
+        context = multiprocessing.get_context('fork')
+        self._ready = context.Queue()
+        self._stop = context.Event()
+        target = self._serve_asgi if asgi else self._serve
+        self._process = context.Process(target=target, args=(app_module, seed), daemon=True)
+        self._process.start()
+        self.pid = self._process.pid
+        self.port, self.ids = self._ready.get(timeout=600)
+
+    def stop(self) -> float:
+        self._stop.set()
+        rss = self._ready.get(timeout=60)
+        self._process.join()
+        return rss
+
+    def _serve(self, app_module, seed):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        ids = seed(app_module) if seed is not None else []
+        logging.getLogger('werkzeug').disabled = True
+        WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+        server = make_server('127.0.0.1', 0, app_module.create_app(), threaded=True)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self._ready.put((server.server_port, ids))
+        self._stop.wait()
+        server.shutdown()
+        self._ready.put(peak_rss_mb())
+
+    def _serve_asgi(self, app_module, seed):
+        import socket
+
+        import uvicorn
+
+        import asgi
+
+        ids = seed(app_module) if seed is not None else []
+        # An explicit IPPROTO_TCP, or asyncio does not set TCP_NODELAY on accepted sockets
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(4096)
+        # No log_config: uvicorn's would re-enable the loggers prepare_app turned off
+        server = uvicorn.Server(uvicorn.Config(asgi.application, log_config=None, access_log=False,
+                                               lifespan='off'))
+        # Not the main thread, so uvicorn leaves the signal handlers alone
+        thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+        thread.start()
+        self._ready.put((sock.getsockname()[1], ids))
+        self._stop.wait()
+        server.should_exit = True
+        thread.join(timeout=30)
+        self._ready.put(peak_rss_mb())
+
+
+def environment() -> Dict:
+    """Where a run happened, saved alongside its results"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def save_results(path: str, results: List[Dict]):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+def load_results(path: str) -> List[Dict]:
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare(baseline: List[Dict], results: List[Dict]) -> List[str]:
+    """One line per scenario present in both runs: rps and p95 change"""
+    key = lambda result: (result['mode'], result['size'], result['endpoint'])  # noqa: E731
+    before = {key(result): result for result in baseline}
+    lines = []
+    for result in results:
+        old: Optional[Dict] = before.get(key(result))
+        if old is None or not old['rps'] or not old['p95_ms']:
+            continue
+        lines.append(f"{result['mode']:>5} {result['size']:>8} {result['endpoint']:>12} "
+                     f"rps {result['rps'] / old['rps'] - 1:>+7.1%}  p95 {result['p95_ms'] / old['p95_ms'] - 1:>+7.1%}")
+    return lines
+
+
+def _check(status: int, method: str, path: str):
+    if status >= 400:
+        raise RuntimeError(f"{method} {path} returned {status}")
@@ -0,0 +1,327 @@
+"""
+Change feed for TaskStorage
+
+Every write record the store applies is kept, keyed by the store version
+it produced, in a fixed-size ring buffer. Versions go up by one per
+record, so the slot of a version is ``version % capacity`` and a reader
+that last saw version ``v`` gets everything after it in one slice, or
+learns that the buffer no longer reaches back that far and it has to
+resync from a full listing.
+
+Recording a change costs one slot assignment under the store's write
+lock. Turning records into the events clients see (``event_for``) is
+left to the readers.
+
+``iter_sse`` streams a store's changes as Server-Sent Events. Event IDs
+are ``<store epoch>.<version>``, so a client reconnecting with
+``Last-Event-ID`` to a restarted server is told to resync rather than
+being matched against unrelated versions. ``aiter_sse`` is the same
+stream for an asyncio server, waiting on the feed without a thread, and
+``EventStream`` offers both. asyncio is only imported once a stream is
+served that way. ``StreamLimit`` caps the streams a threaded server
+holds a thread open for.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+DEFAULT_CAPACITY = 4096
+SSE_RETRY_MS = 3000
+# A client further behind than this reloads the list instead
+MAX_EVENTS_PER_BATCH = 500
+
+
+class ChangeFeed:
+    """Bounded ring buffer of (version, write record) pairs"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._records: List[Optional[tuple]] = [None] * capacity
+        self._latest = 0
+        self._floor = 0  # oldest version a reader can resume from
+        self._cond = threading.Condition()
+        self._waiters = 0
+        # Futures of ``wait_async`` callers, per event loop
+        self._async_waiters = {}
+
+    @property
+    def latest(self) -> int:
+        """Version of the newest change recorded"""
+        return self._latest
+
+    def append(self, version: int, record: tuple):
+        """Record the change that produced ``version``
+
+        Versions must arrive in order; a gap (a write the feed never saw,
+        such as a restore) makes every earlier version unresumable.
+        """
+        if version != self._latest + 1:
+            self._floor = version
+        self._records[version % self.capacity] = record
+        self._latest = version
+        if version - self._floor > self.capacity:
+            self._floor = version - self.capacity
+        self._notify()
+
+    def reset(self, version: int):
+        """Forget everything before ``version`` (e.g. after a restore)"""
+        self._floor = self._latest = version
+        self._notify()
+
+    def since(self, version: int) -> Optional[List[Tuple[int, tuple]]]:
+        """Changes after ``version``, or None if they are no longer all kept"""
+        latest, floor, records = self._latest, self._floor, self._records
+        if version >= latest:
+            return [] if version == latest else None
+        if version < floor:
+            return None
+        changes = [(v, records[v % self.capacity]) for v in range(version + 1, latest + 1)]
+        # Writers may have lapped the slice (or restored) while it was copied
+        if self._floor > version or self._latest - self.capacity > version:
+            return None
+        return changes
+
+    def wait(self, version: int, timeout: float) -> Optional[List[Tuple[int, tuple]]]:
+        """Like ``since``, but block up to ``timeout`` seconds for a change"""
+        changes = self.since(version)
+        if changes != []:
+            return changes
+        with self._cond:
+            self._waiters += 1
+            try:
+                self._cond.wait_for(lambda: self._latest != version, timeout)
+            finally:
+                self._waiters -= 1
+        return self.since(version)
+
+    async def wait_async(self, version: int, timeout: float) -> Optional[List[Tuple[int, tuple]]]:
+        """``wait`` for a coroutine: the event loop is woken once per change,
+        however many streams on it are waiting"""
+        import asyncio
+
+        changes = self.since(version)
+        if changes != []:
+            return changes
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._cond:
+            self._async_waiters.setdefault(loop, set()).add(future)
+        try:
+            if self._latest == version:
+                await asyncio.wait((future,), timeout=timeout)
+        finally:
+            with self._cond:
+                waiting = self._async_waiters.get(loop)
+                if waiting is not None:
+                    waiting.discard(future)
+        return self.since(version)
+
+    def _notify(self):
+        if self._waiters:
+            with self._cond:
+                self._cond.notify_all()
+        if self._async_waiters:
+            with self._cond:
+                loops = [loop for loop, futures in self._async_waiters.items() if futures]
+            for loop in loops:
+                loop.call_soon_threadsafe(self._wake, loop)
+
+    def _wake(self, loop):
+        with self._cond:
+            futures = self._async_waiters.pop(loop, ())
+        for future in futures:
+            if not future.done():
+                future.set_result(None)
+
+
+class EventStream:
+    """An SSE response body that a WSGI server iterates with ``iter_sse``
+    and an ASGI server with ``aiter_sse``"""
+
+    def __init__(self, store, version: Optional[int], heartbeat: float = 15.0, duration: float = 300.0):
+        self.store = store
+        self.version = version
+        self.heartbeat = heartbeat
+        self.duration = duration
+
+    def __iter__(self) -> Iterator[str]:
+        return iter_sse(self.store, self.version, self.heartbeat, self.duration)
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return aiter_sse(self.store, self.version, self.heartbeat, self.duration)
+
+
+class StreamLimit:
+    """Counts the streams served by a thread each, up to ``limit``
+
+    Under WSGI every open stream parks a server thread for its whole
+    duration, so past a few of them ordinary requests queue behind tabs
+    that are only waiting for changes.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Take a slot for a new stream, if one is free"""
+        with self._lock:
+            if self.open >= self.limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+
+def event_for(record: tuple) -> dict:
+    """The client-facing event for a TaskStorage write record"""
+    op = record[0]
+    if op == 'a':
+        _, task_id, description, now = record
+        created_at = datetime.fromtimestamp(now).isoformat()
+        return {'op': 'add', 'task': {'id': task_id, 'description': description, 'completed': False,
+                                      'created_at': created_at, 'updated_at': created_at}}
+    if op == 't':
+        _, task_id, completed, now = record
+        return {'op': 'toggle', 'id': task_id, 'completed': completed,
+                'updated_at': datetime.fromtimestamp(now).isoformat()}
+    if op == 'd':
+        return {'op': 'delete', 'id': record[1]}
+    return {'op': 'resync'}
+
+
+def event_id(store, version: int) -> str:
+    return f'{store.epoch}.{version}'
+
+
+def feed_position(store, value: Optional[str]) -> Optional[int]:
+    """The version an event ID (or ``since`` value) refers to, if it is this store's"""
+    epoch, _, version = (value or '').rpartition('.')
+    if epoch != store.epoch or not version.isascii() or not version.isdigit():
+        return None
+    return int(version)
+
+
+def iter_sse(store, version: Optional[int], heartbeat: float = 15.0, duration: float = 300.0,
+             poll_interval: float = 2.0) -> Iterator[str]:
+    """Server-Sent Events for the changes to ``store`` after ``version``
+
+    Each change is a ``change`` event carrying ``event_for`` data and the
+    version as its ID, and each batch ends with a ``counts`` event. When
+    the changes are no longer all kept (or ``version`` is None) a single
+    ``resync`` event tells the client to reload the list. A comment line
+    goes out every ``heartbeat`` seconds while nothing changes, and the
+    stream ends after ``duration`` seconds; EventSource reconnects and
+    resumes from the last ID it saw.
+
+    Stores without a change feed (SQLTaskStorage) are polled for their
+    version every ``poll_interval`` seconds and only ever resync.
+    """
+    feed = getattr(store, 'changes', None)
+    deadline = time.monotonic() + duration
+    yield f'retry: {SSE_RETRY_MS}\n\n'
+    changes = _first_changes(store, feed, version)
+    while True:
+        text, version = _batch(store, version, changes)
+        if text:
+            yield text
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if feed is not None:
+            changes = feed.wait(version, min(heartbeat, remaining))
+        else:
+            changes = _wait_for_version(store, version, min(heartbeat, remaining), poll_interval)
+        if changes == []:
+            yield ': keepalive\n\n'
+
+
+async def aiter_sse(store, version: Optional[int], heartbeat: float = 15.0, duration: float = 300.0,
+                    poll_interval: float = 2.0) -> AsyncIterator[str]:
+    """``iter_sse`` for an asyncio server
+
+    Waiting on the change feed holds no thread. Stores without one are
+    queried from the loop's default executor, as their reads may block.
+    """
+    import asyncio
+
+    feed = getattr(store, 'changes', None)
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + duration
+    yield f'retry: {SSE_RETRY_MS}\n\n'
+    if feed is not None:
+        changes = _first_changes(store, feed, version)
+    else:
+        changes = await loop.run_in_executor(None, _first_changes, store, feed, version)
+    while True:
+        if feed is not None:
+            text, version = _batch(store, version, changes)
+        else:
+            text, version = await loop.run_in_executor(None, _batch, store, version, changes)
+        if text:
+            yield text
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if feed is not None:
+            changes = await feed.wait_async(version, min(heartbeat, remaining))
+        else:
+            changes = await _await_version(loop, store, version, min(heartbeat, remaining), poll_interval)
+        if changes == []:
+            yield ': keepalive\n\n'
+
+
+def _first_changes(store, feed, version):
+    """What a stream starting after ``version`` sends first (None: resync)"""
+    if version is None:
+        return None
+    if feed is not None:
+        return feed.since(version)
+    return [] if store.version == version else None
+
+
+def _batch(store, version: int, changes) -> Tuple[str, int]:
+    """The messages for ``changes`` and the version they bring a client to"""
+    if changes is None or len(changes) > MAX_EVENTS_PER_BATCH:
+        version = store.version
+        return _message('resync', event_id(store, version), {'counts': store.get_task_count()}), version
+    if changes:
+        text = ''.join(_message('change', event_id(store, v), event_for(record)) for v, record in changes)
+        return text + _message('counts', None, store.get_task_count()), changes[-1][0]
+    return '', version
+
+
+def _wait_for_version(store, version: int, timeout: float, poll_interval: float):
+    end = time.monotonic() + timeout
+    while store.version == version:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return []
+        time.sleep(min(poll_interval, remaining))
+    return None
+
+
+async def _await_version(loop, store, version: int, timeout: float, poll_interval: float):
+    import asyncio
+
+    end = time.monotonic() + timeout
+    while await loop.run_in_executor(None, getattr, store, 'version') == version:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return []
+        await asyncio.sleep(min(poll_interval, remaining))
+    return None
+
+
+def _message(event: str, message_id: Optional[str], data) -> str:
+    lines = f'event: {event}\n'
+    if message_id is not None:
+        lines += f'id: {message_id}\n'
+    return lines + 'data: ' + json.dumps(data, separators=(',', ':')) + '\n\n'
@@ -0,0 +1,53 @@
+"""
+Streaming task export
+
+``iter_export`` walks a task store page by page with keyset cursors and
+yields the encoded tasks in chunks of roughly ``chunk_size`` bytes, so an
+export of any size holds one page of tasks and one chunk in memory.
+"""
+
+import json
+from typing import Iterator
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+EXPORT_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def iter_export(store, filter_type: str = 'all', fmt: str = 'ndjson',
+                chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the filtered tasks as NDJSON lines or one JSON array"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    array = fmt == 'json'
+    parts = ['['] if array else []
+    size = 0
+    first = True
+    after_id = 0
+    while True:
+        tasks, has_more = store.get_page(filter_type, after_id, EXPORT_PAGE_SIZE)
+        for task in tasks:
+            if array:
+                part = _encode(task) if first else ',' + _encode(task)
+                first = False
+            else:
+                part = _encode(task) + '\n'
+            parts.append(part)
+            size += len(part)
+            if size >= chunk_size:
+                yield ''.join(parts).encode()
+                parts = []
+                size = 0
+        if not has_more:
+            break
+        after_id = tasks[-1]['id']
+    if array:
+        parts.append(']')
+    if parts:
+        yield ''.join(parts).encode()
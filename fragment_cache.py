@@ -0,0 +1,77 @@
+"""
+Cache for rendered template fragments
+
+Fragments are memoized under a key that names everything they depend on
+(for the task list: store epoch and version, filter and page), so an entry
+never has to be invalidated; entries for old versions simply stop being
+asked for and age out of the LRU.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """LRU cache of rendered fragments within a memory budget
+
+    ``max_bytes`` bounds the summed ``sys.getsizeof`` of the cached
+    strings; the least recently used entries are evicted to stay under it,
+    and a budget of 0 disables caching. Rendering happens outside the lock,
+    so two requests missing on the same key at once may both render it.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> Markup:
+        """Get the fragment cached under ``key``, rendering it on a miss"""
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        fragment = Markup(render())
+        size = sys.getsizeof(fragment)
+        if size > self.max_bytes:
+            return fragment
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = fragment
+                self._bytes += size
+                self._evict()
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            _, fragment = self._entries.popitem(last=False)
+            self._bytes -= sys.getsizeof(fragment)
+            self.evictions += 1
@@ -0,0 +1,143 @@
+"""
+Background uptime heartbeat for the ToDo application
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+# Marker put on the queue to wake the worker up for shutdown
+_STOP = object()
+
+
+class HeartbeatDispatcher:
+    """Send uptime heartbeats from a worker thread
+
+    Request handlers only call ``notify()``, which never blocks: it drops a
+    marker on a bounded queue. The worker drains every marker that arrived
+    in the meantime and sends a single ping for all of them, at most once
+    per ``min_interval`` seconds, over one pooled ``requests.Session``.
+    ``requests`` is imported by the worker when it sends its first ping.
+    """
+
+    def __init__(self, url: Optional[str], min_interval: float = 30.0,
+                 timeout: float = 5.0, queue_size: int = 1024):
+        self.url = url
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._session: Optional['requests.Session'] = None
+        self._last_sent = float('-inf')
+        self._stats = {'sent': 0, 'coalesced': 0, 'failed': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def notify(self) -> bool:
+        """Ask for a heartbeat without waiting for it to be sent"""
+        if not self.enabled or self._stop.is_set():
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(True)
+        except queue.Full:
+            # A ping is already pending; this one rides along with it
+            self._count('coalesced')
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Get counters for pings sent, coalesced and failed"""
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the worker thread and close the HTTP session"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                pass  # the worker checks the stop event after each batch
+            thread.join(timeout)
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _ensure_worker(self):
+        """Start the worker on first use, and again in a forked child"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked: the parent's thread and queue state did not come along
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._session = None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='heartbeat', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            if self._queue.get() is _STOP:
+                return
+            self._count('coalesced', self._drain())
+            # Let the rest of a burst pile up until the interval has passed
+            wait = self._last_sent + self.min_interval - time.monotonic()
+            if self._stop.is_set() or (wait > 0 and self._stop.wait(wait)):
+                return
+            self._count('coalesced', self._drain())
+            if self._stop.is_set():
+                return
+            self._send()
+
+    def _drain(self) -> int:
+        """Discard queued notifications, returning how many there were"""
+        drained = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return drained
+            if item is _STOP:
+                self._stop.set()
+                return drained
+            drained += 1
+
+    def _send(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self._last_sent = time.monotonic()
+        try:
+            response = self._session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            self._count('sent')
+            logger.debug("Heartbeat sent successfully to %s", self.url)
+        except requests.exceptions.RequestException as e:
+            self._count('failed')
+            logger.error("Failed to send heartbeat: %s", e)
+
+    def _count(self, name: str, amount: int = 1):
+        if amount:
+            with self._lock:
+                self._stats[name] += amount
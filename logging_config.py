@@ -0,0 +1,126 @@
+"""
+Logging setup for the app
+
+Configured from the environment:
+
+    LOG_LEVEL    root level name (default DEBUG, INFO in production)
+    LOG_FORMAT   "text" (default) or "json", one object per line
+    LOG_QUEUE    "1" to hand records to a background thread for formatting
+                 and I/O instead of writing them on the request thread
+                 (the default in production), "0" to write them directly
+
+The production servers (serve.py, asgi.py) pass ``production=True``.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+TEXT_FORMAT = '%(levelname)s:%(name)s:%(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread
+
+    The stock ``prepare`` runs the formatter (timestamps, JSON, tracebacks)
+    on the logging thread. Here only the message arguments are merged, so
+    later changes to them cannot alter the record; everything else happens
+    on the listener thread.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _QueuedLogging:
+    """The queue and listener thread behind DeferredQueueHandler"""
+
+    def __init__(self, handler: logging.Handler):
+        self.queue = queue.SimpleQueue()
+        self.handler = handler
+        self.listener = None
+        self.start()
+
+    def start(self):
+        self.listener = QueueListener(self.queue, self.handler, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """Write out everything queued and stop the listener"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+_queued: Optional[_QueuedLogging] = None
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None,
+                      queued: Optional[bool] = None, stream=None, production: bool = False):
+    """Set up the root logger; arguments override the environment
+
+    ``production`` makes INFO and the queue the defaults for whatever
+    neither an argument nor the environment sets. Calling it again
+    replaces the previous configuration.
+    """
+    global _queued
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO' if production else 'DEBUG')).upper()
+    fmt = fmt or os.environ.get('LOG_FORMAT', 'text')
+    if queued is None:
+        queued = os.environ.get('LOG_QUEUE', '1' if production else '') == '1'
+
+    handler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    if _queued is not None:
+        _queued.stop()
+        _queued = None
+
+    if queued:
+        _queued = _QueuedLogging(handler)
+        root.addHandler(DeferredQueueHandler(_queued.queue))
+    else:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def shutdown_logging():
+    """Flush queued records; registered to run at exit"""
+    if _queued is not None:
+        _queued.stop()
+
+
+def _restart_listener():
+    # The listener thread does not survive fork (gunicorn --preload)
+    if _queued is not None:
+        _queued.start()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_listener)
@@ -1,4 +1,11 @@
-from app import app
+from logging_config import configure_logging
+
+from app import create_app
+
+# Entry point for gunicorn (main:app) and serverless deployments (vercel.json);
+# importing app itself builds nothing and leaves logging alone
+configure_logging()
+app = create_app()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,364 @@
+"""
+Request metrics with per-thread counters, served in Prometheus text format
+
+Request threads only ever write to their own shard of plain dicts and
+lists, so recording a request takes no lock. A scrape copies every shard
+and merges them. Shards of threads that have exited are folded into a
+retired shard when new threads register, so a server that starts a thread
+per request does not accumulate them.
+
+On its own, every sample carries a ``worker`` label with the process id
+and /metrics reports only the process that answered the scrape. With a
+``directory`` shared by the worker processes (METRICS_DIR), each process
+writes its totals to ``metrics.<pid>.json`` there every
+``export_interval`` seconds and before a scrape, and the scrape merges
+every file:
+
+- request counts, latency histograms, named counters and collector
+  counters are summed over all workers, including exited ones, whose
+  files are folded into ``metrics.retired.json``;
+- collector gauges (store size, cache bytes) are per process, so they
+  keep the ``worker`` label, for running workers only.
+
+Other workers' numbers are then at most ``export_interval`` seconds old.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: merges are not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket bounds, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# (name, type, help, labels, value) as returned by collectors
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+class _Shard:
+    """Counters written by a single thread"""
+
+    __slots__ = ('thread', 'requests', 'latency', 'counters')
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.requests = {}  # (endpoint, method, status) -> count
+        self.latency = {}   # endpoint -> [bucket counts..., +Inf count, sum of seconds]
+        self.counters = {}  # (name, labels) -> value
+
+    def merge_into(self, other: '_Shard'):
+        for key, count in self.requests.copy().items():
+            other.requests[key] = other.requests.get(key, 0) + count
+        for endpoint, histogram in self.latency.copy().items():
+            merged = other.latency.get(endpoint)
+            if merged is None:
+                other.latency[endpoint] = list(histogram)
+            else:
+                for i, value in enumerate(histogram):
+                    merged[i] += value
+        for key, value in self.counters.copy().items():
+            other.counters[key] = other.counters.get(key, 0) + value
+
+
+class Metrics:
+    """Per-endpoint request counts and latency histograms plus named counters
+
+    ``observe_request`` and ``inc`` are the hot path. ``register_collector``
+    adds callables that produce gauge or counter samples at scrape time,
+    for values other components already keep (store size, heartbeat
+    outcomes, cache stats).
+    """
+
+    def __init__(self, prefix: str = 'todo', buckets: Iterable[float] = DEFAULT_BUCKETS,
+                 directory: Optional[str] = None, export_interval: float = 5.0):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.directory = directory
+        self.export_interval = export_interval
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+        self._exporter_pid: Optional[int] = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            os.register_at_fork(after_in_child=self._after_fork)
+            atexit.register(self._export_at_exit)
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float):
+        """Count one request and add its latency to the endpoint's histogram"""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._register()
+        key = (endpoint, method, status)
+        requests = shard.requests
+        requests[key] = requests.get(key, 0) + 1
+        histogram = shard.latency.get(endpoint)
+        if histogram is None:
+            histogram = shard.latency[endpoint] = [0] * (len(self.buckets) + 2)
+        histogram[bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def inc(self, name: str, amount: float = 1, labels: Tuple[Tuple[str, str], ...] = ()):
+        """Add to the counter ``<prefix>_<name>_total`` with the given labels"""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._register()
+        key = (name, labels)
+        counters = shard.counters
+        counters[key] = counters.get(key, 0) + amount
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Add a callable returning (name, type, help, labels, value) samples"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> _Shard:
+        """Merge every thread's counters into one shard"""
+        with self._lock:
+            shards = list(self._shards)
+            total = _Shard(None)
+            self._retired.merge_into(total)
+        for shard in shards:
+            shard.merge_into(total)
+        return total
+
+    def export(self):
+        """Write this process's totals to ``directory`` for scrapes to merge"""
+        data = _export_data(self.snapshot(), {})
+        data['samples'] = [[name, kind, help_text, sorted(labels.items()), value]
+                           for name, kind, help_text, labels, value in self._collect()]
+        _write_export(self._export_path(str(os.getpid())), data)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        if self.directory is None:
+            worker = f'worker="{os.getpid()}"'
+            return self._render(self.snapshot(), self._collect(), worker)
+        self._ensure_exporter()
+        self.export()
+        total, samples = self._merge_exports()
+        return self._render(total, samples, None)
+
+    def _collect(self) -> List[Sample]:
+        return [sample for collector in self._collectors for sample in collector()]
+
+    def _render(self, total: _Shard, samples: Iterable[Sample], worker: Optional[str]) -> str:
+        prefix = self.prefix
+        lines = []
+
+        name = f'{prefix}_http_requests_total'
+        lines += [f'# HELP {name} HTTP requests handled, by endpoint, method and status',
+                  f'# TYPE {name} counter']
+        for (endpoint, method, status), count in sorted(total.requests.items()):
+            labels = _labels([('endpoint', endpoint), ('method', method), ('status', status)], worker)
+            lines.append(f'{name}{{{labels}}} {count}')
+
+        name = f'{prefix}_http_request_duration_seconds'
+        lines += [f'# HELP {name} Time spent in the app handling a request, by endpoint',
+                  f'# TYPE {name} histogram']
+        bounds = [repr(bound) for bound in self.buckets] + ['+Inf']
+        for endpoint, histogram in sorted(total.latency.items()):
+            labels = _labels([('endpoint', endpoint)], worker)
+            cumulative = 0
+            for bound, count in zip(bounds, histogram):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram[-1]}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+
+        seen = set()
+        for (counter, labels), value in sorted(total.counters.items()):
+            name = f'{prefix}_{counter}_total'
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{_series(name, _labels(labels, worker))} {value}')
+
+        for sample_name, kind, help_text, labels, value in samples:
+            name = f'{prefix}_{sample_name}'
+            if name not in seen:
+                seen.add(name)
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            lines.append(f'{_series(name, _labels(labels.items(), worker))} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _merge_exports(self) -> Tuple[_Shard, List[Sample]]:
+        """Sum every process's export, folding exited processes into the retired one"""
+        total = _Shard(None)
+        counters: Dict[Tuple, float] = {}
+        gauges: List[Sample] = []
+        retired = _Shard(None)
+        retired_counters: Dict[Tuple, float] = {}
+        exited = []
+        with _locked(os.path.join(self.directory, 'metrics.lock')):
+            for file_name in sorted(os.listdir(self.directory)):
+                if not (file_name.startswith('metrics.') and file_name.endswith('.json')):
+                    continue
+                process = file_name[len('metrics.'):-len('.json')]
+                try:
+                    shard, process_counters, process_gauges = _read_export(self._export_path(process))
+                except (OSError, ValueError):
+                    continue
+                shard.merge_into(total)
+                _add_samples(counters, process_counters)
+                if process == 'retired' or not _running(int(process)):
+                    shard.merge_into(retired)
+                    _add_samples(retired_counters, process_counters)
+                    if process != 'retired':
+                        exited.append(process)
+                    continue
+                gauges += [(name, kind, help_text, dict(labels, worker=process), value)
+                           for name, kind, help_text, labels, value in process_gauges]
+            if exited:
+                _write_export(self._export_path('retired'), _export_data(retired, retired_counters))
+                for process in exited:
+                    os.remove(self._export_path(process))
+        samples = [(name, 'counter', help_text, dict(labels), value)
+                   for (name, help_text, labels), value in sorted(counters.items())]
+        # Each metric's lines have to be together
+        return total, samples + sorted(gauges, key=lambda sample: sample[0])
+
+    def _export_path(self, process: str) -> str:
+        return os.path.join(self.directory, f'metrics.{process}.json')
+
+    def _ensure_exporter(self):
+        """Start exporting this process's totals in the background"""
+        if self._exporter_pid == os.getpid():
+            return
+        with self._lock:
+            if self._exporter_pid == os.getpid():
+                return
+            self._exporter_pid = os.getpid()
+        threading.Thread(target=self._export_loop, name='metrics-export', daemon=True).start()
+
+    def _export_loop(self):
+        while True:
+            time.sleep(self.export_interval)
+            try:
+                self.export()
+            except OSError as e:
+                logger.warning("Failed to export metrics to %s: %s", self.directory, e)
+
+    def _export_at_exit(self):
+        if self._exporter_pid == os.getpid():
+            self.export()
+
+    def _after_fork(self):
+        """A forked child starts from zero; its parent exports what it counted"""
+        self._lock = threading.Lock()
+        self._exporter_pid = None
+        self._retired = _Shard(None)
+        current = threading.current_thread()
+        self._shards = [shard for shard in self._shards if shard.thread is current]
+        for shard in self._shards:
+            shard.requests.clear()
+            shard.latency.clear()
+            shard.counters.clear()
+
+    def _register(self) -> _Shard:
+        shard = _Shard(threading.current_thread())
+        with self._lock:
+            alive = []
+            for old in self._shards:
+                if old.thread.is_alive():
+                    alive.append(old)
+                else:
+                    old.merge_into(self._retired)
+            alive.append(shard)
+            self._shards = alive
+        self._local.shard = shard
+        if self.directory is not None:
+            self._ensure_exporter()
+        return shard
+
+
+def _labels(pairs, worker: Optional[str]) -> str:
+    return ','.join([f'{key}="{value}"' for key, value in pairs] + ([worker] if worker else []))
+
+
+def _series(name: str, labels: str) -> str:
+    return f'{name}{{{labels}}}' if labels else name
+
+
+def _export_data(shard: _Shard, counters: Dict[Tuple, float]) -> Dict:
+    return {
+        'requests': [[*key, count] for key, count in shard.requests.items()],
+        'latency': shard.latency,
+        'counters': [[name, labels, value] for (name, labels), value in shard.counters.items()],
+        'samples': [[name, 'counter', help_text, labels, value]
+                    for (name, help_text, labels), value in counters.items()],
+    }
+
+
+def _write_export(path: str, data: Dict):
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _read_export(path: str):
+    """An export as (shard, {(name, help, labels): counter value}, [gauge samples])"""
+    with open(path) as f:
+        data = json.load(f)
+    shard = _Shard(None)
+    for endpoint, method, status, count in data['requests']:
+        shard.requests[(endpoint, method, status)] = count
+    shard.latency = data['latency']
+    for name, labels, value in data['counters']:
+        shard.counters[(name, tuple(tuple(pair) for pair in labels))] = value
+    counters = {}
+    gauges = []
+    for name, kind, help_text, labels, value in data['samples']:
+        labels = tuple(tuple(pair) for pair in labels)
+        if kind == 'counter':
+            _add_samples(counters, {(name, help_text, labels): value})
+        else:
+            gauges.append((name, kind, help_text, labels, value))
+    return shard, counters, gauges
+
+
+def _add_samples(total: Dict[Tuple, float], samples: Dict[Tuple, float]):
+    for key, value in samples.items():
+        total[key] = total.get(key, 0) + value
+
+
+def _running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _locked:
+    """Exclusive flock on ``path`` for the duration of a with block"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        self._file.close()
@@ -3,18 +3,30 @@ Data models for the ToDo application
 Since we're using in-memory storage, these are just data structures
 """
 
+import secrets
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
 from datetime import datetime
-from typing import Dict, List, Optional
+from itertools import compress
+from json.encoder import encode_basestring_ascii as _quote
+from threading import Lock
+from time import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from change_feed import DEFAULT_CAPACITY, ChangeFeed
 
 class Task:
     """Task model with validation"""
+
+    __slots__ = ('id', 'description', 'completed', 'created_at', 'updated_at')
     
     def __init__(self, task_id: int, description: str):
         self.id = task_id
         self.description = description
         self.completed = False
         self.created_at = datetime.now().isoformat()
-        self.updated_at = datetime.now().isoformat()
+        self.updated_at = self.created_at
     
     def to_dict(self) -> Dict:
         """Convert task to dictionary"""
@@ -36,61 +48,276 @@ class Task:
         self.description = new_description
         self.updated_at = datetime.now().isoformat()
 
+class _ColumnsView(NamedTuple):
+    """Read-only handle on the store's columns as of one write"""
+    ids: array
+    status: bytearray
+    created: array
+    updated: array
+    descriptions: List[Optional[str]]
+    created_at: List[str]
+    updated_at: List[str]
+    rows: int
+    count: int
+    completed: int
+    version: int
+
 class TaskStorage:
-    """In-memory task storage with validation"""
-    
-    def __init__(self):
-        self.tasks: List[Dict] = []
-        self.next_id = 1
-    
+    """In-memory columnar task storage
+
+    Each task is a row spread over parallel columns: IDs in an ``array``
+    of 64-bit ints, timestamps as float epochs in ``array('d')`` columns,
+    a status byte per row, and descriptions interned so repeated text is
+    stored once. The timestamps are also kept as the ISO strings the app
+    serves, formatted once when written (``updated_at`` is the same string
+    object as ``created_at`` until the task is toggled), so reads only
+    assemble task dicts for the rows a caller asks for (see ``_task_at``).
+
+    Rows are kept in insertion order, which is also ID order, so a task is
+    found by bisecting the ID column rather than through a dict that would
+    cost more memory than the row itself. Deleting a task only flips its
+    status byte to ``DELETED`` (a tombstone)
+    instead of shifting everything after it; the columns are compacted once
+    tombstones make up half of the rows, which keeps deletes amortized O(1).
+
+    ``_status`` doubles as the active and completed partitions: filtered
+    reads jump between matching rows with ``bytearray.find`` (a C memchr)
+    rather than testing every task in Python, and the per-status counters
+    are kept up to date on each write. When a partition covers most rows,
+    a translated byte mask is fed to ``itertools.compress`` instead so the
+    whole selection stays in C.
+
+    Every write is expressed as a record (see ``apply_record``) so that a
+    ``journal`` attached to the store can log it and replay it on startup.
+    The last ``change_feed_size`` records are also kept in ``changes``, a
+    ``ChangeFeed`` keyed by the version each one produced.
+
+    ``changes_since`` answers delta syncs from that same feed, so a sync
+    costs the size of the delta rather than of the store, and keeping it
+    costs nothing per task. Versions the feed no longer reaches back to
+    (more than ``change_feed_size`` writes ago, or before a clear or
+    restore) need a full reload.
+
+    Concurrency: writers take ``_write_lock``, so IDs are allocated and
+    records applied one at a time. Readers never lock. After every write
+    a new ``_ColumnsView`` is published holding the column references, the
+    number of complete rows and the counters; a reader works from the view
+    it picked up and never looks past its row count, so it cannot see a
+    half-appended row. Compaction builds fresh columns rather than moving
+    rows in place, so a view taken before it stays consistent. Toggles and
+    deletes change one row's bytes in place and are visible to readers as
+    soon as they happen.
+    """
+
+    # Never compact for fewer tombstones than this
+    COMPACTION_MIN_TOMBSTONES = 1024
+
+    # Row status bytes
+    DELETED = 0
+    ACTIVE = 1
+    COMPLETED = 2
+
+    # Byte translation tables turning ``_status`` into a 0/1 mask per status
+    _MASKS = {
+        status: bytes(1 if byte == status else 0 for byte in range(256))
+        for status in (ACTIVE, COMPLETED)
+    }
+
+    # Write record opcodes
+    ADD = 'a'      # (ADD, id, description, timestamp)
+    TOGGLE = 't'   # (TOGGLE, id, completed, timestamp)
+    DELETE = 'd'   # (DELETE, id)
+    CLEAR = 'c'    # (CLEAR,)
+
+    def __init__(self, change_feed_size: int = DEFAULT_CAPACITY):
+        self.journal = None
+        self.changes = ChangeFeed(change_feed_size)
+        # ``version`` goes up with every write; ``epoch`` tells this counter
+        # apart from the one of an earlier process that started at 0 too
+        self.epoch = secrets.token_hex(6)
+        self.version = 0
+        self._write_lock = Lock()
+        self._reset()
+        self._publish()
+        self.changes.reset(self.version)
+
+    def __len__(self) -> int:
+        return self._view.count
+
     def add_task(self, description: str) -> Dict:
         """Add a new task"""
-        task = Task(self.next_id, description)
-        self.tasks.append(task.to_dict())
-        self.next_id += 1
-        return task.to_dict()
-    
+        with self._write_lock:
+            row, ticket = self._write((self.ADD, self.next_id, description, time()))
+            task = self._task_at(self._view, row)
+        self._wait_durable(ticket)
+        return task
+
     def get_task(self, task_id: int) -> Optional[Dict]:
         """Get a task by ID"""
-        for task in self.tasks:
-            if task['id'] == task_id:
-                return task
-        return None
-    
+        view = self._view
+        row = self._find_row(view, task_id)
+        if row is None:
+            return None
+        return self._task_at(view, row)
+
     def get_all_tasks(self) -> List[Dict]:
         """Get all tasks"""
-        return self.tasks.copy()
-    
+        view = self._view
+        return self._tasks_in(view, view.status[:view.rows])
+
     def get_filtered_tasks(self, filter_type: str) -> List[Dict]:
         """Get filtered tasks"""
+        view = self._view
         if filter_type == 'active':
-            return [task for task in self.tasks if not task['completed']]
+            return self._tasks_with_status(view, self.ACTIVE, view.count - view.completed)
         elif filter_type == 'completed':
-            return [task for task in self.tasks if task['completed']]
+            return self._tasks_with_status(view, self.COMPLETED, view.completed)
         else:  # 'all'
-            return self.tasks.copy()
-    
-    def toggle_task(self, task_id: int) -> bool:
-        """Toggle task completion"""
-        for task in self.tasks:
-            if task['id'] == task_id:
-                task['completed'] = not task['completed']
-                task['updated_at'] = datetime.now().isoformat()
-                return True
-        return False
-    
-    def delete_task(self, task_id: int) -> bool:
-        """Delete a task"""
-        for i, task in enumerate(self.tasks):
-            if task['id'] == task_id:
-                self.tasks.pop(i)
-                return True
-        return False
-    
+            return self.get_all_tasks()
+
+    def get_filtered_json(self, filter_type: str) -> str:
+        """Get filtered tasks as the JSON text ``json.dumps`` would give
+
+        Written straight from the columns without building a dict per task:
+        the stored ISO timestamps go in as they are and only descriptions
+        need escaping.
+        """
+        view = self._view
+        selectors = view.status[:view.rows]
+        if filter_type == 'active':
+            selectors = selectors.translate(self._MASKS[self.ACTIVE])
+        elif filter_type == 'completed':
+            selectors = selectors.translate(self._MASKS[self.COMPLETED])
+        completed = self.COMPLETED
+        return '[' + ', '.join([
+            f'{{"id": {task_id}, "description": {_quote(description)}, '
+            f'"completed": {"true" if status == completed else "false"}, '
+            f'"created_at": "{created_at}", "updated_at": "{updated_at}"}}'
+            for task_id, description, status, created_at, updated_at in self._columns_in(view, selectors)
+        ]) + ']'
+
+    def get_page(self, filter_type: str, after_id: int = 0, limit: int = 50) -> Tuple[List[Dict], bool]:
+        """Get up to ``limit`` filtered tasks with IDs above ``after_id``
+
+        Returns the tasks and whether more follow. The first row is found by
+        bisecting the ID column, so a page costs its own size (plus any
+        tombstones or skipped statuses in between) however deep it is.
+        """
+        view = self._view
+        end = view.rows
+        row = bisect_right(view.ids, after_id, 0, end)
+        rows = []
+        if filter_type in ('active', 'completed'):
+            find = view.status.find
+            wanted = self.ACTIVE if filter_type == 'active' else self.COMPLETED
+            row = find(wanted, row, end)
+            while row != -1 and len(rows) <= limit:
+                rows.append(row)
+                row = find(wanted, row + 1, end)
+        else:
+            status = view.status
+            while row < end and len(rows) <= limit:
+                if status[row] != self.DELETED:
+                    rows.append(row)
+                row += 1
+        return [self._task_at(view, row) for row in rows[:limit]], len(rows) > limit
+
+    def toggle_task(self, task_id: int) -> Optional[Dict]:
+        """Toggle task completion, returning the updated task"""
+        with self._write_lock:
+            row = self._row_of(task_id)
+            if row is None:
+                return None
+            completed = self._status[row] != self.COMPLETED
+            row, ticket = self._write((self.TOGGLE, task_id, completed, time()))
+            task = self._task_at(self._view, row)
+        self._wait_durable(ticket)
+        return task
+
+    def delete_task(self, task_id: int) -> Optional[Dict]:
+        """Delete a task, returning the removed task"""
+        with self._write_lock:
+            row = self._row_of(task_id)
+            if row is None:
+                return None
+            task = self._task_at(self._view, row)
+            _, ticket = self._write((self.DELETE, task_id))
+        self._wait_durable(ticket)
+        return task
+
+    def add_tasks(self, descriptions: List[str]) -> List[Dict]:
+        """Add several tasks under one lock acquisition and one durable wait"""
+        tickets = []
+        with self._write_lock:
+            now = time()
+            rows = []
+            for description in descriptions:
+                row, ticket = self._write((self.ADD, self.next_id, description, now))
+                rows.append(row)
+                tickets.append(ticket)
+            view = self._view
+            tasks = [self._task_at(view, row) for row in rows]
+        self._wait_durable(*tickets)
+        return tasks
+
+    def toggle_tasks(self, task_ids: List[int], completed: Optional[bool] = None) -> List[Optional[Dict]]:
+        """Toggle several tasks, or set them all to ``completed`` if given
+
+        Returns the updated task (None if missing) for each ID; an ID given
+        more than once is applied once.
+        """
+        tickets = []
+        results = {}
+        with self._write_lock:
+            now = time()
+            for task_id in dict.fromkeys(task_ids):
+                row = self._row_of(task_id)
+                if row is None:
+                    results[task_id] = None
+                    continue
+                state = self._status[row] != self.COMPLETED if completed is None else completed
+                row, ticket = self._write((self.TOGGLE, task_id, state, now))
+                results[task_id] = self._task_at(self._view, row)
+                tickets.append(ticket)
+        self._wait_durable(*tickets)
+        return [results[task_id] for task_id in task_ids]
+
+    def delete_tasks(self, task_ids: List[int]) -> List[Optional[Dict]]:
+        """Delete several tasks, returning each removed task (None if missing)"""
+        tickets = []
+        results = {}
+        with self._write_lock:
+            for task_id in dict.fromkeys(task_ids):
+                row = self._row_of(task_id)
+                if row is None:
+                    results[task_id] = None
+                    continue
+                results[task_id] = self._task_at(self._view, row)
+                tickets.append(self._write((self.DELETE, task_id))[1])
+        self._wait_durable(*tickets)
+        return [results[task_id] for task_id in task_ids]
+
+    def delete_completed(self) -> int:
+        """Delete every completed task, returning how many were removed"""
+        with self._write_lock:
+            view = self._view
+            mask = view.status.translate(self._MASKS[self.COMPLETED])
+            task_ids = [view.ids[row] for row in compress(range(view.rows), mask)]
+            tickets = [self._write((self.DELETE, task_id))[1] for task_id in task_ids]
+        self._wait_durable(*tickets)
+        return len(task_ids)
+
+    def clear(self):
+        """Remove every task and reset ID allocation"""
+        with self._write_lock:
+            _, ticket = self._write((self.CLEAR,))
+        self._wait_durable(ticket)
+
     def get_task_count(self) -> Dict[str, int]:
         """Get task counts by status"""
-        total = len(self.tasks)
-        completed = sum(1 for task in self.tasks if task['completed'])
+        view = self._view
+        total = view.count
+        completed = view.completed
         active = total - completed
         
         return {
@@ -98,3 +325,219 @@ class TaskStorage:
             'active': active,
             'completed': completed
         }
+
+    def apply_record(self, record) -> Optional[int]:
+        """Apply a write record without journaling it, returning its row
+
+        This is the only place the columns change. Replaying the records a
+        journal logged rebuilds the store exactly, including IDs and
+        timestamps. Callers other than the journal's replay must hold
+        ``_write_lock``.
+        """
+        op = record[0]
+        row = None
+        if op == self.ADD:
+            _, task_id, description, now = record
+            row = len(self._ids)
+            created_at = datetime.fromtimestamp(now).isoformat()
+            self._ids.append(task_id)
+            self._status.append(self.ACTIVE)
+            self._created.append(now)
+            self._updated.append(now)
+            self._created_at.append(created_at)
+            self._updated_at.append(created_at)
+            self._descriptions.append(sys.intern(description))
+            self._count += 1
+            if task_id >= self.next_id:
+                self.next_id = task_id + 1
+        elif op == self.TOGGLE:
+            _, task_id, completed, now = record
+            row = self._live_row(task_id)
+            status = self.COMPLETED if completed else self.ACTIVE
+            self._updated[row] = now
+            self._updated_at[row] = datetime.fromtimestamp(now).isoformat()
+            if self._status[row] != status:
+                self._completed_count += 1 if completed else -1
+                self._status[row] = status
+        elif op == self.DELETE:
+            deleted = self._live_row(record[1])
+            if self._status[deleted] == self.COMPLETED:
+                self._completed_count -= 1
+            self._status[deleted] = self.DELETED
+            self._count -= 1
+            self._tombstones += 1
+            self._maybe_compact()
+        elif op == self.CLEAR:
+            self._reset()
+        else:
+            raise ValueError(f"Unknown write record: {record!r}")
+        self._publish()
+        self.changes.append(self.version, record)
+        return row
+
+    def changes_since(self, version: int) -> Optional[Tuple[List[Dict], List[int], int]]:
+        """Tasks written after ``version``, for delta syncs
+
+        Returns the tasks added or updated since then (by ID), the IDs of
+        those deleted since then, and the version the delta brings a client
+        up to; or None when the store no longer knows what changed after
+        ``version`` and the client has to reload everything. A task both
+        added and deleted within the delta is reported as deleted.
+        """
+        changes = self.changes.since(version)
+        if changes is None or any(record[0] == self.CLEAR for _, record in changes):
+            return None
+        # The view is at least as new as the last change: rows show their latest state
+        view = self._view
+        changed, deleted = [], []
+        for task_id in sorted({record[1] for _, record in changes}):
+            row = self._find_row(view, task_id)
+            if row is None:
+                deleted.append(task_id)
+            else:
+                changed.append(self._task_at(view, row))
+        return changed, deleted, changes[-1][0] if changes else version
+
+    def snapshot(self) -> Dict:
+        """Copy the live rows into compacted columns for a snapshot"""
+        live = self._status
+        return {
+            'next_id': self.next_id,
+            'ids': array('q', compress(self._ids, live)),
+            'status': live.translate(None, bytes([self.DELETED])),
+            'created': array('d', compress(self._created, live)),
+            'updated': array('d', compress(self._updated, live)),
+            'descriptions': list(compress(self._descriptions, live)),
+        }
+
+    def restore(self, snapshot: Dict):
+        """Replace the contents with columns taken by ``snapshot``"""
+        with self._write_lock:
+            self._reset()
+            self._ids = snapshot['ids']
+            self._status = snapshot['status']
+            self._created = snapshot['created']
+            self._updated = snapshot['updated']
+            self._descriptions = [sys.intern(description) for description in snapshot['descriptions']]
+            self._created_at = [datetime.fromtimestamp(created).isoformat() for created in self._created]
+            self._updated_at = [created_at if updated == created else datetime.fromtimestamp(updated).isoformat()
+                                for created_at, created, updated in zip(self._created_at, self._created, self._updated)]
+            self._count = len(self._ids)
+            self._completed_count = self._status.count(self.COMPLETED)
+            self.next_id = snapshot['next_id']
+            self._publish()
+            self.changes.reset(self.version)
+
+    def _write(self, record):
+        """Apply a write record, through the journal if there is one
+
+        Returns the affected row and a ticket for ``_wait_durable``, which
+        is called after ``_write_lock`` is released so that concurrent
+        writers can share one fsync.
+        """
+        if self.journal is not None:
+            return self.journal.write(self, record)
+        return self.apply_record(record), None
+
+    def _wait_durable(self, *tickets):
+        for ticket in tickets:
+            if ticket is not None:
+                self.journal.wait(ticket)
+
+    def _publish(self):
+        """Make the current columns visible to readers"""
+        self.version += 1
+        self._view = _ColumnsView(
+            self._ids, self._status, self._created, self._updated, self._descriptions,
+            self._created_at, self._updated_at, len(self._ids), self._count, self._completed_count, self.version)
+
+    def _reset(self):
+        self._ids = array('q')
+        self._status = bytearray()
+        self._created = array('d')
+        self._updated = array('d')
+        self._descriptions: List[Optional[str]] = []
+        self._created_at: List[str] = []
+        self._updated_at: List[str] = []
+        self._count = 0
+        self._tombstones = 0
+        self._completed_count = 0
+        self.next_id = 1
+
+    def _find_row(self, view: _ColumnsView, task_id: int) -> Optional[int]:
+        """Get the row of a live task in ``view``"""
+        ids = view.ids
+        row = bisect_left(ids, task_id, 0, view.rows)
+        if row == view.rows or ids[row] != task_id or view.status[row] == self.DELETED:
+            return None
+        return row
+
+    def _row_of(self, task_id: int) -> Optional[int]:
+        """Get the row of a live task in the current columns (under ``_write_lock``)"""
+        ids = self._ids
+        row = bisect_left(ids, task_id)
+        if row == len(ids) or ids[row] != task_id or self._status[row] == self.DELETED:
+            return None
+        return row
+
+    def _live_row(self, task_id: int) -> int:
+        """``_row_of`` for a record to apply: KeyError if the task is not there"""
+        row = self._row_of(task_id)
+        if row is None:
+            raise KeyError(task_id)
+        return row
+
+    def _task_at(self, view: _ColumnsView, row: int) -> Dict:
+        """Build the task dict for a row in the JSON shape the app serves"""
+        return {
+            'id': view.ids[row],
+            'description': view.descriptions[row],
+            'completed': view.status[row] == self.COMPLETED,
+            'created_at': view.created_at[row],
+            'updated_at': view.updated_at[row]
+        }
+
+    def _tasks_in(self, view: _ColumnsView, selectors) -> List[Dict]:
+        """Build the task dicts for the rows ``selectors`` marks, selecting in C"""
+        completed = self.COMPLETED
+        return [{'id': task_id, 'description': description, 'completed': status == completed,
+                 'created_at': created_at, 'updated_at': updated_at}
+                for task_id, description, status, created_at, updated_at in self._columns_in(view, selectors)]
+
+    @staticmethod
+    def _columns_in(view: _ColumnsView, selectors):
+        """Iterate the column values of the rows ``selectors`` marks"""
+        return zip(compress(view.ids, selectors), compress(view.descriptions, selectors),
+                   compress(view.status, selectors), compress(view.created_at, selectors),
+                   compress(view.updated_at, selectors))
+
+    def _tasks_with_status(self, view: _ColumnsView, status: int, expected: int) -> List[Dict]:
+        """Collect the tasks whose row has the given status byte"""
+        task_at = self._task_at
+        if expected * 8 > view.rows:
+            return self._tasks_in(view, view.status[:view.rows].translate(self._MASKS[status]))
+        find = view.status.find
+        end = view.rows
+        tasks = []
+        row = find(status, 0, end)
+        while row != -1:
+            tasks.append(task_at(view, row))
+            row = find(status, row + 1, end)
+        return tasks
+
+    def _maybe_compact(self):
+        """Drop tombstones once they make up half of the rows"""
+        if self._tombstones < self.COMPACTION_MIN_TOMBSTONES:
+            return
+        if self._tombstones * 2 < len(self._ids):
+            return
+        live = self._status
+        compacted = self.snapshot()
+        self._ids = compacted['ids']
+        self._status = compacted['status']
+        self._created = compacted['created']
+        self._updated = compacted['updated']
+        self._descriptions = compacted['descriptions']
+        self._created_at = list(compress(self._created_at, live))
+        self._updated_at = list(compress(self._updated_at, live))
+        self._tombstones = 0
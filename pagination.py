@@ -0,0 +1,55 @@
+"""
+Cursor pagination for task listings
+
+Pages are keyset pages: a page is "the next ``limit`` tasks with an ID
+above ``after_id``". The cursor handed to clients is that ID wrapped in an
+opaque token, so they pass it back unchanged instead of building offsets.
+"""
+
+import base64
+from typing import Mapping, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+_CURSOR_PREFIX = 'v1:'
+
+
+def encode_cursor(after_id: int) -> str:
+    """Wrap the last ID of a page into a cursor for the next one"""
+    token = f'{_CURSOR_PREFIX}{after_id}'.encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """Get the ``after_id`` a cursor stands for, or raise ValueError"""
+    try:
+        token = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    if not token.startswith(_CURSOR_PREFIX) or not token[len(_CURSOR_PREFIX):].isdigit():
+        raise ValueError('Invalid cursor')
+    return int(token[len(_CURSOR_PREFIX):])
+
+
+def page_args(args: Mapping[str, str]) -> Tuple[int, int]:
+    """Read (after_id, limit) from ``cursor`` or ``after_id`` and ``limit``
+
+    ``limit`` defaults to DEFAULT_PAGE_SIZE and is capped at MAX_PAGE_SIZE.
+    Raises ValueError for anything malformed.
+    """
+    cursor = args.get('cursor')
+    if cursor:
+        after_id = decode_cursor(cursor)
+    else:
+        after_id = _non_negative_int(args.get('after_id', '0'), 'after_id')
+    limit = _non_negative_int(args.get('limit', str(DEFAULT_PAGE_SIZE)), 'limit')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return after_id, min(limit, MAX_PAGE_SIZE)
+
+
+def _non_negative_int(value: str, name: str) -> int:
+    if not value.isdigit():
+        raise ValueError(f'{name} must be a non-negative integer')
+    return int(value)
@@ -0,0 +1,395 @@
+"""
+Durable persistence for TaskStorage
+
+Writes are appended to an operation log, and the log is periodically
+folded into a snapshot of the store's columns. On startup the latest
+snapshot is loaded and only the log written after it is replayed.
+
+Directory layout::
+
+    snapshot          compacted columns + the first log generation not in it
+    ops.000007.log    one JSON write record per line
+    lock              held (flock) by the one process journaling here
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: the directory is not locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+
+class OperationLog:
+    """Append-only log file with group commit
+
+    ``append`` only queues the encoded record. A flusher thread writes
+    everything queued since its last pass with a single ``write`` and
+    ``fsync``, so writers arriving while an fsync is in progress share the
+    next one instead of paying for their own. ``wait`` blocks until a
+    record is on disk.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self._file = open(path, 'ab', buffering=0)
+        self._cond = threading.Condition()
+        self._pending: List[bytes] = []
+        self._appended = 0
+        self._durable = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self.fsyncs = 0
+
+    def append(self, line: bytes) -> int:
+        """Queue an encoded record, returning its sequence number"""
+        with self._cond:
+            if self._closed:
+                raise ValueError(f"Operation log {self.path} is closed")
+            self._pending.append(line)
+            self._appended += 1
+            self._ensure_flusher()
+            self._cond.notify_all()
+            return self._appended
+
+    def wait(self, seq: int):
+        """Block until the record with sequence ``seq`` has been synced"""
+        with self._cond:
+            while self._durable < seq and self._error is None:
+                self._cond.wait()
+            if self._durable < seq:
+                raise IOError(f"Failed to write operation log {self.path}") from self._error
+
+    def close(self):
+        """Flush whatever is queued and close the file"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            flusher = self._flusher if self._pid == os.getpid() else None
+        if flusher is not None:
+            flusher.join()
+        else:
+            self._flush(self._take_pending())
+        self._file.close()
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._flusher = threading.Thread(target=self._run, name='oplog-flusher', daemon=True)
+            self._flusher.start()
+
+    def _take_pending(self):
+        with self._cond:
+            batch, self._pending = self._pending, []
+            return batch, self._appended
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+            self._flush(self._take_pending())
+
+    def _flush(self, pending):
+        batch, seq = pending
+        if not batch:
+            return
+        try:
+            self._file.write(b''.join(batch))
+            if self.fsync:
+                os.fsync(self._file.fileno())
+                self.fsyncs += 1
+        except BaseException as e:
+            logger.error("Failed to write operation log %s: %s", self.path, e)
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+            return
+        with self._cond:
+            self._durable = seq
+            self._cond.notify_all()
+
+
+class TaskJournal:
+    """Operation log plus snapshots for a TaskStorage
+
+    ``load`` restores a store from ``directory`` and attaches the journal
+    to it; from then on the store passes every write record to ``write``,
+    which applies and logs it under one lock so the log order is the order
+    the writes happened in.
+
+    Every ``snapshot_every`` records the live columns are copied, the log
+    is rotated to a new generation, and the copy is written out as the new
+    snapshot on a background thread, after which older logs are deleted.
+
+    With ``wait_durable`` (the default) a write returns once its record is
+    fsynced, but concurrent writers share fsyncs through group commit.
+
+    Only one process may journal a directory: ``load`` takes an exclusive
+    lock on it, waiting up to ``lock_timeout`` seconds for another process
+    to let go, and a forked child cannot write through its parent's
+    journal.
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 100000,
+                 fsync: bool = True, wait_durable: bool = True, lock_timeout: float = 0.0):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.wait_durable = wait_durable
+        self.lock_timeout = lock_timeout
+        self._lock_file = None
+        self._pid: Optional[int] = None
+        self._log: Optional[OperationLog] = None
+        self._generation = 0
+        self._since_snapshot = 0
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, 'snapshot')
+
+    def log_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f'ops.{generation:06d}.log')
+
+    def load(self, store):
+        """Restore ``store`` from disk and start journaling its writes
+
+        Raises RuntimeError if another process holds the directory for
+        longer than ``lock_timeout``.
+        """
+        self._acquire_lock()
+        first_generation = 0
+        if os.path.exists(self.snapshot_path):
+            snapshot, first_generation = read_snapshot(self.snapshot_path)
+            store.restore(snapshot)
+        else:
+            store.apply_record((store.CLEAR,))
+
+        replayed = 0
+        generations = [g for g in self._log_generations() if g >= first_generation]
+        for generation in generations:
+            replayed += replay_log(self.log_path(generation), store)
+
+        # Never append after a possibly torn tail: start a fresh generation
+        self._generation = max(generations + [first_generation - 1]) + 1
+        self._log = OperationLog(self.log_path(self._generation), self.fsync)
+        self._since_snapshot = replayed
+        store.journal = self
+        logger.info("Loaded %d tasks from %s (%d log records replayed)",
+                    len(store), self.directory, replayed)
+
+    def write(self, store, record):
+        """Apply a write record to the store and log it
+
+        Returns the affected row and a ticket to pass to ``wait`` (None
+        when not waiting for durability). The store calls ``wait`` only
+        after releasing its own write lock, so that the next writer can
+        queue its record behind this one and share the fsync.
+        """
+        if self._pid != os.getpid():
+            raise RuntimeError(f"{self.directory} is journaled by process {self._pid}; "
+                               "a forked process must load its own store")
+        with self._lock:
+            row = store.apply_record(record)
+            seq = self._log.append(encode_record(record))
+            log = self._log
+            self._since_snapshot += 1
+            if self._since_snapshot >= self.snapshot_every:
+                self._start_checkpoint(store)
+        return row, (log, seq) if self.wait_durable else None
+
+    def wait(self, ticket):
+        """Block until the record ``write`` returned ``ticket`` for is on disk"""
+        log, seq = ticket
+        log.wait(seq)
+
+    def checkpoint(self, store, wait: bool = True):
+        """Snapshot the store now and drop the logs the snapshot covers"""
+        running = self._snapshot_thread
+        if running is not None:
+            running.join()
+        with self._lock:
+            thread = self._start_checkpoint(store)
+        if wait and thread is not None:
+            thread.join()
+
+    def close(self):
+        """Finish any snapshot in progress and close the log"""
+        thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
+        if self._log is not None:
+            self._log.close()
+        if self._lock_file is not None and self._pid == os.getpid():
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _acquire_lock(self):
+        """Lock the directory for this process, or raise RuntimeError"""
+        self._pid = os.getpid()
+        if fcntl is None:
+            return
+        lock_file = open(os.path.join(self.directory, 'lock'), 'a+')
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    lock_file.seek(0)
+                    holder = lock_file.read().strip() or 'unknown'
+                    lock_file.close()
+                    raise RuntimeError(f"{self.directory} is already journaled by another process "
+                                       f"(pid {holder})") from None
+                time.sleep(0.1)
+        lock_file.truncate(0)
+        lock_file.write(str(self._pid))
+        lock_file.flush()
+        self._lock_file = lock_file
+
+    def _start_checkpoint(self, store):
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return None  # the next record past the threshold tries again
+        columns = store.snapshot()
+        # The old generation goes to disk before anything can be synced to the
+        # new one; otherwise a crash could keep a toggle and lose its task's add
+        self._log.close()
+        self._generation += 1
+        self._log = OperationLog(self.log_path(self._generation), self.fsync)
+        self._since_snapshot = 0
+        self._snapshot_thread = threading.Thread(
+            target=self._write_checkpoint, args=(columns, self._generation),
+            name='task-snapshot', daemon=True)
+        self._snapshot_thread.start()
+        return self._snapshot_thread
+
+    def _write_checkpoint(self, columns, generation):
+        try:
+            write_snapshot(self.snapshot_path, columns, generation)
+        except OSError as e:
+            logger.error("Failed to write snapshot to %s: %s", self.directory, e)
+            return
+        for old in self._log_generations():
+            if old < generation:
+                os.remove(self.log_path(old))
+
+    def _log_generations(self) -> List[int]:
+        generations = []
+        for name in os.listdir(self.directory):
+            if name.startswith('ops.') and name.endswith('.log'):
+                try:
+                    generations.append(int(name[4:-4]))
+                except ValueError:
+                    continue
+        return sorted(generations)
+
+
+def encode_record(record) -> bytes:
+    return json.dumps(record, separators=(',', ':')).encode() + b'\n'
+
+
+def replay_log(path: str, store) -> int:
+    """Apply every complete record in a log file, returning how many
+
+    A toggle or delete of a task the store does not have (its add was
+    lost) is logged and skipped rather than failing the load.
+    """
+    count = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                logger.warning("Ignoring torn record at the end of %s", path)
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning("Ignoring unreadable record at the end of %s", path)
+                break
+            try:
+                store.apply_record(record)
+            except KeyError:
+                logger.warning("Skipping %r in %s: no task %s", record, path, record[1])
+                continue
+            count += 1
+    return count
+
+
+def write_snapshot(path: str, columns, log_generation: int):
+    """Write snapshot columns atomically (temp file, fsync, rename)"""
+    header = {
+        'format': SNAPSHOT_FORMAT,
+        'log_generation': log_generation,
+        'next_id': columns['next_id'],
+        'rows': len(columns['ids']),
+    }
+    descriptions = json.dumps(columns['descriptions'], separators=(',', ':')).encode()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(json.dumps(header).encode() + b'\n')
+        columns['ids'].tofile(f)
+        f.write(columns['status'])
+        columns['created'].tofile(f)
+        columns['updated'].tofile(f)
+        f.write(descriptions)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(path))
+
+
+def read_snapshot(path: str):
+    """Read a snapshot, returning (columns, first log generation to replay)"""
+    with open(path, 'rb') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format in {path}")
+        rows = header['rows']
+        ids = array('q')
+        ids.fromfile(f, rows)
+        status = bytearray(f.read(rows))
+        created = array('d')
+        created.fromfile(f, rows)
+        updated = array('d')
+        updated.fromfile(f, rows)
+        descriptions = json.loads(f.read())
+    columns = {
+        'next_id': header['next_id'],
+        'ids': ids,
+        'status': status,
+        'created': created,
+        'updated': updated,
+        'descriptions': descriptions,
+    }
+    return columns, header['log_generation']
+
+
+def _fsync_directory(directory: str):
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return  # not supported on this platform
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
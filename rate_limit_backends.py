@@ -0,0 +1,295 @@
+"""
+Counter storage backends for the rate limiter
+
+RateLimiter only needs two counters per client: requests in the current
+fixed window and in the previous one. A backend stores them. The in-memory
+backend is per process, while the SQLite and Redis backends are shared by
+every worker process that points at the same database or server, so a
+client gets the same limit no matter how many workers serve it.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Tuple
+from urllib.parse import urlparse
+
+
+class RedisError(Exception):
+    """Error reply from a Redis server"""
+
+
+# What a backend raises when its storage is unavailable
+BACKEND_ERRORS = (OSError, sqlite3.Error, RedisError)
+
+
+class RateLimitBackend:
+    """Interface for rate limiter counter storage"""
+
+    def increment(self, client: str, window: int, ttl: int) -> Tuple[int, int]:
+        """Count a request in ``window`` and return (previous, current) counts
+
+        The increment must be atomic: concurrent callers each see a distinct
+        current count. ``ttl`` is how long, in seconds, the counter has to be
+        kept for.
+        """
+        raise NotImplementedError
+
+    def decrement(self, client: str, window: int):
+        """Take back a request counted by ``increment``"""
+        raise NotImplementedError
+
+    def counts(self, client: str, window: int) -> Tuple[int, int]:
+        """Get (previous, current) counts without counting a request"""
+        raise NotImplementedError
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process counters with LRU eviction of idle clients
+
+    Clients are kept in least-recently-seen order. Entries idle for two
+    windows no longer affect any decision and are swept from the old end as
+    new clients arrive, and ``max_clients`` puts a hard cap on how many are
+    tracked at once.
+    """
+
+    def __init__(self, max_clients=100000):
+        self.max_clients = max_clients
+        # client_ip -> [window number, previous window count, current window count]
+        self.clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def increment(self, client, window, ttl):
+        with self._lock:
+            state = self._get_state(client, window)
+            state[2] += 1
+            return state[1], state[2]
+
+    def decrement(self, client, window):
+        with self._lock:
+            state = self.clients.get(client)
+            if state is not None and state[0] == window and state[2] > 0:
+                state[2] -= 1
+
+    def counts(self, client, window):
+        with self._lock:
+            if client not in self.clients:
+                return 0, 0
+            state = self._get_state(client, window)
+            return state[1], state[2]
+
+    def _get_state(self, client, window):
+        """Get the counters for a client, rolled forward to ``window``"""
+        state = self.clients.get(client)
+        if state is None:
+            state = [window, 0, 0]
+            self.clients[client] = state
+            self._evict(window)
+            return state
+
+        self.clients.move_to_end(client)
+        if state[0] != window:
+            state[1] = state[2] if state[0] == window - 1 else 0
+            state[2] = 0
+            state[0] = window
+        return state
+
+    def _evict(self, window):
+        """Drop idle clients from the least recently seen end"""
+        clients = self.clients
+        while len(clients) > self.max_clients:
+            clients.popitem(last=False)
+        # Amortized O(1): each new client sweeps at most a couple of stale ones
+        for _ in range(2):
+            oldest = next(iter(clients.values()))
+            if oldest[0] >= window - 1:
+                break
+            clients.popitem(last=False)
+
+
+class SQLiteBackend(RateLimitBackend):
+    """Counters in a SQLite database in WAL mode, shared by all local workers
+
+    Every thread of every process opens its own connection. An increment is
+    one short ``BEGIN IMMEDIATE`` transaction, so concurrent workers are
+    serialized by SQLite's write lock and never lose an update. Expired
+    windows are deleted every ``cleanup_every`` increments.
+    """
+
+    def __init__(self, path, cleanup_every=1000, timeout=5.0):
+        self.path = path
+        self.cleanup_every = cleanup_every
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ops = 0
+        self._get_connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " client TEXT NOT NULL,"
+            " window INTEGER NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " PRIMARY KEY (client, window)"
+            ") WITHOUT ROWID"
+        )
+
+    def increment(self, client, window, ttl):
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO rate_limits (client, window, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (client, window) DO UPDATE SET count = count + 1",
+                (client, window),
+            )
+            previous, current = self._read_counts(conn, client, window)
+            self._ops += 1
+            if self._ops % self.cleanup_every == 0:
+                conn.execute("DELETE FROM rate_limits WHERE window < ?", (window - 1,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return previous, current
+
+    def decrement(self, client, window):
+        self._get_connection().execute(
+            "UPDATE rate_limits SET count = count - 1 WHERE client = ? AND window = ? AND count > 0",
+            (client, window),
+        )
+
+    def counts(self, client, window):
+        return self._read_counts(self._get_connection(), client, window)
+
+    def _read_counts(self, conn, client, window):
+        rows = dict(conn.execute(
+            "SELECT window, count FROM rate_limits WHERE client = ? AND window IN (?, ?)",
+            (client, window - 1, window),
+        ).fetchall())
+        return rows.get(window - 1, 0), rows.get(window, 0)
+
+    def _get_connection(self):
+        """Get this thread's connection, reopening it after a fork"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+
+class RedisBackend(RateLimitBackend):
+    """Counters in Redis (or anything speaking its protocol)
+
+    Keys are ``<prefix><client>:<window>`` and expire on their own. An
+    increment is one pipelined round trip of INCR, EXPIRE and GET, and INCR
+    is atomic on the server. Only a minimal RESP client is built in, so no
+    Redis library is needed.
+    """
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, prefix='ratelimit:', timeout=1.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip('/') or 0)
+        return cls(parsed.hostname or '127.0.0.1', parsed.port or 6379, db, **kwargs)
+
+    def increment(self, client, window, ttl):
+        current, _, previous = self._execute(
+            ('INCR', self._key(client, window)),
+            ('EXPIRE', self._key(client, window), str(ttl)),
+            ('GET', self._key(client, window - 1)),
+        )
+        return int(previous or 0), current
+
+    def decrement(self, client, window):
+        self._execute(('DECR', self._key(client, window)))
+
+    def counts(self, client, window):
+        previous, current = self._execute(
+            ('GET', self._key(client, window - 1)),
+            ('GET', self._key(client, window)),
+        )
+        return int(previous or 0), int(current or 0)
+
+    def _key(self, client, window):
+        return f'{self.prefix}{client}:{window}'
+
+    def _execute(self, *commands):
+        """Send commands as one pipeline and return their replies"""
+        reader = self._get_connection()
+        payload = b''.join(_encode_command(command) for command in commands)
+        try:
+            self._local.sock.sendall(payload)
+            replies = [_read_reply(reader) for _ in commands]
+        except (OSError, ConnectionError):
+            # Reconnect on the next call
+            self._local.pid = None
+            self._local.reader.close()
+            self._local.sock.close()
+            raise
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _get_connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            local.sock = sock
+            local.reader = sock.makefile('rb')
+            local.pid = os.getpid()
+            if self.db:
+                self._execute(('SELECT', str(self.db)))
+        return local.reader
+
+
+def _encode_command(args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        data = arg.encode() if isinstance(arg, str) else arg
+        parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+    return b''.join(parts)
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by Redis server")
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode()
+    if kind == b'-':
+        return RedisError(body.decode())
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        return reader.read(length + 2)[:-2].decode()
+    if kind == b'*':
+        return [_read_reply(reader) for _ in range(int(body))]
+    raise ConnectionError(f"Unexpected Redis reply: {line!r}")
+
+
+def create_backend(url=None, max_clients=100000):
+    """Create a backend from a URL such as ``sqlite:///path`` or ``redis://host:port/0``"""
+    if not url or url == 'memory':
+        return MemoryBackend(max_clients)
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):])
+    if url.startswith('redis://'):
+        return RedisBackend.from_url(url)
+    raise ValueError(f"Unsupported rate limit backend: {url}")
@@ -4,83 +4,218 @@ Security utilities for the ToDo application
 
 import time
 import hashlib
-import re
-from collections import defaultdict
+import logging
+import math
+import threading
 from datetime import datetime, timedelta
-from flask import request
+from types import MappingProxyType
+from rate_limit_backends import BACKEND_ERRORS, MemoryBackend
+from validators import CONTROL_CHARS_RE, Rule, RuleSet
+
+logger = logging.getLogger(__name__)
 
 class SecurityHeaders:
-    """Apply security headers to responses"""
+    """Add security headers to responses
+
+    Every response falls into a class: a static asset, an HTML page or
+    anything else (JSON, text), each with its cache policy. The header
+    list for each class is built once here and frozen. ``middleware``
+    appends it to the plain header list the app passes to
+    ``start_response``, which skips ``Headers.set``'s per-header scan and
+    validation; the class comes from the request path, query string and
+    response Content-Type, without a per-response endpoint lookup.
+    """
     
-    @staticmethod
-    def apply_headers(response):
-        """Apply comprehensive security headers"""
-        # XSS Protection
-        response.headers['X-XSS-Protection'] = '1; mode=block'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        response.headers['X-Frame-Options'] = 'DENY'
-        
-        # Content Security Policy
-        csp = (
-            "default-src 'self'; "
-            "style-src 'self' 'unsafe-inline' https://cdn.replit.com; "
-            "script-src 'self' 'unsafe-inline'; "
-            "font-src 'self' https://cdn.replit.com; "
-            "img-src 'self' data:; "
-            "connect-src 'self'; "
-            "frame-ancestors 'none';"
-        )
-        response.headers['Content-Security-Policy'] = csp
+    # Pages that answer conditional GETs: browsers may keep a private
+    # copy but must revalidate it (If-None-Match) before every use
+    REVALIDATE_PATHS = frozenset(['/', '/get_tasks'])
+    # Only these may be cached; anything else (a 404 for an asset not yet
+    # deployed, an error page) is no-store whatever the path
+    CACHEABLE_STATUSES = frozenset([200, 206, 304])
+    
+    CSP_SOURCES = {
+        'default-src': ("'self'",),
+        'style-src': ("'self'", "'unsafe-inline'", 'https://cdn.replit.com'),
+        'script-src': ("'self'", "'unsafe-inline'"),
+        'font-src': ("'self'", 'https://cdn.replit.com'),
+        'img-src': ("'self'", 'data:'),
+        'connect-src': ("'self'",),
+        'frame-ancestors': ("'none'",),
+    }
+    # Non-HTML responses load nothing and are never framed
+    API_CSP = "default-src 'none'; frame-ancestors 'none';"
+    
+    COMMON_HEADERS = {
+        'X-XSS-Protection': '1; mode=block',
+        'X-Content-Type-Options': 'nosniff',
+        'X-Frame-Options': 'DENY',
+        'Referrer-Policy': 'strict-origin-when-cross-origin',
+        'Permissions-Policy': 'geolocation=(), microphone=(), camera=()',
+    }
+    NO_STORE = {
+        'Cache-Control': 'no-cache, no-store, must-revalidate',
+        'Pragma': 'no-cache',
+        'Expires': '0',
+    }
+    REVALIDATE = {'Cache-Control': 'private, no-cache'}
+    
+    def __init__(self, csp_sources=None, static_path='/static/', static_max_age=365 * 24 * 3600,
+                 revalidate_paths=None, fingerprinted_path=None):
+        """
+        ``csp_sources`` adds to or replaces directives of CSP_SOURCES.
+        Static URLs carrying a content hash, either in the file name under
+        ``fingerprinted_path`` (default ``<static_path>build/``) or as
+        ``?v=`` (see static_assets), are cached for ``static_max_age``
+        seconds as immutable; other static responses are revalidated.
+        """
+        sources = dict(self.CSP_SOURCES, **(csp_sources or {}))
+        csp = ' '.join(f"{directive} {' '.join(values)};" for directive, values in sources.items())
+        self.content_security_policy = csp
+        self.static_path = static_path
+        self.fingerprinted_path = fingerprinted_path or static_path + 'build/'
+        if revalidate_paths is not None:
+            self.REVALIDATE_PATHS = frozenset(revalidate_paths)
         
-        # Additional security headers
-        response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-        response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
+        html = dict(self.COMMON_HEADERS, **{'Content-Security-Policy': csp})
+        api = dict(self.COMMON_HEADERS, **{'Content-Security-Policy': self.API_CSP})
+        immutable = {'Cache-Control': f'public, max-age={static_max_age}, immutable'}
+        revalidate_static = {'Cache-Control': 'public, no-cache'}
+        # (cache policy, is HTML) -> headers
+        self.header_sets = MappingProxyType({
+            ('static', False): _frozen(api, immutable),
+            ('static', True): _frozen(html, immutable),
+            ('static-unversioned', False): _frozen(api, revalidate_static),
+            ('static-unversioned', True): _frozen(html, revalidate_static),
+            ('revalidate', False): _frozen(api, self.REVALIDATE),
+            ('revalidate', True): _frozen(html, self.REVALIDATE),
+            ('no-store', False): _frozen(api, self.NO_STORE),
+            ('no-store', True): _frozen(html, self.NO_STORE),
+        })
+        self._names = frozenset(name.lower() for headers in self.header_sets.values() for name, _ in headers)
+    
+    def cache_policy(self, path, query_string, status=200):
+        """'static', 'static-unversioned', 'revalidate' or 'no-store'"""
+        if status not in self.CACHEABLE_STATUSES:
+            return 'no-store'
+        if path.startswith(self.static_path):
+            versioned = (path.startswith(self.fingerprinted_path)
+                         or query_string.startswith('v=') or '&v=' in query_string)
+            return 'static' if versioned else 'static-unversioned'
+        return 'revalidate' if path in self.REVALIDATE_PATHS else 'no-store'
+    
+    def add_headers(self, environ, headers, status=200):
+        """Return the WSGI header list with this response's header set added
+
+        Headers of the set that the app already sent are replaced.
+        """
+        is_html = False
+        clash = False
+        for name, value in headers:
+            name = name.lower()
+            if name == 'content-type':
+                is_html = value.startswith('text/html')
+            if name in self._names:
+                clash = True
+        if clash:
+            headers = [header for header in headers if header[0].lower() not in self._names]
+        policy = self.cache_policy(environ.get('PATH_INFO', ''), environ.get('QUERY_STRING', ''), status)
+        return headers + list(self.header_sets[policy, is_html])
+    
+    def middleware(self, wsgi_app):
+        """Wrap a WSGI app so that every response it starts gets its headers"""
+        add_headers = self.add_headers
         
-        # Cache control for sensitive pages
-        if request.endpoint not in ['static']:
-            response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            response.headers['Pragma'] = 'no-cache'
-            response.headers['Expires'] = '0'
+        def app_with_headers(environ, start_response):
+            def start(status, headers, exc_info=None):
+                return start_response(status, add_headers(environ, headers, int(status[:3])), exc_info)
+            return wsgi_app(environ, start)
         
-        return response
+        return app_with_headers
 
 class RateLimiter:
-    """Simple rate limiter to prevent abuse"""
+    """Sliding-window-counter rate limiter with constant state per client
+
+    Each client only has the request counts of the current fixed window
+    and the one before it. The previous count is weighted by how much of
+    the previous window still overlaps the sliding window ending now, which
+    approximates a true sliding log without storing a timestamp per request.
+
+    The counters live in a pluggable backend (see ``rate_limit_backends``):
+    in-process memory by default, or SQLite/Redis to share one limit across
+    worker processes. When a shared backend is unavailable the limiter
+    fails open: requests are allowed and counted in ``backend_errors``.
+    """
     
-    def __init__(self, max_requests=100, time_window=3600):
+    def __init__(self, max_requests=100, time_window=3600, max_clients=100000, clock=time.time, backend=None):
         self.max_requests = max_requests  # Maximum requests per time window
         self.time_window = time_window    # Time window in seconds (1 hour)
-        self.requests = defaultdict(list)
+        self.clock = clock
+        self.backend = backend if backend is not None else MemoryBackend(max_clients)
+        self.backend_errors = 0
+        self._failing = False
+        self._error_lock = threading.Lock()
     
     def is_allowed(self, client_ip):
         """Check if client is allowed to make a request"""
-        now = time.time()
-        client_requests = self.requests[client_ip]
-        
-        # Remove old requests outside the time window
-        client_requests[:] = [req_time for req_time in client_requests if now - req_time < self.time_window]
+        now = self.clock()
+        window, weight = self._window(now)
         
-        # Check if client has exceeded rate limit
-        if len(client_requests) >= self.max_requests:
-            return False
-        
-        # Record this request
-        client_requests.append(now)
+        # Record this request, then take it back if it went over the limit
+        try:
+            previous, current = self.backend.increment(client_ip, window, 2 * self.time_window)
+            if previous * weight + current > self.max_requests:
+                self.backend.decrement(client_ip, window)
+                return False
+        except BACKEND_ERRORS as e:
+            self._backend_failed(e)
+            return True
+        self._backend_ok()
         return True
     
     def get_remaining_requests(self, client_ip):
         """Get remaining requests for client"""
-        now = time.time()
-        client_requests = self.requests[client_ip]
-        
-        # Remove old requests
-        client_requests[:] = [req_time for req_time in client_requests if now - req_time < self.time_window]
-        
-        return max(0, self.max_requests - len(client_requests))
+        window, weight = self._window(self.clock())
+        try:
+            previous, current = self.backend.counts(client_ip, window)
+        except BACKEND_ERRORS as e:
+            self._backend_failed(e)
+            return self.max_requests
+        return max(0, math.ceil(self.max_requests - previous * weight - current))
+    
+    def _backend_failed(self, error):
+        """Count a backend error; log it when the backend starts failing"""
+        with self._error_lock:
+            self.backend_errors += 1
+            first = not self._failing
+            self._failing = True
+        if first:
+            logger.error("Rate limit backend unavailable, allowing requests: %s", error)
+    
+    def _backend_ok(self):
+        if self._failing:
+            with self._error_lock:
+                if not self._failing:
+                    return
+                self._failing = False
+            logger.warning("Rate limit backend recovered after %d errors", self.backend_errors)
+    
+    def _window(self, now):
+        """Get the current window number and the weight of the previous one"""
+        position = now / self.time_window
+        window = int(position)
+        return window, 1.0 - (position - window)
 
 class InputSanitizer:
     """Sanitize and validate user inputs"""
     
+    # Checked against lowercased descriptions; see validators.RuleSet
+    DESCRIPTION_RULES = RuleSet([
+        Rule.open_tag('script_tag', 'script'),
+        Rule.regex('javascript_url', r'javascript:', 'javascript:', ':'),
+        Rule.regex('vbscript_url', r'vbscript:', 'vbscript:', ':'),
+        Rule.regex('event_handler', r'on(?:load|error|click|mouseover)=', '=', '='),
+    ], control_chars=False)
+    
     @staticmethod
     def sanitize_text(text):
         """Sanitize text input"""
@@ -88,7 +223,7 @@ class InputSanitizer:
             return ""
         
         # Remove null bytes and control characters
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+        text = CONTROL_CHARS_RE.sub('', text)
         
         # Limit length
         text = text[:1000]
@@ -109,22 +244,7 @@ class InputSanitizer:
             return False
         
         # Check for potentially dangerous patterns
-        dangerous_patterns = [
-            r'<script[^>]*>',
-            r'javascript:',
-            r'vbscript:',
-            r'onload=',
-            r'onerror=',
-            r'onclick=',
-            r'onmouseover=',
-        ]
-        
-        description_lower = description.lower()
-        for pattern in dangerous_patterns:
-            if re.search(pattern, description_lower):
-                return False
-        
-        return True
+        return InputSanitizer.DESCRIPTION_RULES.first_match(description.lower()) is None
     
     @staticmethod
     def generate_csrf_token():
@@ -160,3 +280,11 @@ class SecurityLogger:
     def log_csrf_violation(client_ip):
         """Log CSRF token violations"""
         SecurityLogger.log_suspicious_activity(client_ip, "CSRF_VIOLATION")
+
+
+def _frozen(*parts):
+    """Merge header dicts into a tuple of (name, value) pairs"""
+    headers = {}
+    for part in parts:
+        headers.update(part)
+    return tuple(headers.items())
@@ -0,0 +1,170 @@
+"""
+Production server for the ToDo application
+
+    python serve.py [--bind 0.0.0.0:5000] [--workers N] [--threads N]
+
+Runs the app under gunicorn's pre-fork arbiter. With DATABASE_URL set
+the app is imported and warmed up once in the master (``preload_app``):
+templates are compiled, static assets built, regexes and the store
+initialized, then shared copy-on-write with every forked worker. Each
+worker sends the warm-up requests again before it takes traffic, so its
+own connection pools and caches are ready for the first real request.
+
+The in-memory store is different: a copy forked from the master would
+be the tasks as they were at startup, so each worker imports the app
+itself and replays TASKS_DATA_DIR's journal. A worker replacing another
+(after ``kill -HUP``, a timeout or MAX_REQUESTS) waits for the old one to
+let go of the journal before it loads the latest tasks.
+
+Configured from the environment (command-line options win):
+
+    BIND              address to listen on (default 0.0.0.0:$PORT, PORT 5000)
+    WEB_CONCURRENCY   worker processes (default: one per CPU)
+    THREADS           threads per worker (default 4; 1 uses sync workers)
+    TIMEOUT           seconds before a silent worker is restarted (default 30)
+    GRACEFUL_TIMEOUT  seconds a worker gets to finish on reload/stop (default 30)
+    MAX_REQUESTS      recycle a worker after this many requests (default 0: never)
+    WARMUP_PATHS      comma-separated GET paths for warm-up (default /,/get_tasks)
+    SSE_MAX_STREAMS   event streams per worker, each holding a thread
+                      (default: half the threads; none with sync workers)
+    TASKS_LOCK_TIMEOUT
+                      seconds a new worker waits for the journal
+                      (default: GRACEFUL_TIMEOUT + 10)
+    LOG_LEVEL         default INFO, written from a queue (see logging_config)
+    METRICS_DIR       where workers leave metrics for /metrics to merge
+                      (default: a temporary directory when workers > 1)
+
+The in-memory store lives in each process, so unless DATABASE_URL is
+set only one worker is started, and without TASKS_DATA_DIR its tasks
+go with it. ``kill -HUP <master>`` replaces the workers gracefully;
+with the app preloaded, new code is deployed with ``kill -USR2
+<master>`` (a new master) followed by ``kill -TERM`` to the old one.
+"""
+
+import argparse
+import atexit
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from typing import Dict, List
+
+from gunicorn.app.base import BaseApplication
+
+from logging_config import configure_logging
+
+logger = logging.getLogger('serve')
+
+
+def warm_up(app, paths: List[str]):
+    """Send GET ``paths`` through ``app`` in-process
+
+    The requests are not rate limited or counted in /metrics; each one
+    that fails is logged rather than aborting startup.
+    """
+    client = app.test_client(use_cookies=False)
+    for path in paths:
+        response = client.get(path, environ_base={'todo.warmup': True})
+        if response.status_code >= 400:
+            logger.warning("Warm-up GET %s returned %d", path, response.status_code)
+
+
+class TaskServer(BaseApplication):
+    """gunicorn application running ``app.create_app()`` with the options given"""
+
+    def __init__(self, options: Dict, warmup_paths: List[str]):
+        self.options = options
+        self.warmup_paths = warmup_paths
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('post_fork', self.post_fork)
+        self.cfg.set('post_worker_init', self.post_worker_init)
+
+    def load(self):
+        from app import create_app
+
+        app = create_app()
+
+        # Preloaded, the master warms up once for every worker it forks
+        if self.cfg.preload_app:
+            warm_up(app, self.warmup_paths)
+        return app
+
+    def post_fork(self, server, worker):
+        # gunicorn only hears from a worker once it has booted, and loading
+        # the app may first wait for the worker it replaces to release the journal
+        self.booted = threading.Event()
+        threading.Thread(target=_alive_until, args=(worker, self.booted), daemon=True).start()
+
+        # Connections pooled by the master must not be shared with workers
+        app_module = sys.modules.get('app')
+        engine = getattr(getattr(app_module, 'task_store', None), 'engine', None)
+        if engine is not None:
+            engine.dispose(close=False)
+
+    def post_worker_init(self, worker):
+        warm_up(worker.wsgi, self.warmup_paths)
+        self.booted.set()
+        logger.info("Worker %d warmed up", worker.pid)
+
+
+def _alive_until(worker, booted: threading.Event, interval: float = 1.0):
+    while not booted.wait(interval):
+        worker.tmp.notify()
+
+
+def server_options(bind: str, workers: int, threads: int, preload: bool = True) -> Dict:
+    """gunicorn settings for the given size, the rest from the environment"""
+    return {
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'preload_app': preload,
+        'timeout': int(os.environ.get('TIMEOUT', '30')),
+        'graceful_timeout': int(os.environ.get('GRACEFUL_TIMEOUT', '30')),
+        'max_requests': int(os.environ.get('MAX_REQUESTS', '0')),
+        'max_requests_jitter': int(os.environ.get('MAX_REQUESTS', '0')) // 10,
+        'accesslog': None,
+    }
+
+
+def _remove_in_master(master: int, directory: str):
+    # Workers inherit the master's exit handlers
+    if os.getpid() == master:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bind', default=os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}"))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('THREADS', '4')))
+    args = parser.parse_args()
+
+    configure_logging(production=True)
+    # app.py keeps tasks in memory unless DATABASE_URL is set
+    if not os.environ.get('DATABASE_URL') and args.workers > 1:
+        logger.warning("The in-memory task store is per process; starting 1 worker, not %d "
+                       "(set DATABASE_URL to share tasks between workers)", args.workers)
+        args.workers = 1
+    # A scrape lands on one worker; the shared directory lets it report them all
+    if args.workers > 1 and not os.environ.get('METRICS_DIR'):
+        os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='todo-metrics-')
+        atexit.register(_remove_in_master, os.getpid(), os.environ['METRICS_DIR'])
+    # Leave threads for ordinary requests; a sync worker serves no streams at all
+    os.environ.setdefault('SSE_MAX_STREAMS', str(args.threads // 2))
+    warmup_paths = [path for path in os.environ.get('WARMUP_PATHS', '/,/get_tasks').split(',') if path]
+    options = server_options(args.bind, args.workers, args.threads, preload=bool(os.environ.get('DATABASE_URL')))
+    # The worker being replaced holds the journal until it exits, GRACEFUL_TIMEOUT at the latest
+    os.environ.setdefault('TASKS_LOCK_TIMEOUT', str(options['graceful_timeout'] + 10))
+    TaskServer(options, warmup_paths).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+"""
+Database-backed task storage
+
+SQLTaskStorage implements the same interface as models.TaskStorage on top
+of SQLAlchemy Core, so the app can keep its tasks in MySQL, PostgreSQL or
+SQLite instead of process memory. Filtering and counting run in SQL, and
+writes are single statements rather than read-modify-write round trips.
+"""
+
+import secrets
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import (BigInteger, Boolean, Column, DateTime, Index, Integer, MetaData, String, Table,
+                        Text, create_engine, delete, event, func, not_, select, update)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+
+metadata = MetaData()
+
+tasks_table = Table(
+    'tasks', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('description', Text, nullable=False),
+    Column('completed', Boolean, nullable=False, default=False),
+    Column('created_at', DateTime, nullable=False),
+    Column('updated_at', DateTime, nullable=False),
+    # Serves ?filter=active/completed in id order and the per-status counts;
+    # lookups by id use the primary key index
+    Index('ix_tasks_completed_id', 'completed', 'id'),
+)
+
+# One row holding the store's version counter, bumped in every write
+# transaction so all processes sharing the database agree on it
+store_meta_table = Table(
+    'task_store_meta', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('epoch', String(32), nullable=False),
+    Column('version', BigInteger, nullable=False),
+)
+
+
+class SQLTaskStorage:
+    """Task storage in a SQL database with a pooled engine"""
+
+    def __init__(self, url: str, pool_size: int = 5, max_overflow: int = 10,
+                 pool_recycle: int = 1800, echo: bool = False):
+        self.engine = create_engine(url, echo=echo, **_pool_options(url, pool_size, max_overflow, pool_recycle))
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine, 'connect', _configure_sqlite)
+        metadata.create_all(self.engine)
+        self._returning = self.engine.dialect.update_returning and self.engine.dialect.delete_returning
+        self.epoch = self._init_meta()
+
+    @property
+    def version(self) -> int:
+        """Counter that goes up with every write, shared by all processes
+
+        Each access is a query; callers read it once per request.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(select(store_meta_table.c.version)).scalar_one()
+
+    def __len__(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(tasks_table)).scalar_one()
+
+    def add_task(self, description: str) -> Dict:
+        """Add a new task"""
+        now = datetime.now()
+        with self.engine.begin() as conn:
+            result = conn.execute(tasks_table.insert().values(
+                description=description, completed=False, created_at=now, updated_at=now))
+            task_id = result.inserted_primary_key[0]
+            _bump_version(conn)
+        return _to_dict((task_id, description, False, now, now))
+
+    def get_task(self, task_id: int) -> Optional[Dict]:
+        """Get a task by ID"""
+        with self.engine.connect() as conn:
+            row = conn.execute(_select_tasks().where(tasks_table.c.id == task_id)).first()
+        return _to_dict(row) if row is not None else None
+
+    def get_all_tasks(self) -> List[Dict]:
+        """Get all tasks"""
+        return self.get_filtered_tasks('all')
+
+    def get_filtered_tasks(self, filter_type: str) -> List[Dict]:
+        """Get filtered tasks"""
+        query = _filter(_select_tasks(), filter_type).order_by(tasks_table.c.id)
+        with self.engine.connect() as conn:
+            return [_to_dict(row) for row in conn.execute(query)]
+
+    def get_page(self, filter_type: str, after_id: int = 0, limit: int = 50) -> Tuple[List[Dict], bool]:
+        """Get up to ``limit`` filtered tasks with IDs above ``after_id``
+
+        A keyset query: the primary key (or ``ix_tasks_completed_id`` when
+        filtering) is range-scanned from ``after_id``, so deep pages cost no
+        more than the first one. One extra row is fetched to tell whether
+        more follow.
+        """
+        query = (
+            _filter(_select_tasks(), filter_type)
+            .where(tasks_table.c.id > after_id)
+            .order_by(tasks_table.c.id)
+            .limit(limit + 1)
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).fetchall()
+        return [_to_dict(row) for row in rows[:limit]], len(rows) > limit
+
+    def toggle_task(self, task_id: int) -> Optional[Dict]:
+        """Toggle task completion in one UPDATE, returning the updated task"""
+        statement = (
+            update(tasks_table)
+            .where(tasks_table.c.id == task_id)
+            .values(completed=not_(tasks_table.c.completed), updated_at=datetime.now())
+        )
+        with self.engine.begin() as conn:
+            if self._returning:
+                row = conn.execute(statement.returning(*tasks_table.c)).first()
+            else:
+                if conn.execute(statement).rowcount == 0:
+                    return None
+                row = conn.execute(_select_tasks().where(tasks_table.c.id == task_id)).first()
+            if row is not None:
+                _bump_version(conn)
+        return _to_dict(row) if row is not None else None
+
+    def delete_task(self, task_id: int) -> Optional[Dict]:
+        """Delete a task, returning the removed task"""
+        statement = delete(tasks_table).where(tasks_table.c.id == task_id)
+        with self.engine.begin() as conn:
+            if self._returning:
+                row = conn.execute(statement.returning(*tasks_table.c)).first()
+            else:
+                row = conn.execute(_select_tasks().where(tasks_table.c.id == task_id).with_for_update()).first()
+                if row is not None:
+                    conn.execute(statement)
+            if row is not None:
+                _bump_version(conn)
+        return _to_dict(row) if row is not None else None
+
+    def add_tasks(self, descriptions: List[str]) -> List[Dict]:
+        """Add several tasks in one transaction"""
+        now = datetime.now()
+        values = [{'description': description, 'completed': False, 'created_at': now, 'updated_at': now}
+                  for description in descriptions]
+        if not values:
+            return []
+        with self.engine.begin() as conn:
+            if self.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+                statement = tasks_table.insert().returning(tasks_table.c.id, sort_by_parameter_order=True)
+                task_ids = conn.execute(statement, values).scalars().all()
+            else:
+                task_ids = [conn.execute(tasks_table.insert().values(**row)).inserted_primary_key[0]
+                            for row in values]
+            _bump_version(conn)
+        return [_to_dict((task_id, description, False, now, now))
+                for task_id, description in zip(task_ids, descriptions)]
+
+    def toggle_tasks(self, task_ids: List[int], completed: Optional[bool] = None) -> List[Optional[Dict]]:
+        """Toggle several tasks in one UPDATE, or set them all to ``completed``
+
+        Returns the updated task (None if missing) for each ID; an ID given
+        more than once is applied once.
+        """
+        state = not_(tasks_table.c.completed) if completed is None else completed
+        statement = (
+            update(tasks_table)
+            .where(tasks_table.c.id.in_(task_ids))
+            .values(completed=state, updated_at=datetime.now())
+        )
+        with self.engine.begin() as conn:
+            if self._returning:
+                rows = conn.execute(statement.returning(*tasks_table.c)).fetchall()
+            else:
+                conn.execute(statement)
+                rows = conn.execute(_select_tasks().where(tasks_table.c.id.in_(task_ids))).fetchall()
+            if rows:
+                _bump_version(conn)
+        return _by_id(rows, task_ids)
+
+    def delete_tasks(self, task_ids: List[int]) -> List[Optional[Dict]]:
+        """Delete several tasks in one DELETE, returning each removed task"""
+        statement = delete(tasks_table).where(tasks_table.c.id.in_(task_ids))
+        with self.engine.begin() as conn:
+            if self._returning:
+                rows = conn.execute(statement.returning(*tasks_table.c)).fetchall()
+            else:
+                rows = conn.execute(
+                    _select_tasks().where(tasks_table.c.id.in_(task_ids)).with_for_update()).fetchall()
+                conn.execute(statement)
+            if rows:
+                _bump_version(conn)
+        return _by_id(rows, task_ids)
+
+    def delete_completed(self) -> int:
+        """Delete every completed task in one DELETE, returning how many"""
+        with self.engine.begin() as conn:
+            deleted = conn.execute(delete(tasks_table).where(tasks_table.c.completed)).rowcount
+            if deleted:
+                _bump_version(conn)
+        return deleted
+
+    def clear(self):
+        """Remove every task"""
+        with self.engine.begin() as conn:
+            conn.execute(delete(tasks_table))
+            _bump_version(conn)
+
+    def get_task_count(self) -> Dict[str, int]:
+        """Get task counts by status"""
+        query = select(tasks_table.c.completed, func.count()).group_by(tasks_table.c.completed)
+        with self.engine.connect() as conn:
+            counts = {bool(completed): count for completed, count in conn.execute(query)}
+        active = counts.get(False, 0)
+        completed = counts.get(True, 0)
+        return {
+            'total': active + completed,
+            'active': active,
+            'completed': completed
+        }
+
+    def close(self):
+        """Close every pooled connection"""
+        self.engine.dispose()
+
+    def _init_meta(self) -> str:
+        """Create the version row if this is a new database; return its epoch"""
+        query = select(store_meta_table.c.epoch)
+        with self.engine.begin() as conn:
+            epoch = conn.execute(query).scalar()
+        if epoch is None:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(store_meta_table.insert().values(id=1, epoch=secrets.token_hex(6), version=0))
+            except IntegrityError:
+                pass  # another process created it first
+            with self.engine.connect() as conn:
+                epoch = conn.execute(query).scalar_one()
+        return epoch
+
+
+def _bump_version(conn):
+    # Only after a statement changed rows: a no-op must not invalidate every
+    # client's ETag and cached fragments, or queue writers on the meta row
+    conn.execute(update(store_meta_table).values(version=store_meta_table.c.version + 1))
+
+
+def _select_tasks():
+    c = tasks_table.c
+    return select(c.id, c.description, c.completed, c.created_at, c.updated_at)
+
+
+def _filter(query, filter_type: str):
+    if filter_type == 'active':
+        return query.where(tasks_table.c.completed == False)  # noqa: E712
+    if filter_type == 'completed':
+        return query.where(tasks_table.c.completed == True)  # noqa: E712
+    return query
+
+
+def _to_dict(row) -> Dict:
+    task_id, description, completed, created_at, updated_at = row
+    return {
+        'id': task_id,
+        'description': description,
+        'completed': bool(completed),
+        'created_at': created_at.isoformat(),
+        'updated_at': updated_at.isoformat()
+    }
+
+
+def _by_id(rows, task_ids: List[int]) -> List[Optional[Dict]]:
+    """Line up result rows with the requested IDs, None where one is missing"""
+    tasks = {row[0]: _to_dict(row) for row in rows}
+    return [tasks.get(task_id) for task_id in task_ids]
+
+
+def _pool_options(url: str, pool_size: int, max_overflow: int, pool_recycle: int) -> Dict:
+    """Engine pool settings; in-memory SQLite has to share one connection"""
+    if url.startswith('sqlite') and (':memory:' in url or url.rstrip('/') == 'sqlite:'):
+        return {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': True,
+    }
+    if url.startswith('sqlite'):
+        options['connect_args'] = {'check_same_thread': False}
+    return options
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
@@ -53,7 +53,7 @@ const TodoApp = {
     init: function() {
         this.bindEvents();
         this.setupFormValidation();
-        this.updateTaskCounts();
+        this.subscribeToChanges();
         console.log('ToDo App initialized securely');
     },
     
@@ -83,6 +83,26 @@ const TodoApp = {
             }
         });
         
+        // Selection for bulk actions
+        document.addEventListener('change', function(e) {
+            if (e.target.classList.contains('task-select')) {
+                TodoApp.updateSelection();
+            }
+        });
+        
+        // Bulk action buttons
+        const bulkActions = {
+            completeSelected: this.completeSelected,
+            deleteSelected: this.deleteSelected,
+            clearCompleted: this.clearCompleted
+        };
+        Object.keys(bulkActions).forEach(id => {
+            const button = document.getElementById(id);
+            if (button) {
+                button.addEventListener('click', bulkActions[id].bind(this));
+            }
+        });
+        
         // Filter button clicks
         document.addEventListener('click', function(e) {
             if (e.target.classList.contains('filter-btn')) {
@@ -204,7 +224,7 @@ const TodoApp = {
             if (data.success) {
                 // Update UI
                 taskItem.classList.toggle('completed', data.completed);
-                this.updateTaskCounts();
+                this.updateTaskCounts(data.counts);
                 this.showSuccess(data.message || 'Task updated successfully');
             } else {
                 checkbox.checked = !checkbox.checked; // Revert checkbox
@@ -258,7 +278,7 @@ const TodoApp = {
                 
                 setTimeout(() => {
                     taskItem.remove();
-                    this.updateTaskCounts();
+                    this.updateTaskCounts(data.counts);
                     this.checkEmptyState();
                 }, 300);
                 
@@ -276,6 +296,105 @@ const TodoApp = {
         });
     },
     
+    // Send one batch request to the server
+    batchRequest: function(url, payload) {
+        const csrfToken = Security.getCsrfToken();
+        if (!csrfToken) {
+            return Promise.reject(new Error('Security error: Missing required tokens'));
+        }
+        
+        return fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+                'X-Requested-With': 'XMLHttpRequest'
+            },
+            body: JSON.stringify(payload)
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.error || 'Batch request failed');
+            }
+            this.updateTaskCounts(data.counts);
+            return data;
+        });
+    },
+    
+    // IDs of the tasks ticked for bulk actions
+    selectedTaskIds: function() {
+        return Array.from(document.querySelectorAll('.task-select:checked'))
+            .map(checkbox => parseInt(checkbox.dataset.taskId, 10));
+    },
+    
+    // Enable the bulk buttons while something is selected
+    updateSelection: function() {
+        const hasSelection = this.selectedTaskIds().length > 0;
+        ['completeSelected', 'deleteSelected'].forEach(id => {
+            const button = document.getElementById(id);
+            if (button) button.disabled = !hasSelection;
+        });
+    },
+    
+    // Mark every selected task as completed in one request
+    completeSelected: function() {
+        const ids = this.selectedTaskIds();
+        if (ids.length === 0) return;
+        
+        this.batchRequest('/batch/toggle_tasks', {ids: ids, completed: true})
+        .then(data => {
+            data.results.filter(result => result.success).forEach(result => {
+                const checkbox = document.getElementById(`task-${result.id}`);
+                if (checkbox) {
+                    checkbox.checked = true;
+                    checkbox.closest('.task-item').classList.add('completed');
+                }
+            });
+            document.querySelectorAll('.task-select:checked').forEach(box => { box.checked = false; });
+            this.updateSelection();
+            this.showSuccess('Selected tasks marked as completed');
+        })
+        .catch(error => {
+            console.error('Error updating tasks:', error);
+            this.showError(error.message || 'Network error occurred');
+        });
+    },
+    
+    // Delete every selected task in one request
+    deleteSelected: function() {
+        const ids = this.selectedTaskIds();
+        if (ids.length === 0 || !confirm(`Delete ${ids.length} selected task(s)?`)) return;
+        
+        this.batchRequest('/batch/delete_tasks', {ids: ids})
+        .then(data => {
+            data.results.filter(result => result.success).forEach(result => {
+                const checkbox = document.getElementById(`task-${result.id}`);
+                if (checkbox) checkbox.closest('.task-item').remove();
+            });
+            this.updateSelection();
+            this.checkEmptyState();
+            this.showSuccess('Selected tasks deleted');
+        })
+        .catch(error => {
+            console.error('Error deleting tasks:', error);
+            this.showError(error.message || 'Network error occurred');
+        });
+    },
+    
+    // Delete all completed tasks, not just those on this page
+    clearCompleted: function() {
+        if (!confirm('Delete all completed tasks?')) return;
+        
+        // One request, however many tasks are completed
+        this.batchRequest('/batch/delete_tasks', {filter: 'completed'})
+        .then(() => window.location.reload())
+        .catch(error => {
+            console.error('Error clearing completed tasks:', error);
+            this.showError(error.message || 'Network error occurred');
+        });
+    },
+    
     // Filter tasks
     filterTasks: function(filterType) {
         // Validate filter type
@@ -284,47 +403,26 @@ const TodoApp = {
             return;
         }
         
-        // Update URL without page reload
+        // Tasks are paged per filter on the server, so load the first page
+        // of the chosen filter rather than hiding items on this page
         const url = new URL(window.location);
+        url.searchParams.delete('cursor');
         if (filterType === 'all') {
             url.searchParams.delete('filter');
         } else {
             url.searchParams.set('filter', filterType);
         }
-        window.history.pushState({}, '', url);
-        
-        // Update filter buttons
-        document.querySelectorAll('.filter-btn').forEach(btn => {
-            btn.classList.remove('active');
-        });
-        document.querySelector(`[data-filter="${filterType}"]`).classList.add('active');
-        
-        // Filter task items
-        const tasks = document.querySelectorAll('.task-item');
-        tasks.forEach(task => {
-            const isCompleted = task.classList.contains('completed');
-            let show = true;
-            
-            if (filterType === 'active' && isCompleted) {
-                show = false;
-            } else if (filterType === 'completed' && !isCompleted) {
-                show = false;
-            }
-            
-            task.style.display = show ? 'block' : 'none';
-        });
-        
-        this.checkEmptyState();
+        window.location.assign(url);
     },
     
-    // Update task counts
-    updateTaskCounts: function() {
-        const tasks = document.querySelectorAll('.task-item');
-        const completedTasks = document.querySelectorAll('.task-item.completed');
+    // Update task counts from the totals the server returned; the page
+    // only holds one page of tasks, so they cannot be counted here
+    updateTaskCounts: function(counts) {
+        if (!counts) return;
         
-        const totalCount = tasks.length;
-        const completedCount = completedTasks.length;
-        const activeCount = totalCount - completedCount;
+        const totalCount = counts.total;
+        const completedCount = counts.completed;
+        const activeCount = counts.active;
         
         // Update count displays
         const totalElement = document.getElementById('totalCount');
@@ -332,6 +430,9 @@ const TodoApp = {
         const completedElement = document.getElementById('completedCount');
         
         if (totalElement) totalElement.textContent = totalCount;
+        
+        const clearButton = document.getElementById('clearCompleted');
+        if (clearButton) clearButton.disabled = completedCount === 0;
         if (activeElement) activeElement.textContent = activeCount;
         if (completedElement) completedElement.textContent = completedCount;
         
@@ -348,6 +449,95 @@ const TodoApp = {
         });
     },
     
+    // Follow changes made in other tabs and devices over Server-Sent Events
+    subscribeToChanges: function() {
+        const feed = document.getElementById('taskFeed');
+        if (!feed || !window.EventSource) return;
+        
+        // EventSource reconnects on its own, resuming from the last event ID
+        const source = new EventSource(feed.dataset.url);
+        const track = e => { if (e.lastEventId) this.setFeedPosition(feed, e.lastEventId); };
+        source.addEventListener('change', e => {
+            track(e);
+            this.applyChange(JSON.parse(e.data), feed.dataset.filter);
+        });
+        source.addEventListener('counts', e => this.updateTaskCounts(JSON.parse(e.data)));
+        source.addEventListener('resync', e => {
+            track(e);
+            this.updateTaskCounts(JSON.parse(e.data).counts);
+            this.resyncTaskList();
+        });
+        // A refused stream (503: the server has no thread to spare) is not retried by EventSource
+        source.addEventListener('error', () => {
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(() => this.subscribeToChanges(), 60000 * (1 + Math.random()));
+            }
+        });
+    },
+    
+    // Resubscribe after this position rather than the one the page was rendered at
+    setFeedPosition: function(feed, position) {
+        const url = new URL(feed.dataset.url, window.location.href);
+        url.searchParams.set('since', position);
+        feed.dataset.url = url.pathname + url.search;
+    },
+    
+    // Apply one add, toggle or delete to this page's tasks
+    applyChange: function(change, filterType) {
+        if (change.op === 'add') {
+            // New tasks have the highest IDs: they belong at the end of the last page
+            if (filterType === 'completed' || document.getElementById('nextPage') ||
+                document.getElementById(`task-${change.task.id}`)) return;
+            document.getElementById('tasksList').appendChild(this.buildTaskItem(change.task));
+        } else {
+            const checkbox = document.getElementById(`task-${change.id}`);
+            if (!checkbox) return;
+            const taskItem = checkbox.closest('.task-item');
+            if (change.op === 'delete') {
+                taskItem.remove();
+                this.updateSelection();
+            } else if (change.op === 'toggle') {
+                checkbox.checked = change.completed;
+                taskItem.classList.toggle('completed', change.completed);
+                const hidden = (filterType === 'active' && change.completed) ||
+                               (filterType === 'completed' && !change.completed);
+                taskItem.style.display = hidden ? 'none' : '';
+            }
+        }
+        this.checkEmptyState();
+    },
+    
+    // Build a task card from the server-rendered template
+    buildTaskItem: function(task) {
+        const taskItem = document.getElementById('taskItemTemplate').content
+            .querySelector('.task-item').cloneNode(true);
+        taskItem.querySelectorAll('[data-task-id]').forEach(el => { el.dataset.taskId = task.id; });
+        const checkbox = taskItem.querySelector('.task-checkbox');
+        checkbox.id = `task-${task.id}`;
+        const label = taskItem.querySelector('.task-description');
+        label.htmlFor = checkbox.id;
+        // Descriptions are stored HTML-escaped; the server template renders them the same way
+        label.innerHTML = task.description;
+        taskItem.querySelector('.task-dates').textContent = `Created: ${task.created_at.slice(0, 10)}`;
+        return taskItem;
+    },
+    
+    // Replace the task list with a fresh copy of this page
+    resyncTaskList: function() {
+        fetch(window.location.href, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(response => response.text())
+        .then(html => {
+            const page = new DOMParser().parseFromString(html, 'text/html');
+            const fresh = page.getElementById('taskListContainer');
+            const container = document.getElementById('taskListContainer');
+            if (fresh && container) {
+                container.replaceChildren(...fresh.childNodes);
+                this.updateSelection();
+            }
+        })
+        .catch(error => console.error('Error reloading tasks:', error));
+    },
+    
     // Check if we should show empty state
     checkEmptyState: function() {
         const visibleTasks = document.querySelectorAll('.task-item[style*="display: block"], .task-item:not([style*="display: none"])');
@@ -0,0 +1,381 @@
+"""
+Static asset pipeline
+
+At startup (or ahead of time with ``python static_assets.py``) every .js
+and .css file under the static folder is minified, written out under a
+content-hashed name such as ``js/app.3f0c9a1b2d4e.js``, and precompressed
+into ``.gz`` (and ``.br`` when the ``brotli`` package is installed)
+siblings. A manifest in the build directory maps source names to built
+ones, so a later start with unchanged sources reuses the build.
+
+``url_for('static', filename='js/app.js')`` resolves to the built name
+under ``build/`` by a lookup in the manifest, and the static route serves it with ``send_file`` (which
+uses the server's zero-copy file wrapper where there is one) in the best
+encoding the client accepts. A fingerprinted URL never changes content,
+so the security headers mark it immutable. Other static files get a
+``v=<content hash>`` query argument instead.
+
+If the build directory cannot be written (a read-only deploy without a
+prebuilt manifest) the sources are served as they are, with ``?v=``.
+
+Only in debug mode are the sources checked on every ``url_for`` and an
+edited one rebuilt; otherwise the files are hashed once at startup.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import sys
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from flask import current_app, request, send_file
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+BUILD_URL_PREFIX = 'build/'
+# Preferred first when the client accepts several
+ENCODINGS = (('br', '.br'), ('gzip', '.gz')) if brotli is not None else (('gzip', '.gz'),)
+
+
+class StaticVersions:
+    """Short content hashes of the files in a static folder
+
+    Hashes are computed on first use and kept. When asked to ``recheck``,
+    a file whose size or mtime changed (an edit during development) is
+    hashed again.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def get(self, filename: str, recheck: bool = True) -> Optional[str]:
+        """Hash of ``filename`` under the folder, or None if it is not a file there"""
+        cached = self._hashes.get(filename)
+        if cached is not None and not recheck:
+            return cached[1]
+        path = os.path.join(self.folder, filename)
+        try:
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        if os.path.commonpath([os.path.realpath(path), os.path.realpath(self.folder)]) != os.path.realpath(self.folder):
+            return None
+        with open(path, 'rb') as f:
+            digest = _digest(f.read())
+        self._hashes[filename] = (stamp, digest)
+        return digest
+
+    def hash_all(self, exclude: str):
+        """Hash every file in the folder except those under ``exclude``"""
+        exclude = os.path.realpath(exclude)
+        for directory, dirs, files in os.walk(self.folder):
+            dirs[:] = [d for d in dirs if os.path.realpath(os.path.join(directory, d)) != exclude]
+            for name in files:
+                self.get(os.path.relpath(os.path.join(directory, name), self.folder).replace(os.sep, '/'))
+
+    def url_defaults(self, endpoint: str, values: Dict, recheck: bool = True):
+        """Flask ``url_defaults`` hook adding ``v`` to static URLs"""
+        if endpoint == 'static' and 'v' not in values:
+            version = self.get(values.get('filename', ''), recheck)
+            if version is not None:
+                values['v'] = version
+
+
+class BuiltAsset(NamedTuple):
+    source: str       # name under the static folder
+    built: str        # fingerprinted name under the build directory
+    source_hash: str
+    mimetype: str
+    encodings: Tuple[str, ...]
+
+
+class AssetPipeline:
+    """Minified, fingerprinted, precompressed copies of the static assets"""
+
+    def __init__(self, static_folder: str, build_folder: Optional[str] = None):
+        self.static_folder = static_folder
+        self.build_folder = build_folder or os.path.join(static_folder, 'build')
+        self.versions = StaticVersions(static_folder)
+        self.assets: Dict[str, BuiltAsset] = {}   # source name -> asset
+        self._served: Dict[str, BuiltAsset] = {}  # 'build/<built name>' -> asset
+
+    def init_app(self, app):
+        """Build (or load) the assets and take over the app's static URLs"""
+        try:
+            self.build()
+        except OSError as e:
+            logger.warning("Serving unbuilt static assets, cannot write %s: %s", self.build_folder, e)
+        self.versions.hash_all(exclude=self.build_folder)
+        app.url_defaults(self.url_defaults)
+        app.view_functions['static'] = self.serve
+
+    def build(self):
+        """Build every asset whose source changed since the manifest was written"""
+        manifest = self._read_manifest()
+        assets = {}
+        for source in self._sources():
+            with open(os.path.join(self.static_folder, source), 'rb') as f:
+                content = f.read()
+            previous = manifest.get(source)
+            if previous is not None and previous.source_hash == _digest(content) and self._complete(previous):
+                assets[source] = previous
+            else:
+                assets[source] = self._build_asset(source, content)
+        self._set_assets(assets)
+        self._write_manifest()
+
+    def url_defaults(self, endpoint: str, values: Dict):
+        """Flask ``url_defaults`` hook pointing static URLs at built assets
+
+        Outside debug mode this is a dictionary lookup: no stat, no rebuild.
+        """
+        if endpoint != 'static':
+            return
+        debug = current_app.debug
+        asset = self.assets.get(values.get('filename', ''))
+        if asset is not None and debug:
+            asset = self._fresh(asset)
+        if asset is not None:
+            values['filename'] = BUILD_URL_PREFIX + asset.built
+        else:
+            self.versions.url_defaults(endpoint, values, recheck=debug)
+
+    def serve(self, filename: str):
+        """Static view: built assets in the best accepted encoding, else the source file"""
+        asset = self._served.get(filename)
+        if asset is None:
+            return current_app.send_static_file(filename)
+        path = os.path.join(self.build_folder, asset.built)
+        encoding = next((name for name in asset.encodings if request.accept_encodings[name]), None)
+        response = send_file(path + dict(ENCODINGS)[encoding] if encoding else path,
+                             mimetype=asset.mimetype, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def _sources(self):
+        build = os.path.realpath(self.build_folder)
+        for directory, dirs, files in os.walk(self.static_folder):
+            dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(directory, d)) != build)
+            for name in sorted(files):
+                if name.endswith(('.js', '.css')) and not name.endswith(('.min.js', '.min.css')):
+                    yield os.path.relpath(os.path.join(directory, name), self.static_folder).replace(os.sep, '/')
+
+    def _build_asset(self, source: str, content: bytes) -> BuiltAsset:
+        minify = minify_js if source.endswith('.js') else minify_css
+        minified = minify(content.decode('utf-8')).encode('utf-8')
+        stem, ext = os.path.splitext(source)
+        built = f'{stem}.{_digest(minified)}{ext}'
+        path = os.path.join(self.build_folder, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, minified)
+        encodings = []
+        for encoding, suffix in ENCODINGS:
+            compressed = _compress(encoding, minified)
+            if len(compressed) < len(minified):
+                _write_atomic(path + suffix, compressed)
+                encodings.append(encoding)
+        mimetype = mimetypes.guess_type(source)[0] or 'application/octet-stream'
+        logger.info("Built %s -> %s (%d -> %d bytes)", source, built, len(content), len(minified))
+        return BuiltAsset(source, built, _digest(content), mimetype, tuple(encodings))
+
+    def _complete(self, asset: BuiltAsset) -> bool:
+        """Whether every file the asset needs is in the build directory"""
+        path = os.path.join(self.build_folder, asset.built)
+        suffixes = dict(ENCODINGS)
+        return (os.path.exists(path) and all(encoding in suffixes for encoding in asset.encodings)
+                and all(os.path.exists(path + suffixes[encoding]) for encoding in asset.encodings))
+
+    def _fresh(self, asset: BuiltAsset) -> Optional[BuiltAsset]:
+        """The asset, rebuilt if its source was edited since the build"""
+        if self.versions.get(asset.source) == asset.source_hash:
+            return asset
+        try:
+            with open(os.path.join(self.static_folder, asset.source), 'rb') as f:
+                rebuilt = self._build_asset(asset.source, f.read())
+            self._set_assets(dict(self.assets, **{asset.source: rebuilt}))
+            self._write_manifest()
+        except OSError as e:
+            logger.warning("Cannot rebuild %s: %s", asset.source, e)
+            return None
+        return rebuilt
+
+    def _set_assets(self, assets: Dict[str, BuiltAsset]):
+        # Replace both maps whole so that concurrent requests see one or the other
+        self._served = {BUILD_URL_PREFIX + asset.built: asset for asset in assets.values()}
+        self.assets = assets
+
+    def _read_manifest(self) -> Dict[str, BuiltAsset]:
+        try:
+            with open(os.path.join(self.build_folder, MANIFEST_NAME)) as f:
+                entries = json.load(f)['assets']
+            return {entry['source']: BuiltAsset(entry['source'], entry['built'], entry['source_hash'],
+                                                entry['mimetype'], tuple(entry['encodings']))
+                    for entry in entries}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _write_manifest(self):
+        entries = [asset._asdict() for asset in self.assets.values()]
+        os.makedirs(self.build_folder, exist_ok=True)
+        _write_atomic(os.path.join(self.build_folder, MANIFEST_NAME),
+                      json.dumps({'assets': entries}, indent=2).encode())
+
+
+_JS_REGEX_PRECEDERS = frozenset('(,=:[!&|?{};+-*%<>~^')
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCTUATION_RE = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_js(source: str) -> str:
+    """Drop comments, indentation and blank lines from JavaScript
+
+    Conservative: line breaks are kept, so automatic semicolon insertion
+    still sees the original lines, and strings, template literals and
+    regex literals are copied untouched.
+    """
+    out = []
+    i, n = 0, len(source)
+    last = ''  # last significant character copied
+    while i < n:
+        c = source[i]
+        if c == '/' and source.startswith('//', i):
+            i = source.find('\n', i)
+            i = n if i < 0 else i
+        elif c == '/' and source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            if out and out[-1] not in (' ', '\n'):
+                out.append(' ')
+        elif c in '\'"`':
+            end = _string_end(source, i)
+            out.append(source[i:end])
+            last, i = c, end
+        elif c == '/' and (last in _JS_REGEX_PRECEDERS or last == ''):
+            end = _regex_end(source, i)
+            out.append(source[i:end])
+            last, i = '/', end
+        elif c == '\n':
+            # End the line: no trailing blanks, no indentation, no empty lines
+            while out and out[-1] == ' ':
+                out.pop()
+            if out and out[-1] != '\n':
+                out.append('\n')
+            i += 1
+            while i < n and source[i] in ' \t\r\n':
+                i += 1
+        elif c in ' \t\r':
+            # One space for a run of blanks, none at the start of a line
+            if out and out[-1] not in (' ', '\n'):
+                out.append(' ')
+            i += 1
+        else:
+            out.append(c)
+            last = c
+            i += 1
+    while out and out[-1] in (' ', '\n'):
+        out.pop()
+    return ''.join(out) + '\n'
+
+
+def minify_css(source: str) -> str:
+    """Drop comments and collapse whitespace in CSS"""
+    out = []
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            out.append(' ')
+        elif c in '\'"':
+            end = _string_end(source, i)
+            out.append(('\0', source[i:end]))
+            i = end
+        else:
+            out.append(c)
+            i += 1
+    # Collapse everything outside strings, then put the strings back
+    strings = [part[1] for part in out if isinstance(part, tuple)]
+    text = ''.join('\0' if isinstance(part, tuple) else part for part in out)
+    text = _CSS_PUNCTUATION_RE.sub(r'\1', _CSS_SPACE_RE.sub(' ', text)).replace(';}', '}').strip()
+    pieces = text.split('\0')
+    return ''.join(piece + (strings[k] if k < len(strings) else '') for k, piece in enumerate(pieces)) + '\n'
+
+
+def _string_end(source: str, start: int) -> int:
+    """Index just past the string or template literal starting at ``start``"""
+    quote = source[start]
+    i = start + 1
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == quote:
+            return i + 1
+        if c == '\n' and quote != '`':
+            return i  # unterminated; leave the rest alone
+        i += 1
+    return len(source)
+
+
+def _regex_end(source: str, start: int) -> int:
+    """Index just past the regex literal (and its flags) starting at ``start``"""
+    i = start + 1
+    in_class = False
+    while i < len(source) and source[i] != '\n':
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            while i < len(source) and (source[i].isalnum() or source[i] == '_'):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def _digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def _compress(encoding: str, content: bytes) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(content, quality=11)
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def _write_atomic(path: str, content: bytes):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+if __name__ == '__main__':
+    # Prebuild for read-only deploys: python static_assets.py [static folder] [build folder]
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    AssetPipeline(folder, sys.argv[2] if len(sys.argv) > 2 else None).build()
@@ -1,7 +1,52 @@
+import os
 import pytest
-from app import app as flask_app
+
+# Keep the test run off the network: no uptime heartbeats unless a test asks
+os.environ.setdefault('HEARTBEAT_URL', '')
+
+from app import create_app
+
+flask_app = create_app()
 # from flask_wtf.csrf import validate_csrf # モックのためにインポート - 削除
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'budget(p50_ms=, p95_ms=, p99_ms=, min_rps=, max_rss_mb=, import_ms=): fail if the measured run exceeds these '
+        '(skipped unless PERF_BUDGETS=1)')
+
+
+def pytest_collection_modifyitems(config, items):
+    # Wall-clock budgets are only meaningful on a quiet machine; shared CI runners opt out
+    if os.environ.get('PERF_BUDGETS') == '1':
+        return
+    skip = pytest.mark.skip(reason='performance budget; set PERF_BUDGETS=1 to run')
+    for item in items:
+        if item.get_closest_marker('budget'):
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def within_budget(request):
+    """Check harness stats against the test's budget marker
+
+    PERF_BUDGET_SCALE loosens every budget by that factor on slow machines.
+    """
+    marker = request.node.get_closest_marker('budget')
+    budget = marker.kwargs if marker else {}
+    scale = float(os.environ.get('PERF_BUDGET_SCALE', '1'))
+
+    def check(stats):
+        exceeded = [f"{name} {stats[name]:.2f} > {limit * scale}"
+                    for name, limit in budget.items() if name != 'min_rps' and stats[name] > limit * scale]
+        if 'min_rps' in budget and stats['rps'] < budget['min_rps'] / scale:
+            exceeded.append(f"rps {stats['rps']:.0f} < {budget['min_rps'] / scale:.0f}")
+        if exceeded:
+            pytest.fail("Over budget: " + ", ".join(exceeded))
+
+    return check
+
+
 @pytest.fixture
 def app():
     flask_app.config['WTF_CSRF_ENABLED'] = False
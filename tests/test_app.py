@@ -1,19 +1,17 @@
+import json
 import pytest
 from flask import url_for
-from app import app, tasks_storage, task_id_counter
-from datetime import datetime
+from app import task_store
 
 class TestTaskManagement:
 
     @pytest.fixture(autouse=True)
     def setup_and_teardown(self):
         # Setup: Clear tasks storage before each test
-        tasks_storage.clear()
-        global task_id_counter
-        task_id_counter = 1
+        task_store.clear()
         yield
         # Teardown: Clear tasks storage after each test
-        tasks_storage.clear()
+        task_store.clear()
 
     def test_add_task_success(self, client):
         response = client.post(url_for('add_task'), data={
@@ -21,38 +19,26 @@ class TestTaskManagement:
             'csrf_token': 'valid_csrf_token'
         }, content_type='application/x-www-form-urlencoded', follow_redirects=True)
         assert response.status_code == 200
-        assert len(tasks_storage) == 1
-        assert tasks_storage[0]['description'] == 'New Task'
+        assert len(task_store) == 1
+        assert task_store.get_task(1)['description'] == 'New Task'
 
     def test_toggle_task_success(self, client):
         # Add a task first
-        tasks_storage.append({
-            'id': 1,
-            'description': 'Task to toggle',
-            'completed': False,
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        })
+        task_store.add_task('Task to toggle')
         # データをURLエンコードして送信 - 修正
         data = {'csrf_token': 'valid_csrf_token'}
         response = client.post(url_for('toggle_task', task_id=1), data=data, content_type='application/x-www-form-urlencoded')
         assert response.status_code == 200
-        assert tasks_storage[0]['completed'] is True
+        assert task_store.get_task(1)['completed'] is True
 
     def test_delete_task_success(self, client):
         # Add a task first
-        tasks_storage.append({
-            'id': 1,
-            'description': 'Task to delete',
-            'completed': False,
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        })
+        task_store.add_task('Task to delete')
         # データをURLエンコードして送信 - 修正
         data = {'csrf_token': 'valid_csrf_token'}
         response = client.post(url_for('delete_task', task_id=1), data=data, content_type='application/x-www-form-urlencoded')
         assert response.status_code == 200
-        assert len(tasks_storage) == 0
+        assert len(task_store) == 0
 
     def test_add_task_invalid_description(self, client):
         response = client.post(url_for('add_task'), data={
@@ -60,17 +46,11 @@ class TestTaskManagement:
             'csrf_token': 'valid_csrf_token'
         }, content_type='application/x-www-form-urlencoded', follow_redirects=True)
         assert response.status_code == 200
-        assert len(tasks_storage) == 0
+        assert len(task_store) == 0
 
     def test_toggle_task_missing_csrf(self, client):
         # Add a task first
-        tasks_storage.append({
-            'id': 1,
-            'description': 'Task to toggle',
-            'completed': False,
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        })
+        task_store.add_task('Task to toggle')
         response = client.post(url_for('toggle_task', task_id=1), data={})
         assert response.status_code == 400
         assert response.json['error'] == 'CSRF token missing'
@@ -91,10 +71,9 @@ class TestTaskManagement:
 
     def test_get_all_tasks_success(self, client):
         # Add some tasks
-        tasks_storage.extend([
-            {'id': 1, 'description': 'Task 1', 'completed': False},
-            {'id': 2, 'description': 'Task 2', 'completed': True}
-        ])
+        task_store.add_task('Task 1')
+        task_store.add_task('Task 2')
+        task_store.toggle_task(2)
         response = client.get(url_for('get_tasks'))
         assert response.status_code == 200
         assert response.json['success'] is True
@@ -112,4 +91,155 @@ class TestTaskManagement:
         data = {'csrf_token': 'valid_csrf_token'}
         response = client.post(url_for('toggle_task', task_id=999), data=data, content_type='application/x-www-form-urlencoded')
         assert response.status_code == 404
-        assert response.json['error'] == 'Task not found'
\ No newline at end of file
+        assert response.json['error'] == 'Task not found'
+
+    def test_get_tasks_cursor_pagination(self, client):
+        for i in range(5):
+            task_store.add_task(f'Task {i}')
+        response = client.get(url_for('get_tasks', limit=2))
+        assert [task['id'] for task in response.json['tasks']] == [1, 2]
+        assert response.json['total'] == 5
+        assert response.json['has_more'] is True
+
+        seen = [1, 2]
+        cursor = response.json['next_cursor']
+        while cursor:
+            response = client.get(url_for('get_tasks', limit=2, cursor=cursor))
+            seen += [task['id'] for task in response.json['tasks']]
+            cursor = response.json['next_cursor']
+        assert seen == [1, 2, 3, 4, 5]
+        assert response.json['has_more'] is False
+
+    def test_get_tasks_invalid_cursor(self, client):
+        response = client.get(url_for('get_tasks', cursor='not-a-cursor'))
+        assert response.status_code == 400
+        response = client.get(url_for('get_tasks', limit=0))
+        assert response.status_code == 400
+
+    def test_index_pages_tasks(self, client):
+        for i in range(60):
+            task_store.add_task(f'Task {i}')
+        response = client.get(url_for('index'))
+        assert b'Task 49' in response.data
+        assert b'Task 50' not in response.data
+        assert b'Next page' in response.data
+
+    def test_export_tasks_ndjson(self, client):
+        for i in range(3):
+            task_store.add_task(f'Task {i}')
+        task_store.toggle_task(2)
+        response = client.get(url_for('export_tasks', filter='active'))
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert [task['id'] for task in lines] == [1, 3]
+
+    def test_export_tasks_json_array(self, client):
+        for i in range(3):
+            task_store.add_task(f'Task {i}')
+        response = client.get(url_for('export_tasks', format='json'))
+        assert [task['description'] for task in response.json] == ['Task 0', 'Task 1', 'Task 2']
+        assert client.get(url_for('export_tasks', format='xml')).status_code == 400
+
+    def test_batch_add_reports_each_item(self, client):
+        response = client.post(url_for('batch_add_tasks'), json={
+            'descriptions': ['First', '<script>alert(1)</script>', '  ', 'Second']})
+        assert response.status_code == 200
+        results = response.json['results']
+        assert [result['success'] for result in results] == [True, False, False, True]
+        assert [results[0]['task']['id'], results[3]['task']['id']] == [1, 2]
+        assert response.json['counts'] == {'total': 2, 'active': 2, 'completed': 0}
+
+    def test_batch_toggle_and_delete(self, client):
+        task_store.add_tasks([f'Task {i}' for i in range(5)])
+        response = client.post(url_for('batch_toggle_tasks'), json={'ids': [1, 2, 99, 'x'], 'completed': True})
+        assert [result['success'] for result in response.json['results']] == [True, True, False, False]
+        assert response.json['results'][2]['error'] == 'Task not found'
+        assert response.json['results'][3]['error'] == 'Invalid Task ID'
+        assert response.json['counts']['completed'] == 2
+
+        response = client.post(url_for('batch_delete_tasks'), json={'ids': [1, 2, 3]})
+        assert all(result['success'] for result in response.json['results'])
+        assert [task['id'] for task in task_store.get_all_tasks()] == [4, 5]
+
+    def test_batch_delete_completed(self, client):
+        task_store.add_tasks([f'Task {i}' for i in range(1500)])
+        task_store.toggle_tasks(list(range(1, 1201)))
+        response = client.post(url_for('batch_delete_tasks'), json={'filter': 'completed'})
+        assert response.json['deleted'] == 1200
+        assert response.json['counts'] == {'total': 300, 'active': 300, 'completed': 0}
+        assert client.post(url_for('batch_delete_tasks'), json={'filter': 'active'}).status_code == 400
+
+    def test_batch_rejects_oversized_requests(self, client):
+        response = client.post(url_for('batch_delete_tasks'), json={'ids': list(range(1, 1002))})
+        assert response.status_code == 400
+        assert client.post(url_for('batch_add_tasks'), json={}).status_code == 400
+
+    def test_get_tasks_conditional_get(self, client):
+        task_store.add_task('Task 1')
+        response = client.get(url_for('get_tasks'))
+        etag = response.headers['ETag']
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+
+        response = client.get(url_for('get_tasks'), headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        other_filter = client.get(url_for('get_tasks', filter='active'), headers={'If-None-Match': etag})
+        assert other_filter.status_code == 200
+
+        task_store.toggle_task(1)
+        response = client.get(url_for('get_tasks'), headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_get_tasks_since_version(self, client):
+        task_store.add_tasks(['Task 1', 'Task 2', 'Task 3'])
+        version = client.get(url_for('get_tasks')).json['version']
+        task_store.toggle_task(1)
+        task_store.delete_task(2)
+
+        response = client.get(url_for('get_tasks', since=version))
+        assert [task['id'] for task in response.json['tasks']] == [1]
+        assert response.json['deleted'] == [2]
+        unchanged = client.get(url_for('get_tasks', since=response.json['version'])).json
+        assert unchanged['tasks'] == [] and unchanged['deleted'] == []
+
+        for stale in (version.split('.')[1], 'other.1'):
+            response = client.get(url_for('get_tasks', since=stale))
+            assert response.json['resync'] is True
+            assert response.json['version'] == unchanged['version']
+
+    def test_index_conditional_get(self, client):
+        task_store.add_task('Task 1')
+        response = client.get(url_for('index'))
+        etag = response.headers['ETag']
+        assert client.get(url_for('index'), headers={'If-None-Match': etag}).status_code == 304
+
+        # A page with flashed messages is never answered with 304
+        client.post(url_for('add_task'), data={'description': 'Task 2'})
+        response = client.get(url_for('index'), headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+
+    def test_index_reuses_task_list_fragment(self, client, monkeypatch):
+        import app as app_module
+        task_store.add_task('Cached task')
+        first = client.get(url_for('index'))
+        hits = app_module.task_fragments.hits
+        monkeypatch.setattr(task_store, 'get_page', None)  # must not be needed on a hit
+        second = client.get(url_for('index'))
+        assert app_module.task_fragments.hits == hits + 1
+        assert b'Cached task' in second.data
+        assert second.data == first.data
+
+    def test_create_app_checks_csrf(self):
+        import re
+        from app import create_app
+        app = create_app({'TESTING': True})
+        assert 'csrf' in app.extensions
+        client = app.test_client()
+        assert client.post('/add_task', data={'description': 'No token'}).status_code == 400
+        token = re.search(rb'name="csrf_token" value="([^"]+)"', client.get('/').data).group(1).decode()
+        response = client.post('/add_task', data={'description': 'With token', 'csrf_token': token})
+        assert response.status_code == 302
+        assert task_store.get_task(1)['description'] == 'With token'
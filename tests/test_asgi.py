@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+import app as app_module
+from app import task_store
+from asgi import app as asgi_app, application
+from change_feed import event_id
+from security import RateLimiter
+
+
+async def call(method, path, body=b'', headers=(), query=b''):
+    """Run one request through the ASGI app; return (status, headers, body)"""
+    messages = [{'type': 'http.request', 'body': body}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'http_version': '1.1',
+             'headers': [(name.encode(), value.encode()) for name, value in headers], 'client': ('10.0.0.1', 5000)}
+    await application(scope, receive, send)
+    return (sent[0]['status'], {name.decode(): value.decode() for name, value in sent[0]['headers']},
+            b''.join(message.get('body', b'') for message in sent[1:]))
+
+
+FORM = (('content-type', 'application/x-www-form-urlencoded'),)
+
+
+@pytest.fixture(autouse=True)
+def fresh_store(app, monkeypatch):
+    monkeypatch.setitem(asgi_app.config, 'WTF_CSRF_ENABLED', False)
+    monkeypatch.setattr(app_module, 'rate_limiter', RateLimiter(max_requests=1000))
+    task_store.clear()
+    yield
+    task_store.clear()
+
+
+def test_api_routes_keep_security_headers():
+    task_store.add_tasks(['One', 'Two'])
+    status, headers, body = asyncio.run(call('GET', '/get_tasks', query=b'limit=1'))
+    assert status == 200
+    assert [task['description'] for task in json.loads(body)['tasks']] == ['One']
+    assert headers['x-content-type-options'] == 'nosniff'
+    assert headers['cache-control'] == 'private, no-cache'
+
+    status, headers, body = asyncio.run(call('POST', '/toggle_task/1', b'csrf_token=x', FORM))
+    assert status == 200 and json.loads(body)['completed'] is True
+    status, _, body = asyncio.run(call('POST', '/delete_task/2', b'', FORM))
+    assert status == 400 and json.loads(body)['error'] == 'CSRF token missing'
+
+
+def test_csrf_and_rate_limits_apply(monkeypatch):
+    task_store.add_task('One')
+    monkeypatch.setitem(asgi_app.config, 'WTF_CSRF_ENABLED', True)
+    status, _, _ = asyncio.run(call('POST', '/delete_task/1', b'csrf_token=forged', FORM))
+    assert status == 400 and len(task_store) == 1
+
+    monkeypatch.setattr(app_module, 'rate_limiter', RateLimiter(max_requests=1))
+    assert asyncio.run(call('GET', '/get_tasks'))[0] == 200
+    assert asyncio.run(call('GET', '/get_tasks'))[0] == 429
+
+
+def test_pages_are_served_from_the_thread_pool():
+    status, headers, body = asyncio.run(call('GET', '/'))
+    assert status == 200 and headers['content-type'].startswith('text/html')
+    assert b'taskListContainer' in body
+
+
+def test_event_stream_waits_without_a_thread(monkeypatch):
+    monkeypatch.setattr(app_module, 'SSE_HEARTBEAT_SECONDS', 0.05)
+    monkeypatch.setattr(app_module, 'SSE_STREAM_SECONDS', 0.5)
+    since = event_id(task_store, task_store.version).encode()
+
+    async def subscribe_and_write():
+        stream = asyncio.ensure_future(call('GET', '/events', query=b'since=' + since))
+        await asyncio.sleep(0.1)
+        task_store.add_task('Live')
+        return await stream
+
+    status, headers, body = asyncio.run(subscribe_and_write())
+    assert status == 200 and headers['content-type'].startswith('text/event-stream')
+    assert headers['x-content-type-options'] == 'nosniff'
+    text = body.decode()
+    assert text.startswith('retry: ') and ': keepalive' in text
+    assert '"op":"add"' in text and 'Live' in text
@@ -0,0 +1,32 @@
+import pytest
+
+import app as app_module
+from app import task_store
+from benchmarks import harness
+from security import RateLimiter
+
+# Generous enough for a loaded CI machine; a regression that costs an order
+# of magnitude still fails
+BUDGET = dict(p95_ms=25, p99_ms=50, min_rps=100, max_rss_mb=1024)
+
+
+@pytest.fixture
+def load_test_app(app, monkeypatch):
+    monkeypatch.setattr(app_module, 'rate_limiter', RateLimiter(max_requests=10 ** 9))
+    monkeypatch.setattr(app.logger, 'disabled', True)
+    yield app
+    task_store.clear()
+
+
+@pytest.mark.budget(**BUDGET)
+@pytest.mark.parametrize('endpoint', harness.ENDPOINTS)
+def test_endpoint_within_budget(load_test_app, endpoint, within_budget):
+    ids = harness.seed_store(task_store, 1000)
+    stats = harness.run_wsgi(load_test_app, harness.request_plan(endpoint, ids, 300))
+    within_budget(dict(stats, max_rss_mb=harness.peak_rss_mb()))
+
+
+@pytest.mark.budget(p95_ms=0.001)
+def test_budget_marker_fails_when_exceeded(within_budget):
+    with pytest.raises(pytest.fail.Exception, match='p95_ms'):
+        within_budget({'rps': 1000, 'p95_ms': 1.0})
@@ -0,0 +1,124 @@
+import json
+import threading
+
+import app as app_module
+from app import task_store
+from change_feed import ChangeFeed, StreamLimit, event_id, feed_position, iter_sse
+from models import TaskStorage
+
+# What a threaded WSGI server reports; the test client claims a single thread
+THREADED = {'wsgi.multithread': True}
+
+
+def parse_sse(text):
+    """(event, id, data) for every message in a stream"""
+    messages = []
+    for block in text.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line and not line.startswith(':'))
+        if 'event' in fields:
+            messages.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+    return messages
+
+
+def test_ring_buffer_resumes_until_overwritten():
+    feed = ChangeFeed(capacity=4)
+    feed.reset(10)
+    for version in range(11, 15):
+        feed.append(version, ('d', version))
+    assert [v for v, _ in feed.since(10)] == [11, 12, 13, 14]
+    assert feed.since(14) == []
+    feed.append(15, ('d', 15))
+    assert feed.since(10) is None  # version 11 was overwritten
+    assert [v for v, _ in feed.since(11)] == [12, 13, 14, 15]
+    assert feed.since(99) is None
+    feed.reset(20)  # e.g. a restore
+    assert feed.since(15) is None and feed.since(20) == []
+
+
+def test_wait_wakes_on_a_change():
+    feed = ChangeFeed()
+    feed.reset(1)
+    waiter = threading.Thread(target=lambda: results.append(feed.wait(1, timeout=5)))
+    results = []
+    waiter.start()
+    feed.append(2, ('d', 7))
+    waiter.join()
+    assert results == [[(2, ('d', 7))]]
+    assert feed.wait(2, timeout=0.01) == []
+
+
+def test_store_changes_stream_as_events():
+    store = TaskStorage()
+    start = feed_position(store, event_id(store, store.version))
+    task = store.add_task('Buy milk')
+    store.toggle_task(task['id'])
+    store.delete_task(task['id'])
+
+    messages = parse_sse(''.join(iter_sse(store, start, heartbeat=0.01, duration=0)))
+    assert [(event, data.get('op')) for event, _, data in messages] == [
+        ('change', 'add'), ('change', 'toggle'), ('change', 'delete'), ('counts', None)]
+    assert messages[0][2]['task']['description'] == 'Buy milk'
+    assert messages[1][2]['completed'] is True
+    assert messages[2][1] == event_id(store, store.version)
+    assert messages[3][2] == {'total': 0, 'active': 0, 'completed': 0}
+
+
+def test_unknown_positions_resync():
+    store = TaskStorage(change_feed_size=2)
+    assert feed_position(store, 'other-epoch.3') is None
+    for version in ('\u00b2', '-1', ' 3', '\u0663'):
+        assert feed_position(store, f'{store.epoch}.{version}') is None
+    start = store.version
+    store.add_tasks(['a', 'b', 'c'])
+    for since in (None, start):
+        [(event, message_id, data)] = parse_sse(''.join(iter_sse(store, since, duration=0)))
+        assert event == 'resync' and message_id == event_id(store, store.version)
+        assert data['counts']['total'] == 3
+
+
+def test_events_endpoint_resumes_from_last_event_id(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'SSE_STREAM_SECONDS', 0)
+    task_store.clear()
+    position = event_id(task_store, task_store.version)
+    task_store.add_task('From another tab')
+
+    response = client.get('/events', headers={'Last-Event-ID': position}, environ_overrides=THREADED)
+    assert response.mimetype == 'text/event-stream'
+    assert response.get_data(as_text=True).startswith('retry: ')
+    events = parse_sse(response.get_data(as_text=True))
+    assert events[0][2]['op'] == 'add' and events[0][2]['task']['description'] == 'From another tab'
+    response.close()
+    page = client.get('/', environ_overrides=THREADED).get_data(as_text=True)
+    assert f'since={event_id(task_store, task_store.version)}' in page
+    task_store.clear()
+
+
+def test_malformed_positions_resync(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'SSE_STREAM_SECONDS', 0)
+    position = f'{task_store.epoch}.\u00b2'
+    response = client.get('/events', headers={'Last-Event-ID': position}, environ_overrides=THREADED)
+    assert response.status_code == 200
+    assert parse_sse(response.get_data(as_text=True))[0][0] == 'resync'
+    response.close()
+    response = client.get('/get_tasks', query_string={'since': position})
+    assert response.status_code == 200 and response.json['resync'] is True
+
+
+def test_streams_holding_threads_are_capped(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'SSE_STREAM_SECONDS', 0)
+    monkeypatch.setattr(app_module, 'sse_streams', StreamLimit(1))
+    # A single-threaded server would block on the stream: no subscription at all
+    assert client.get('/events').status_code == 503
+    assert 'id="taskFeed"' not in client.get('/').get_data(as_text=True)
+
+    first = client.get('/events', environ_overrides=THREADED, buffered=False)
+    assert first.status_code == 200 and app_module.sse_streams.open == 1
+    refused = client.get('/events', environ_overrides=THREADED)
+    assert refused.status_code == 503 and refused.headers['Retry-After']
+    # The page still subscribes, and retries once a stream ends
+    assert 'id="taskFeed"' in client.get('/', environ_overrides=THREADED).get_data(as_text=True)
+    first.close()
+    assert app_module.sse_streams.open == 0
+    with client.get('/events', environ_overrides=THREADED) as second:
+        assert second.status_code == 200
+    assert app_module.sse_streams.open == 0
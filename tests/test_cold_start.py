@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use (heartbeats, async streams, SQL store), never by
+# importing the entry point. flask_wtf (and with it wtforms) is not here:
+# create_app() installs its CSRFProtect
+DEFERRED_MODULES = ('requests', 'asyncio', 'sqlalchemy')
+
+
+def import_times(module):
+    """Cumulative ms per module for ``import module`` in a fresh interpreter"""
+    env = {name: value for name, value in os.environ.items()
+           if name not in ('DATABASE_URL', 'TASKS_DATA_DIR', 'RATE_LIMIT_BACKEND')}
+    env['HEARTBEAT_URL'] = ''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def test_entry_point_defers_optional_imports():
+    loaded = import_times('main')
+    assert [name for name in DEFERRED_MODULES if name in loaded] == []
+
+
+def test_importing_the_app_module_builds_nothing():
+    code = 'import app; assert app.task_store is None and app.heartbeat is None and app.metrics is None'
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+
+
+# Flask itself is most of it; the best of three runs keeps out one-off stalls.
+# Like every budget it only runs with PERF_BUDGETS=1 (see conftest)
+@pytest.mark.budget(import_ms=350)
+def test_entry_point_cold_import_within_budget(within_budget):
+    within_budget({'import_ms': min(import_times('main')['main'] for _ in range(3))})
@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import task_store
+from models import TaskStorage
+
+THREADS = 32
+
+
+def run_threads(target, count=THREADS):
+    errors = []
+    barrier = threading.Barrier(count)
+
+    def run(n):
+        barrier.wait()
+        try:
+            target(n)
+        except BaseException as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+class TestConcurrentStore:
+
+    def test_concurrent_adds_get_unique_ids(self):
+        store = TaskStorage()
+        per_thread = 200
+        run_threads(lambda n: [store.add_task(f'Task {n}-{i}') for i in range(per_thread)])
+
+        ids = [task['id'] for task in store.get_all_tasks()]
+        assert ids == list(range(1, THREADS * per_thread + 1))
+        assert store.next_id == THREADS * per_thread + 1
+
+    def test_mixed_readers_and_writers_keep_invariants(self):
+        store = TaskStorage()
+        for i in range(200):
+            store.add_task(f'Seed {i}')
+
+        def worker(n):
+            for i in range(100):
+                if n % 4 == 0:
+                    store.add_task(f'Task {n}-{i}')
+                elif n % 4 == 1:
+                    store.toggle_task(1 + (n * 31 + i) % 200)
+                elif n % 4 == 2:
+                    store.delete_task(1 + (n * 17 + i) % 1000)
+                else:
+                    for task in store.get_filtered_tasks(('all', 'active', 'completed')[i % 3]):
+                        assert task['description'] is not None
+                    ids = [task['id'] for task in store.get_all_tasks()]
+                    assert ids == sorted(set(ids))
+                    store.get_task_count()
+
+        run_threads(worker)
+
+        tasks = store.get_all_tasks()
+        active = store.get_filtered_tasks('active')
+        completed = store.get_filtered_tasks('completed')
+        assert store.get_task_count() == {
+            'total': len(tasks), 'active': len(active), 'completed': len(completed)}
+        assert sorted(task['id'] for task in active + completed) == [task['id'] for task in tasks]
+
+    def test_concurrent_requests_through_app(self, app):
+        task_store.clear()
+
+        def add(n):
+            with app.test_client() as client:
+                response = client.post('/add_task', data={'description': f'Concurrent task {n}'},
+                                       environ_base={'REMOTE_ADDR': f'10.0.0.{n}'})
+            assert response.status_code == 302
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(add, range(64)))
+        ids = [task['id'] for task in task_store.get_all_tasks()]
+        assert ids == list(range(1, 65))
+        task_store.clear()
@@ -0,0 +1,24 @@
+import json
+
+from export import iter_export
+from models import TaskStorage
+
+
+def test_chunks_stay_bounded_and_cover_every_page():
+    store = TaskStorage()
+    for i in range(2500):
+        store.add_task(f'Task {i}')
+    chunks = list(iter_export(store, chunk_size=4096))
+    assert len(chunks) > 1
+    assert all(len(chunk) < 4096 + 200 for chunk in chunks)
+    ids = [json.loads(line)['id'] for line in b''.join(chunks).decode().splitlines()]
+    assert ids == list(range(1, 2501))
+
+    array = json.loads(b''.join(iter_export(store, 'all', 'json', chunk_size=4096)))
+    assert len(array) == 2500
+
+
+def test_empty_export():
+    store = TaskStorage()
+    assert b''.join(iter_export(store)) == b''
+    assert json.loads(b''.join(iter_export(store, fmt='json'))) == []
@@ -0,0 +1,30 @@
+import sys
+
+from markupsafe import Markup
+
+from fragment_cache import FragmentCache
+
+
+def test_hits_misses_and_lru_budget():
+    fragment_size = sys.getsizeof(Markup('x' * 1000))
+    cache = FragmentCache(max_bytes=fragment_size * 2)
+    renders = []
+
+    def render(key):
+        renders.append(key)
+        return key * 1000
+
+    for key in ('a', 'b', 'a', 'c', 'b'):
+        cache.get_or_render(key, lambda: render(key))
+    # 'b' was the least recently used when 'c' arrived, so it was rendered again
+    assert renders == ['a', 'b', 'c', 'b']
+    assert cache.stats() == {'hits': 1, 'misses': 4, 'evictions': 2, 'entries': 2,
+                             'bytes': fragment_size * 2}
+
+
+def test_zero_budget_disables_caching():
+    cache = FragmentCache(max_bytes=0)
+    assert cache.get_or_render('k', lambda: '<li>') == '<li>'
+    assert cache.get_or_render('k', lambda: '<li>') == '<li>'
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['entries'] == 0
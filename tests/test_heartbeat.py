@@ -0,0 +1,136 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from flask import url_for
+
+import app as app_module
+from app import task_store
+from heartbeat import HeartbeatDispatcher
+
+
+class StubServer:
+    """Local HTTP server standing in for the uptime service"""
+
+    def __init__(self, status=200, delay=0.0):
+        self.hits = 0
+        self.status = status
+        self.delay = delay
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits += 1
+                time.sleep(stub.delay)
+                self.send_response(stub.status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/heartbeat'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+class TestHeartbeatDispatcher:
+
+    def test_burst_is_coalesced_into_one_ping(self, stub):
+        dispatcher = HeartbeatDispatcher(stub.url, min_interval=60)
+        try:
+            for _ in range(50):
+                assert dispatcher.notify()
+            assert wait_for(lambda: dispatcher.stats()['sent'] == 1)
+            assert wait_for(lambda: dispatcher.stats()['coalesced'] == 49)
+            assert stub.hits == 1
+        finally:
+            dispatcher.shutdown()
+
+    def test_pings_again_after_interval(self, stub):
+        dispatcher = HeartbeatDispatcher(stub.url, min_interval=0.2)
+        try:
+            dispatcher.notify()
+            assert wait_for(lambda: dispatcher.stats()['sent'] == 1)
+            dispatcher.notify()
+            dispatcher.notify()
+            assert wait_for(lambda: dispatcher.stats()['sent'] == 2)
+            assert stub.hits == 2
+        finally:
+            dispatcher.shutdown()
+
+    def test_http_errors_are_counted_as_failed(self, stub):
+        stub.status = 500
+        dispatcher = HeartbeatDispatcher(stub.url, min_interval=0)
+        try:
+            dispatcher.notify()
+            assert wait_for(lambda: dispatcher.stats()['failed'] == 1)
+            assert dispatcher.stats()['sent'] == 0
+        finally:
+            dispatcher.shutdown()
+
+    def test_shutdown_does_not_wait_out_the_interval(self, stub):
+        dispatcher = HeartbeatDispatcher(stub.url, min_interval=60)
+        dispatcher.notify()
+        assert wait_for(lambda: dispatcher.stats()['sent'] == 1)
+        dispatcher.notify()
+        start = time.monotonic()
+        dispatcher.shutdown()
+        assert time.monotonic() - start < 1
+        assert not dispatcher._thread.is_alive()
+        assert not dispatcher.notify()
+
+    def test_disabled_without_url(self):
+        dispatcher = HeartbeatDispatcher('')
+        assert not dispatcher.notify()
+        assert dispatcher._thread is None
+
+
+class TestAddTaskHeartbeat:
+
+    @pytest.fixture(autouse=True)
+    def setup_and_teardown(self):
+        task_store.clear()
+        yield
+        task_store.clear()
+
+    def test_add_task_does_not_wait_for_heartbeat(self, client, monkeypatch):
+        slow = StubServer(delay=1.0)
+        dispatcher = HeartbeatDispatcher(slow.url, min_interval=0)
+        monkeypatch.setattr(app_module, 'heartbeat', dispatcher)
+        try:
+            start = time.monotonic()
+            response = client.post(url_for('add_task'), data={
+                'description': 'New Task',
+                'csrf_token': 'valid_csrf_token'
+            }, content_type='application/x-www-form-urlencoded')
+            elapsed = time.monotonic() - start
+            assert response.status_code == 302
+            assert len(task_store) == 1
+            assert elapsed < 0.5
+            assert wait_for(lambda: dispatcher.stats()['sent'] == 1)
+        finally:
+            dispatcher.shutdown()
+            slow.close()
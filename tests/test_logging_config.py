@@ -0,0 +1,76 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+import logging_config
+from logging_config import configure_logging, shutdown_logging
+
+
+@pytest.fixture(autouse=True)
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    shutdown_logging()
+    logging_config._queued = None
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_json_format_writes_one_object_per_line():
+    stream = io.StringIO()
+    configure_logging(level='INFO', fmt='json', queued=False, stream=stream)
+    logging.getLogger('todo').info("Task added: %s", 'milk "2L"')
+
+    entry = json.loads(stream.getvalue())
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'todo'
+    assert entry['message'] == 'Task added: milk "2L"'
+
+
+def test_queued_mode_writes_on_the_listener_thread():
+    threads = []
+
+    class RecordingStream(io.StringIO):
+        def write(self, text):
+            threads.append(threading.current_thread())
+            return super().write(text)
+
+    stream = RecordingStream()
+    configure_logging(level='INFO', fmt='text', queued=True, stream=stream)
+    args = ['first']
+    logging.getLogger('todo').info("Task %s", args)
+    args.append('changed later')
+    shutdown_logging()
+
+    assert stream.getvalue() == "INFO:todo:Task ['first']\n"
+    assert threads and threading.current_thread() not in threads
+
+
+def test_level_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv('LOG_LEVEL', 'warning')
+    stream = io.StringIO()
+    configure_logging(queued=False, stream=stream)
+    logger = logging.getLogger('todo')
+    logger.info("dropped")
+    logger.warning("kept")
+
+    assert stream.getvalue() == "WARNING:todo:kept\n"
+
+
+def test_production_defaults_to_info_through_the_queue(monkeypatch):
+    monkeypatch.delenv('LOG_LEVEL', raising=False)
+    monkeypatch.delenv('LOG_QUEUE', raising=False)
+    configure_logging(stream=io.StringIO(), production=True)
+    root = logging.getLogger()
+    assert root.level == logging.INFO
+    assert isinstance(root.handlers[0], logging_config.DeferredQueueHandler)
+
+    monkeypatch.setenv('LOG_LEVEL', 'DEBUG')
+    monkeypatch.setenv('LOG_QUEUE', '0')
+    configure_logging(stream=io.StringIO(), production=True)
+    assert root.level == logging.DEBUG
+    assert not isinstance(root.handlers[0], logging_config.DeferredQueueHandler)
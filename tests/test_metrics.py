@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+from metrics import Metrics
+
+
+def test_merges_thread_shards_into_prometheus_text():
+    metrics = Metrics(buckets=(0.01, 0.1))
+    metrics.observe_request('index', 'GET', 200, 0.005)
+
+    def worker():
+        metrics.observe_request('index', 'GET', 200, 0.05)
+        metrics.observe_request('get_tasks', 'GET', 304, 0.5)
+        metrics.inc('rate_limited_requests')
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    # A new thread folds the exited one into the retired shard
+    thread = threading.Thread(target=metrics.inc, args=('rate_limited_requests',))
+    thread.start()
+    thread.join()
+    metrics.register_collector(lambda: [('tasks', 'gauge', 'Tasks', {'status': 'active'}, 3)])
+
+    text = metrics.render()
+    assert 'todo_http_requests_total{endpoint="index",method="GET",status="200",worker=' in text
+    assert '_bucket{endpoint="index",worker="' in text
+    lines = dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+    index = {key: value for key, value in lines.items() if 'endpoint="index"' in key}
+    assert [value for key, value in index.items() if '_bucket' in key] == ['1', '2', '2']
+    assert [value for key, value in index.items() if key.startswith('todo_http_requests_total')] == ['2']
+    assert [value for key, value in lines.items() if key.startswith('todo_rate_limited_requests_total')] == ['2']
+    assert any(key.startswith('todo_tasks{status="active"') and value == '3' for key, value in lines.items())
+
+
+def test_merges_worker_processes_through_directory(tmp_path):
+    metrics = Metrics(buckets=(0.01,), directory=str(tmp_path))
+    metrics.register_collector(lambda: [('tasks', 'gauge', 'Tasks', {}, 3), ('pings', 'counter', 'Pings', {}, 1)])
+    metrics.observe_request('index', 'GET', 200, 0.005)
+    child = os.fork()
+    if child == 0:
+        # Starts from zero, so the parent's request is not counted twice
+        metrics.observe_request('index', 'GET', 200, 0.05)
+        metrics.export()
+        os._exit(0)
+    os.waitpid(child, 0)
+
+    lines = dict(line.rsplit(' ', 1) for line in metrics.render().splitlines() if not line.startswith('#'))
+    assert lines['todo_http_requests_total{endpoint="index",method="GET",status="200"}'] == '2'
+    assert lines['todo_http_request_duration_seconds_bucket{endpoint="index",le="0.01"}'] == '1'
+    assert lines['todo_pings'] == '2'
+    # Gauges are per process, for running workers only
+    assert [key for key in lines if key.startswith('todo_tasks')] == [f'todo_tasks{{worker="{os.getpid()}"}}']
+    # The exited worker's totals are folded into the retired file
+    assert set(os.listdir(tmp_path)) == {'metrics.lock', f'metrics.{os.getpid()}.json', 'metrics.retired.json'}
+    assert metrics.render().count('todo_pings 2') == 1
+
+
+def test_recording_overhead_is_a_few_microseconds():
+    metrics = Metrics()
+    metrics.observe_request('index', 'GET', 200, 0.001)
+    calls = 20000
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(calls):
+            metrics.observe_request('index', 'GET', 200, 0.0012)
+        best = min(best, (time.perf_counter() - start) / calls)
+    assert best < 5e-6
+
+
+def test_metrics_endpoint_is_not_rate_limited(client, monkeypatch):
+    import app as app_module
+    from security import RateLimiter
+    monkeypatch.setattr(app_module, 'rate_limiter', RateLimiter(max_requests=1))
+    client.get('/get_tasks')
+    assert client.get('/get_tasks').status_code == 429
+    for _ in range(3):
+        response = client.get('/metrics')
+        assert response.status_code == 200
+    assert 'todo_rate_limited_requests_total' in response.get_data(as_text=True)
+    assert 'endpoint="get_tasks",method="GET",status="429"' in response.get_data(as_text=True)
@@ -0,0 +1,136 @@
+import json
+from datetime import datetime
+
+from models import TaskStorage
+
+
+class TestTaskStorage:
+
+    def test_lookup_by_id(self):
+        store = TaskStorage()
+        for i in range(10):
+            store.add_task(f'Task {i}')
+        assert store.get_task(7)['description'] == 'Task 6'
+        assert store.get_task(99) is None
+
+    def test_delete_keeps_order(self):
+        store = TaskStorage()
+        for i in range(5):
+            store.add_task(f'Task {i}')
+        assert store.delete_task(3)['id'] == 3
+        assert store.delete_task(3) is None
+        assert [task['id'] for task in store.get_all_tasks()] == [1, 2, 4, 5]
+
+    def test_compaction_drops_tombstones(self):
+        store = TaskStorage()
+        count = TaskStorage.COMPACTION_MIN_TOMBSTONES * 2
+        for i in range(count):
+            store.add_task(f'Task {i}')
+        for task_id in range(1, count + 1, 2):
+            store.delete_task(task_id)
+        assert store._tombstones == 0
+        assert len(store._ids) == len(store) == count // 2
+        assert store.get_task(count)['id'] == count
+        assert store.toggle_task(2)['completed'] is True
+
+    def test_partitions_and_counts(self):
+        store = TaskStorage()
+        for i in range(20):
+            store.add_task(f'Task {i}')
+        store.toggle_task(2)
+        store.toggle_task(5)
+        store.delete_task(5)
+        store.delete_task(6)
+        store.toggle_task(3)
+        store.toggle_task(3)
+        active_ids = [1, 3, 4] + list(range(7, 21))
+        assert [task['id'] for task in store.get_filtered_tasks('active')] == active_ids
+        assert [task['id'] for task in store.get_filtered_tasks('completed')] == [2]
+        assert store.get_task_count() == {'total': 18, 'active': 17, 'completed': 1}
+
+    def test_timestamps_are_formatted_when_written(self):
+        store = TaskStorage()
+        task = store.add_task('Task')
+        assert task['updated_at'] is task['created_at']
+        store.apply_record((TaskStorage.TOGGLE, task['id'], True, store._created[0] + 60))
+        toggled = store.get_task(task['id'])
+        assert toggled['created_at'] == task['created_at']
+        assert toggled['updated_at'] == datetime.fromtimestamp(store._updated[0]).isoformat()
+        restored = TaskStorage()
+        restored.restore(store.snapshot())
+        assert restored.get_all_tasks() == [toggled]
+
+    def test_filtered_json_matches_the_dicts(self):
+        store = TaskStorage()
+        for i in range(20):
+            store.add_task(f'Task {i} "quoted" \u00e9' if i % 3 else f'Task {i}')
+        for task_id in (2, 4, 6):
+            store.toggle_task(task_id)
+        store.delete_task(3)
+        for filter_type in ('all', 'active', 'completed'):
+            assert store.get_filtered_json(filter_type) == json.dumps(store.get_filtered_tasks(filter_type))
+
+    def test_keyset_pages(self):
+        store = TaskStorage()
+        for i in range(10):
+            store.add_task(f'Task {i}')
+        for task_id in (2, 4, 6):
+            store.toggle_task(task_id)
+        store.delete_task(3)
+
+        tasks, has_more = store.get_page('all', 0, 4)
+        assert [task['id'] for task in tasks] == [1, 2, 4, 5]
+        assert has_more is True
+        tasks, has_more = store.get_page('all', 5, 4)
+        assert [task['id'] for task in tasks] == [6, 7, 8, 9]
+        assert has_more is True
+        tasks, has_more = store.get_page('all', 9, 4)
+        assert [task['id'] for task in tasks] == [10]
+        assert has_more is False
+        tasks, has_more = store.get_page('completed', 2, 2)
+        assert [task['id'] for task in tasks] == [4, 6]
+        assert has_more is False
+        assert [task['id'] for task in store.get_page('active', 3, 3)[0]] == [5, 7, 8]
+
+    def test_batch_operations(self):
+        store = TaskStorage()
+        tasks = store.add_tasks(['A', 'B', 'C'])
+        assert [task['id'] for task in tasks] == [1, 2, 3]
+        toggled = store.toggle_tasks([1, 3, 3, 9])
+        assert [task and task['completed'] for task in toggled] == [True, True, True, None]
+        assert [task['completed'] for task in store.toggle_tasks([1, 2], completed=False)] == [False, False]
+        deleted = store.delete_tasks([2, 2, 7])
+        assert deleted[0]['description'] == 'B' and deleted[2] is None
+        assert store.get_task_count() == {'total': 2, 'active': 1, 'completed': 1}
+        store.add_tasks(['D', 'E'])
+        store.toggle_tasks([4])
+        assert store.delete_completed() == 2
+        assert [task['id'] for task in store.get_all_tasks()] == [1, 5]
+
+    def test_changes_since_reports_writes_and_deletes(self):
+        store = TaskStorage()
+        store.add_tasks(['A', 'B', 'C'])
+        start = store.version
+        store.toggle_task(1)
+        store.delete_task(2)
+        store.add_task('D')
+        store.delete_task(4)  # added and deleted within the delta
+        tasks, deleted, version = store.changes_since(start)
+        assert [(task['id'], task['completed']) for task in tasks] == [(1, True)]
+        assert deleted == [2, 4]
+        assert version == store.version
+        assert store.changes_since(version) == ([], [], version)
+        assert store.changes_since(version + 1) is None
+        store.clear()
+        assert store.changes_since(version) is None
+
+    def test_changes_since_reaches_back_as_far_as_the_feed(self):
+        store = TaskStorage(change_feed_size=4)
+        store.add_tasks(['A', 'B', 'C'])
+        start = store.version
+        for _ in range(4):
+            store.toggle_task(1)
+        assert [task['id'] for task in store.changes_since(start)[0]] == [1]
+        store.delete_task(2)
+        assert store.changes_since(start) is None
+        assert store.changes_since(start + 1) == ([store.get_task(1)], [2], store.version)
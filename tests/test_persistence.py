@@ -0,0 +1,140 @@
+import os
+import threading
+
+import pytest
+
+from models import TaskStorage
+from persistence import TaskJournal
+
+
+def open_store(directory, **kwargs):
+    store = TaskStorage()
+    journal = TaskJournal(str(directory), **kwargs)
+    journal.load(store)
+    return store, journal
+
+
+def fill(store):
+    for i in range(10):
+        store.add_task(f'Task {i}')
+    store.toggle_task(2)
+    store.toggle_task(3)
+    store.toggle_task(3)
+    store.delete_task(5)
+
+
+class TestTaskJournal:
+
+    def test_reopen_restores_tasks(self, tmp_path):
+        store, journal = open_store(tmp_path)
+        fill(store)
+        expected = store.get_all_tasks()
+        journal.close()
+
+        reopened, journal = open_store(tmp_path)
+        assert reopened.get_all_tasks() == expected
+        assert reopened.get_task_count() == {'total': 9, 'active': 8, 'completed': 1}
+        assert reopened.add_task('After restart')['id'] == 11
+        journal.close()
+
+    def test_crash_with_torn_record(self, tmp_path):
+        store, journal = open_store(tmp_path)
+        fill(store)
+        expected = store.get_all_tasks()
+        # Crash: the journal is never closed, and the last write was cut short
+        with open(journal.log_path(journal._generation), 'ab') as f:
+            f.write(b'["a",11,"half writ')
+        journal._lock_file.close()  # the crashed process's lock went with it
+
+        recovered, journal = open_store(tmp_path)
+        assert recovered.get_all_tasks() == expected
+        recovered.add_task('After crash')
+        journal.close()
+
+        again, journal = open_store(tmp_path)
+        assert [task['id'] for task in again.get_all_tasks()][-1] == 11
+        journal.close()
+
+    def test_snapshot_and_log_tail(self, tmp_path):
+        store, journal = open_store(tmp_path, snapshot_every=4)
+        fill(store)
+        journal.checkpoint(store)
+        store.toggle_task(7)
+        store.delete_task(1)
+        expected = store.get_all_tasks()
+        journal.close()
+
+        logs = [name for name in os.listdir(tmp_path) if name.endswith('.log')]
+        assert 'snapshot' in os.listdir(tmp_path)
+        assert len(logs) == 1
+
+        reopened, journal = open_store(tmp_path)
+        assert reopened.get_all_tasks() == expected
+        assert reopened.get_task_count()['completed'] == 2
+        journal.close()
+
+    def test_concurrent_writers_share_fsyncs(self, tmp_path):
+        store, journal = open_store(tmp_path)
+        for i in range(400):
+            store.add_task(f'Task {i}')
+        fsyncs_before = journal._log.fsyncs
+
+        def toggle_range(first):
+            for task_id in range(first, first + 50):
+                store.toggle_task(task_id)
+
+        threads = [threading.Thread(target=toggle_range, args=(1 + 50 * i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert journal._log.fsyncs - fsyncs_before < 400
+        journal.close()
+
+        reopened, journal = open_store(tmp_path)
+        assert reopened.get_task_count() == {'total': 400, 'active': 0, 'completed': 400}
+        journal.close()
+
+    def test_directory_is_locked(self, tmp_path):
+        store, journal = open_store(tmp_path)
+        with pytest.raises(RuntimeError, match='already journaled'):
+            open_store(tmp_path)
+        journal.close()
+        other, journal = open_store(tmp_path)
+        journal.close()
+
+    def test_forked_process_cannot_write(self, tmp_path):
+        store, journal = open_store(tmp_path)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                store.add_task('From the child')
+            except RuntimeError:
+                os._exit(0)
+            os._exit(1)
+        assert os.waitpid(pid, 0)[1] == 0
+        journal.close()
+        reopened, journal = open_store(tmp_path)
+        assert len(reopened) == 0
+        journal.close()
+
+    def test_rotation_syncs_the_old_log_first(self, tmp_path):
+        store, journal = open_store(tmp_path, snapshot_every=4)
+        first = journal._log
+        for i in range(4):
+            store.add_task(f'Task {i}')
+        assert journal._log is not first
+        assert first._closed and first._durable == first._appended == 4
+        journal.close()
+
+    def test_records_for_unknown_tasks_are_skipped(self, tmp_path):
+        store, journal = open_store(tmp_path)
+        store.add_task('Kept')
+        journal.close()
+        # A toggle and a delete whose add never reached the disk
+        with open(journal.log_path(journal._generation), 'ab') as f:
+            f.write(b'["t",7,true,0.0]\n["d",7]\n["t",1,true,0.0]\n')
+
+        recovered, journal = open_store(tmp_path)
+        assert [(task['id'], task['completed']) for task in recovered.get_all_tasks()] == [(1, True)]
+        journal.close()
@@ -0,0 +1,120 @@
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from rate_limit_backends import RedisBackend, SQLiteBackend, create_backend
+from security import RateLimiter
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """Just enough of the Redis protocol for the rate limit backend"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f'redis://127.0.0.1:{self.server_address[1]}/0'
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            header = self.rfile.readline()
+            if not header:
+                return
+            args = []
+            for _ in range(int(header[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2].decode())
+            self.wfile.write(self.execute(*args))
+
+    def execute(self, command, *args):
+        data = self.server.data
+        with self.server.lock:
+            if command in ('INCR', 'DECR'):
+                data[args[0]] = int(data.get(args[0], 0)) + (1 if command == 'INCR' else -1)
+                return b':%d\r\n' % data[args[0]]
+            if command == 'EXPIRE':
+                return b':1\r\n'
+            if command == 'GET':
+                if args[0] not in data:
+                    return b'$-1\r\n'
+                value = str(data[args[0]]).encode()
+                return b'$%d\r\n%s\r\n' % (len(value), value)
+        return b'-ERR unknown command\r\n'
+
+
+@pytest.fixture
+def fake_redis():
+    server = FakeRedis()
+    yield server
+    server.close()
+
+
+class FakeClock:
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def check_limit(backend):
+    clock = FakeClock(30)
+    limiter = RateLimiter(max_requests=5, time_window=60, clock=clock, backend=backend)
+    assert sum(limiter.is_allowed('1.1.1.1') for _ in range(8)) == 5
+    assert limiter.get_remaining_requests('1.1.1.1') == 0
+    assert limiter.get_remaining_requests('2.2.2.2') == 5
+    clock.now = 150
+    assert limiter.get_remaining_requests('1.1.1.1') == 5
+
+
+class TestRateLimitBackends:
+
+    def test_sqlite_backend(self, tmp_path):
+        check_limit(SQLiteBackend(str(tmp_path / 'limits.db')))
+
+    def test_sqlite_backend_is_shared(self, tmp_path):
+        path = str(tmp_path / 'limits.db')
+        first = RateLimiter(max_requests=3, backend=SQLiteBackend(path))
+        second = RateLimiter(max_requests=3, backend=SQLiteBackend(path))
+        assert first.is_allowed('1.1.1.1')
+        assert second.is_allowed('1.1.1.1')
+        assert first.is_allowed('1.1.1.1')
+        assert not second.is_allowed('1.1.1.1')
+
+    def test_redis_backend(self, fake_redis):
+        check_limit(RedisBackend.from_url(fake_redis.url))
+
+    def test_backend_errors_fail_open(self):
+        with socket.create_server(('127.0.0.1', 0)) as server:
+            backend = RedisBackend('127.0.0.1', server.getsockname()[1])
+            limiter = RateLimiter(max_requests=1, backend=backend)
+            threading.Thread(target=lambda: server.accept()[0].close(), daemon=True).start()
+            assert limiter.is_allowed('1.1.1.1') and limiter.backend_errors == 1
+            # The broken connection is closed, not just dropped
+            assert backend._local.sock.fileno() == -1
+        assert limiter.is_allowed('1.1.1.1') and limiter.backend_errors == 2
+        assert limiter.get_remaining_requests('1.1.1.1') == 1
+
+    def test_create_backend(self, tmp_path):
+        assert isinstance(create_backend(f'sqlite:///{tmp_path}/limits.db'), SQLiteBackend)
+        assert isinstance(create_backend('redis://localhost:6380/2'), RedisBackend)
+        with pytest.raises(ValueError):
+            create_backend('memcached://localhost')
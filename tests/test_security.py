@@ -0,0 +1,89 @@
+import re
+
+from flask import url_for
+
+from security import RateLimiter, SecurityHeaders
+
+
+class FakeClock:
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+
+    def test_limit_and_remaining(self):
+        clock = FakeClock()
+        limiter = RateLimiter(max_requests=3, time_window=60, clock=clock)
+        assert limiter.get_remaining_requests('1.1.1.1') == 3
+        assert all(limiter.is_allowed('1.1.1.1') for _ in range(3))
+        assert not limiter.is_allowed('1.1.1.1')
+        assert limiter.get_remaining_requests('1.1.1.1') == 0
+        assert limiter.is_allowed('2.2.2.2')
+
+    def test_previous_window_is_weighted(self):
+        clock = FakeClock()
+        limiter = RateLimiter(max_requests=10, time_window=60, clock=clock)
+        for _ in range(10):
+            assert limiter.is_allowed('1.1.1.1')
+        # Halfway into the next window half of the old requests still count
+        clock.now = 90
+        assert limiter.get_remaining_requests('1.1.1.1') == 5
+        assert sum(limiter.is_allowed('1.1.1.1') for _ in range(10)) == 5
+        # Two windows later nothing is left
+        clock.now = 180
+        assert limiter.get_remaining_requests('1.1.1.1') == 10
+
+    def test_idle_and_excess_clients_are_evicted(self):
+        clock = FakeClock()
+        limiter = RateLimiter(max_requests=10, time_window=60, max_clients=100, clock=clock)
+        for i in range(500):
+            limiter.is_allowed(f'10.0.{i // 256}.{i % 256}')
+        assert len(limiter.backend.clients) == 100
+        clock.now = 600
+        for i in range(50):
+            limiter.is_allowed(f'10.1.0.{i}')
+        assert len(limiter.backend.clients) == 50
+
+
+class TestSecurityHeaders:
+
+    def test_header_classes(self, client):
+        page = client.get('/')
+        assert page.headers['Cache-Control'] == 'private, no-cache'
+        assert "script-src 'self'" in page.headers['Content-Security-Policy']
+        assert page.headers['X-Frame-Options'] == 'DENY'
+
+        missing = client.post('/toggle_task/999999', data={'csrf_token': 'x'})
+        assert missing.headers['Cache-Control'] == 'no-cache, no-store, must-revalidate'
+        assert missing.headers['Content-Security-Policy'] == "default-src 'none'; frame-ancestors 'none';"
+        assert missing.headers.getlist('Cache-Control') == ['no-cache, no-store, must-revalidate']
+
+    def test_static_urls_are_content_hashed_and_immutable(self, app, client):
+        with app.test_request_context():
+            url = url_for('static', filename='css/style.css')
+        assert re.fullmatch(r'/static/build/css/style\.[0-9a-f]{12}\.css', url)
+
+        versioned = client.get(url)
+        # Replaces the no-cache send_file sets
+        assert versioned.headers.getlist('Cache-Control') == ['public, max-age=31536000, immutable']
+        assert 'Pragma' not in versioned.headers
+        assert client.get('/static/css/style.css?v=1').headers['Cache-Control'].endswith('immutable')
+        unversioned = client.get('/static/css/style.css')
+        assert unversioned.headers['Cache-Control'] == 'public, no-cache'
+
+    def test_static_errors_are_not_cached(self, client):
+        # e.g. a hash from a deploy still rolling out must not be pinned
+        for path in ('/static/build/js/app.000000000000.js', '/static/js/missing.js?v=abc'):
+            response = client.get(path)
+            assert response.status_code == 404
+            assert response.headers.getlist('Cache-Control') == ['no-cache, no-store, must-revalidate'], path
+
+    def test_csp_sources_are_configurable(self):
+        headers = SecurityHeaders(csp_sources={'img-src': ("'self'", 'https://images.example')})
+        assert "img-src 'self' https://images.example;" in headers.content_security_policy
+        assert "default-src 'self';" in headers.content_security_policy
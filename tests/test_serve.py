@@ -0,0 +1,93 @@
+import http.cookiejar
+import json
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+import pytest
+
+pytest.importorskip('gunicorn')
+
+import app as app_module  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from models import TaskStorage  # noqa: E402
+from persistence import TaskJournal  # noqa: E402
+from security import RateLimiter  # noqa: E402
+from serve import TaskServer, server_options, warm_up  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_warm_up_is_not_rate_limited_or_counted(app, monkeypatch):
+    monkeypatch.setattr(app_module, 'rate_limiter', RateLimiter(max_requests=1))
+    monkeypatch.setattr(app_module, 'metrics', Metrics())
+    warm_up(app, ['/', '/get_tasks', '/get_tasks'])
+    assert app_module.rate_limiter.get_remaining_requests('127.0.0.1') == 1
+    assert 'endpoint="get_tasks"' not in app_module.metrics.render()
+
+
+def test_server_options():
+    options = server_options('127.0.0.1:0', workers=4, threads=1)
+    assert options['worker_class'] == 'sync' and options['preload_app'] is True
+    assert server_options('127.0.0.1:0', workers=1, threads=4, preload=False)['preload_app'] is False
+    server = TaskServer(server_options('127.0.0.1:0', workers=2, threads=8), ['/'])
+    assert server.cfg.workers == 2 and server.cfg.threads == 8
+    assert server.cfg.worker_class_str == 'gthread'
+    assert server.cfg.post_worker_init == server.post_worker_init
+
+
+def test_reloaded_worker_keeps_the_journaled_tasks(tmp_path):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    base = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, TASKS_DATA_DIR=str(tmp_path), HEARTBEAT_URL='', LOG_LEVEL='WARNING')
+    env.pop('DATABASE_URL', None)
+    server = subprocess.Popen([sys.executable, 'serve.py', '--bind', f'127.0.0.1:{port}', '--threads', '2'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def get(path):
+        with opener.open(base + path, timeout=5) as response:
+            return response.read().decode()
+
+    def worker():
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                return re.search(r'worker="(\d+)"', get('/metrics')).group(1)
+            except OSError:
+                assert time.monotonic() < deadline and server.poll() is None
+                time.sleep(0.2)
+
+    def add_task(description):
+        token = re.search(r'name="csrf_token"[^>]*value="([^"]+)"', get('/')).group(1)
+        body = urllib.parse.urlencode({'csrf_token': token, 'description': description}).encode()
+        opener.open(base + '/add_task', body, timeout=5).close()
+
+    try:
+        first = worker()
+        add_task('Before reload')
+        server.send_signal(signal.SIGHUP)
+        deadline = time.monotonic() + 30
+        while worker() == first:
+            assert time.monotonic() < deadline
+            time.sleep(0.2)
+        add_task('After reload')
+        tasks = json.loads(get('/get_tasks'))['tasks']
+        assert [(task['id'], task['description']) for task in tasks] == [(1, 'Before reload'), (2, 'After reload')]
+    finally:
+        server.terminate()
+        server.wait(30)
+
+    store = TaskStorage()
+    journal = TaskJournal(str(tmp_path))
+    journal.load(store)
+    journal.close()
+    assert [task['id'] for task in store.get_all_tasks()] == [1, 2]
@@ -0,0 +1,93 @@
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from sql_storage import SQLTaskStorage  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLTaskStorage(f'sqlite:///{tmp_path}/tasks.db')
+    yield store
+    store.close()
+
+
+class TestSQLTaskStorage:
+
+    def test_add_get_and_filter(self, store):
+        for i in range(5):
+            store.add_task(f'Task {i}')
+        assert store.get_task(3)['description'] == 'Task 2'
+        assert store.get_task(99) is None
+        assert store.toggle_task(2)['completed'] is True
+        assert store.toggle_task(4)['completed'] is True
+        assert store.toggle_task(4)['completed'] is False
+        assert store.toggle_task(99) is None
+        assert [task['id'] for task in store.get_filtered_tasks('active')] == [1, 3, 4, 5]
+        assert [task['id'] for task in store.get_filtered_tasks('completed')] == [2]
+        assert store.get_task_count() == {'total': 5, 'active': 4, 'completed': 1}
+
+    def test_delete_and_clear(self, store):
+        for i in range(3):
+            store.add_task(f'Task {i}')
+        assert store.delete_task(2)['description'] == 'Task 1'
+        assert store.delete_task(2) is None
+        assert [task['id'] for task in store.get_all_tasks()] == [1, 3]
+        store.clear()
+        assert len(store) == 0
+
+    def test_keyset_pages(self, store):
+        for i in range(6):
+            store.add_task(f'Task {i}')
+        store.toggle_task(3)
+        tasks, has_more = store.get_page('all', 0, 4)
+        assert [task['id'] for task in tasks] == [1, 2, 3, 4]
+        assert has_more is True
+        tasks, has_more = store.get_page('active', 2, 4)
+        assert [task['id'] for task in tasks] == [4, 5, 6]
+        assert has_more is False
+
+    def test_batch_operations(self, store):
+        assert [task['id'] for task in store.add_tasks(['A', 'B', 'C'])] == [1, 2, 3]
+        toggled = store.toggle_tasks([1, 3, 9])
+        assert [task and task['completed'] for task in toggled] == [True, True, None]
+        deleted = store.delete_tasks([2, 7])
+        assert deleted[0]['description'] == 'B' and deleted[1] is None
+        assert store.get_task_count() == {'total': 2, 'active': 0, 'completed': 2}
+        version = store.version
+        assert store.delete_completed() == 2
+        assert store.get_task_count()['total'] == 0 and store.version > version
+
+    def test_filters_use_the_status_index(self, store):
+        with store.engine.connect() as conn:
+            plan = conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE completed = 1 ORDER BY id").fetchall()
+        assert 'ix_tasks_completed_id' in ' '.join(str(row) for row in plan)
+
+    def test_noop_writes_keep_the_version(self, store):
+        store.add_task('Task')
+        version = store.version
+        assert store.toggle_task(9) is None and store.delete_task(9) is None
+        assert store.toggle_tasks([8, 9]) == [None, None] and store.delete_tasks([8, 9]) == [None, None]
+        assert store.delete_completed() == 0
+        assert store.version == version
+        store.toggle_task(1)
+        assert store.version == version + 1
+
+    def test_requests_read_the_version_once(self, store, client, monkeypatch):
+        import app as app_module
+        from sqlalchemy import event
+
+        monkeypatch.setattr(app_module, 'task_store', store)
+        store.add_task('Task')
+        reads = []
+
+        def count_version_reads(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith('SELECT') and 'task_store_meta' in statement:
+                reads.append(statement)
+
+        event.listen(store.engine, 'before_cursor_execute', count_version_reads)
+        for path in ('/', '/get_tasks', '/get_tasks?filter=active'):
+            del reads[:]
+            assert client.get(path).status_code == 200
+            assert len(reads) == 1, path
@@ -0,0 +1,81 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask, url_for
+
+import static_assets
+from static_assets import AssetPipeline, minify_css, minify_js
+
+
+@pytest.fixture
+def pipeline_app(tmp_path):
+    static = tmp_path / 'static'
+    (static / 'js').mkdir(parents=True)
+    (static / 'js' / 'app.js').write_text(
+        "// setup\n"
+        "const re = /a\\/\\/b/g;  /* inline */\n"
+        "\n"
+        "    const s = 'http://x';\n"
+        "    const t = `line one\n"
+        "        line two`;\n" * 20)
+    (static / 'logo.txt').write_text('logo')
+    app = Flask(__name__, static_folder=str(static))
+    pipeline = AssetPipeline(app.static_folder)
+    pipeline.init_app(app)
+    return app, pipeline
+
+
+def test_minify_js_keeps_strings_regexes_and_templates():
+    source = "// c\nvar a = '//not a comment';\n    var r = /[/]\\/'/i; /* x */ var b = 1;\n\n`  keep\n    this`\n"
+    assert minify_js(source) == "var a = '//not a comment';\nvar r = /[/]\\/'/i; var b = 1;\n`  keep\n    this`\n"
+
+
+def test_minify_css_collapses_whitespace_outside_strings():
+    source = "/* c */\na  >  b {\n  color: red;\n  content: '  {x}  ';\n}\n"
+    assert minify_css(source) == "a>b{color: red;content: '  {x}  '}\n"
+
+
+def test_urls_resolve_to_fingerprinted_builds(pipeline_app):
+    app, pipeline = pipeline_app
+    with app.test_request_context():
+        url = url_for('static', filename='js/app.js')
+        other = url_for('static', filename='logo.txt')
+    asset = pipeline.assets['js/app.js']
+    assert url == f'/static/build/{asset.built}'
+    assert other.startswith('/static/logo.txt?v=')
+
+    client = app.test_client()
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert gzip.decompress(compressed.data) == plain.data
+    assert b'// setup' not in plain.data and b'`line one\n        line two`' in plain.data
+
+
+def test_unchanged_sources_reuse_the_build_and_edits_rebuild_in_debug(pipeline_app, monkeypatch):
+    app, pipeline = pipeline_app
+    built = pipeline.assets['js/app.js'].built
+    reloaded = AssetPipeline(app.static_folder)
+    monkeypatch.setattr(static_assets, 'minify_js', None)  # must not be needed
+    reloaded.build()
+    assert reloaded.assets['js/app.js'].built == built
+    monkeypatch.undo()
+
+    path = os.path.join(app.static_folder, 'js', 'app.js')
+    with open(path, 'a') as f:
+        f.write('const added = 1;\n')
+    # In production the URL comes from the manifest alone
+    monkeypatch.setattr(static_assets.os, 'stat', None)
+    with app.test_request_context():
+        assert built in url_for('static', filename='js/app.js')
+        assert url_for('static', filename='logo.txt').startswith('/static/logo.txt?v=')
+    monkeypatch.undo()
+
+    app.debug = True
+    with app.test_request_context():
+        url = url_for('static', filename='js/app.js')
+    assert built not in url
+    assert b'const added = 1;' in app.test_client().get(url).data
@@ -0,0 +1,54 @@
+import re
+import time
+
+from security import InputSanitizer
+from validators import CONTROL_CHARS_PATTERN, DANGEROUS_PATTERNS, DESCRIPTION_RULES, TaskValidator
+
+
+def pattern_loop(description):
+    """The per-pattern checks the rule engine replaced"""
+    if re.search(CONTROL_CHARS_PATTERN, description):
+        return False
+    return not any(re.search(pattern, description.lower()) for pattern in DANGEROUS_PATTERNS)
+
+
+class TestTaskValidator:
+
+    def test_reports_the_rule_that_matched(self):
+        assert TaskValidator.check_description('Buy milk') is None
+        assert TaskValidator.check_description(42) == 'type'
+        assert TaskValidator.check_description('   ') == 'length'
+        assert TaskValidator.check_description('a\x00b') == 'control_chars'
+        assert TaskValidator.check_description('<SCRIPT src=x>go</script>') == 'script_tag'
+        assert TaskValidator.check_description('see JavaScript:alert(1)') == 'javascript_url'
+        assert TaskValidator.check_description('<img onerror = x>') == 'event_handler'
+        assert TaskValidator.check_description('fix the button = blue') is None
+
+    def test_matches_the_pattern_loop(self):
+        samples = [
+            'Plan: call on Monday', 'x = 1', 'onion=3', 'buttons=2', 'button=2', 'on=1',
+            '<embed a>b</embed>', '<embed>\n</embed>', '<iframe>', 'data:text/html;base64',
+            'vbscript', 'aonb\t=', 'tab\there', 'ends with on', '<object x=1></object>',
+        ]
+        for sample in samples:
+            assert TaskValidator.validate_description(sample) == pattern_loop(sample), sample
+
+    def test_adversarial_input_stays_linear(self):
+        # Backtracks quadratically with on\w+\s*= (every "on" rescans the word)
+        attack = 'on' * 5000 + '!='
+        start = time.perf_counter()
+        assert TaskValidator.check_description(attack) == 'length'
+        assert DESCRIPTION_RULES.first_match(attack) is None
+        # Rescans to the end from every opener with <script[^>]*?>.*?</script>
+        assert DESCRIPTION_RULES.first_match('<script>' * 2000) is None
+        assert DESCRIPTION_RULES.first_match('<script>' * 2000 + '</script>') == 'script_tag'
+        assert time.perf_counter() - start < 0.05
+
+    def test_input_sanitizer_rules(self):
+        assert InputSanitizer.validate_task_description('Water plants') is True
+        assert InputSanitizer.validate_task_description('<script>') is False
+        assert InputSanitizer.validate_task_description('x onClick=y') is False
+        assert InputSanitizer.validate_task_description('a\x00b') is True
+        for sample in ('<script', '<script>', 'a <scripted x> b', '<script\n>', '<scr>ipt', '> <script'):
+            assert InputSanitizer.validate_task_description(sample) == (
+                re.search(r'<script[^>]*>', sample) is None), sample
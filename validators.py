@@ -4,46 +4,181 @@ Input validation utilities
 
 import re
 import html
-from typing import Any, Union
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Union
 
 # Define a constant for control characters pattern
 CONTROL_CHARS_PATTERN = r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]'
+CONTROL_CHARS_RE = re.compile(CONTROL_CHARS_PATTERN)
+
+# Potentially dangerous HTML/JS patterns, matched against lowercased text
+DANGEROUS_PATTERNS = [
+    r'<script[^>]*?>.*?</script>',
+    r'<iframe[^>]*?>.*?</iframe>',
+    r'<object[^>]*?>.*?</object>',
+    r'<embed[^>]*?>.*?</embed>',
+    r'javascript:',
+    r'vbscript:',
+    r'data:text/html',
+    r'on\w+\s*=',  # Event handlers like onclick, onload, etc.
+]
+
+class Rule(NamedTuple):
+    """A named check: ``found(text)`` is True if the text breaks the rule
+
+    ``found`` can only be True for text containing ``literal``, and
+    ``trigger`` is a character of that literal which ordinary text rarely
+    has; RuleSet uses both to skip rules cheaply.
+    """
+    name: str
+    literal: str
+    trigger: str
+    found: Callable[[str], bool]
+
+    @classmethod
+    def regex(cls, name: str, pattern: str, literal: str, trigger: str) -> 'Rule':
+        search = re.compile(pattern).search
+        return cls(name, literal, trigger, lambda text: search(text) is not None)
+
+    @classmethod
+    def element(cls, name: str, tag: str) -> 'Rule':
+        """Same matches as ``<tag[^>]*?>.*?</tag>``, found in linear time"""
+        return cls(name, '<' + tag, '<', lambda text: _has_element(text, tag))
+
+    @classmethod
+    def open_tag(cls, name: str, tag: str) -> 'Rule':
+        """Same matches as ``<tag[^>]*>``: an opener with a '>' after it"""
+        opener = '<' + tag
+
+        def found(text: str) -> bool:
+            start = text.find(opener)
+            return start != -1 and text.find('>', start + len(opener)) != -1
+
+        return cls(name, opener, '<', found)
+
+class RuleSet:
+    """Rules built once and checked behind a single-pass prefilter
+
+    One search for any trigger character (or control character) clears
+    most text outright. Otherwise each rule whose literal occurs is
+    checked, in order, and the first rule that matches is reported. Every
+    check is linear in the length of the text, so crafted input cannot
+    make it backtrack.
+    """
+
+    def __init__(self, rules: Sequence[Rule], control_chars: bool = True):
+        self.rules = list(rules)
+        self.control_chars = control_chars
+        triggers = ''.join(sorted({re.escape(rule.trigger) for rule in rules}))
+        if control_chars:
+            triggers += CONTROL_CHARS_PATTERN[1:-1]
+        self._prefilter = re.compile(f'[{triggers}]')
+
+    def first_match(self, text: str) -> Optional[str]:
+        """Name of the first rule ``text`` breaks, or None
+
+        Rules are matched against ``text`` as given; callers lowercase it.
+        """
+        if self._prefilter.search(text) is None:
+            return None
+        if self.control_chars and CONTROL_CHARS_RE.search(text):
+            return 'control_chars'
+        for rule in self.rules:
+            if rule.literal in text and rule.found(text):
+                return rule.name
+        return None
+
+def _has_element(text: str, tag: str) -> bool:
+    """Whether ``<tag[^>]*?>.*?</tag>`` matches, without rescanning per opener
+
+    Each opener's tag ends at the first ">" after it, and the element is
+    there if a closing tag follows before the next newline. Later openers
+    share those positions until they pass them, so each is looked up once.
+    """
+    opener, closer = '<' + tag, '</' + tag + '>'
+    gt = close = newline = -1
+    start = text.find(opener)
+    while start != -1:
+        if gt < start + len(opener):
+            gt = text.find('>', start + len(opener))
+            if gt == -1:
+                return False
+        if close <= gt:
+            close = text.find(closer, gt + 1)
+            if close == -1:
+                return False
+        if newline <= gt:
+            newline = text.find('\n', gt + 1)
+            if newline == -1:
+                newline = len(text)
+        if close < newline:
+            return True
+        start = text.find(opener, start + 1)
+    return False
+
+# A whole word directly followed by "=": matched once per word, where
+# on\w+\s*= would rescan the rest of the word from every "on" in it. Only
+# tried at word starts, and a shorter \w+ is rejected at once by the next
+# word character, so it stays linear without possessive quantifiers (3.11+)
+_WORD_BEFORE_EQUALS = re.compile(r'(?<!\w)\w+(?=\s*=)')
+
+def _has_event_handler(text: str) -> bool:
+    """Same matches as ``on\\w+\\s*=``: an "on" with more word characters after it"""
+    return any('on' in match.group()[:-1] for match in _WORD_BEFORE_EQUALS.finditer(text))
+
+# DANGEROUS_PATTERNS as named rules
+DESCRIPTION_RULES = RuleSet([
+    Rule.element('script_tag', 'script'),
+    Rule.element('iframe_tag', 'iframe'),
+    Rule.element('object_tag', 'object'),
+    Rule.element('embed_tag', 'embed'),
+    Rule.regex('javascript_url', r'javascript:', 'javascript:', ':'),
+    Rule.regex('vbscript_url', r'vbscript:', 'vbscript:', ':'),
+    Rule.regex('data_html_url', r'data:text/html', 'data:text/html', ':'),
+    Rule('event_handler', '=', '=', _has_event_handler),
+])
 
 class TaskValidator:
     """Validate task-related inputs"""
     
     @staticmethod
-    def validate_description(description: Any) -> bool:
-        """Validate task description"""
+    def check_description(description: Any) -> Optional[str]:
+        """Name of the rule a task description breaks, or None if it is valid
+
+        Besides the DESCRIPTION_RULES names this can be 'type', 'length' or
+        'control_chars'.
+        """
         if not isinstance(description, str):
-            return False
+            return 'type'
         
         # Check length
         if len(description.strip()) < 1 or len(description) > 500:
-            return False
+            return 'length'
         
-        # Check for null bytes and control characters
-        if re.search(CONTROL_CHARS_PATTERN, description):
-            return False
-        
-        # Check for potentially dangerous HTML/JS patterns
-        dangerous_patterns = [
-            r'<script[^>]*?>.*?</script>',
-            r'<iframe[^>]*?>.*?</iframe>',
-            r'<object[^>]*?>.*?</object>',
-            r'<embed[^>]*?>.*?</embed>',
-            r'javascript:',
-            r'vbscript:',
-            r'data:text/html',
-            r'on\w+\s*=',  # Event handlers like onclick, onload, etc.
+        # Control characters and dangerous HTML/JS patterns in one engine
+        return DESCRIPTION_RULES.first_match(description.lower())
+    
+    @staticmethod
+    def validate_description(description: Any) -> bool:
+        """Validate task description"""
+        return TaskValidator.check_description(description) is None
+    
+    @staticmethod
+    def validate_descriptions(descriptions: List[Any]) -> List[bool]:
+        """Validate a batch of task descriptions, one result per item
+
+        The rules run once over all descriptions joined by newlines. A
+        match there may span two descriptions, so it only sends the batch
+        through validate_description item by item.
+        """
+        results = [
+            isinstance(description, str) and len(description.strip()) >= 1 and len(description) <= 500
+            for description in descriptions
         ]
-        
-        description_lower = description.lower()
-        for pattern in dangerous_patterns:
-            if re.search(pattern, description_lower):
-                return False
-        
-        return True
+        joined = '\n'.join(description for description, ok in zip(descriptions, results) if ok)
+        if DESCRIPTION_RULES.first_match(joined.lower()) is None:
+            return results
+        return [ok and TaskValidator.validate_description(description)
+                for description, ok in zip(descriptions, results)]
     
     @staticmethod
     def validate_task_id(task_id: Any) -> bool:
@@ -58,6 +193,11 @@ class TaskValidator:
         except (ValueError, TypeError):
             return False
     
+    @staticmethod
+    def validate_task_ids(task_ids: List[Any]) -> List[bool]:
+        """Validate a batch of task IDs as sent in JSON (integers only)"""
+        return [type(task_id) is int and 1 <= task_id <= 999999 for task_id in task_ids]
+    
     @staticmethod
     def validate_filter_type(filter_type: Any) -> bool:
         """Validate filter type"""
@@ -70,7 +210,7 @@ class TaskValidator:
             return ""
         
         # Remove null bytes and control characters
-        description = re.sub(CONTROL_CHARS_PATTERN, '', description)
+        description = CONTROL_CHARS_RE.sub('', description)
         
         # Strip whitespace
         description = description.strip()
@@ -96,7 +236,7 @@ class SecurityValidator:
             return False
         
         # Check for null bytes and dangerous control characters
-        if re.search(CONTROL_CHARS_PATTERN, value):
+        if CONTROL_CHARS_RE.search(value):
             return False
         
         return True